@@ -1,66 +1,82 @@
 """CLI for pocketwiki-builder."""
+import logging
+import os
 import time
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 import click
 
+from pocketwiki_shared.formatting import format_duration, format_size
 from pocketwiki_shared.schemas import (
     StreamParseConfig,
-    ChunkConfig,
-    FilterConfig,
+    ChunkFilterConfig,
     EmbedConfig,
     FAISSConfig,
     PackageConfig,
 )
 from .pipeline.stream_parse import StreamParseStage
-from .pipeline.chunk import ChunkStage
-from .pipeline.filter import FilterStage
+from .pipeline.chunk_filter import ChunkFilterStage
 from .pipeline.embed import EmbedStage
 from .pipeline.faiss_index import FAISSIndexStage
 from .pipeline.package import PackageStage
 
 
-def _format_duration(seconds: float) -> str:
-    """Format duration in human-readable format."""
-    if seconds < 60:
-        return f"{seconds:.1f}s"
-    elif seconds < 3600:
-        minutes = int(seconds // 60)
-        secs = seconds % 60
-        return f"{minutes}m {secs:.1f}s"
-    else:
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        return f"{hours}h {minutes}m"
-
-
-def _format_size(size: int) -> str:
-    """Format file size in human-readable format."""
-    if size < 1024:
-        return f"{size} B"
-    elif size < 1024 * 1024:
-        return f"{size / 1024:.1f} KB"
-    elif size < 1024 * 1024 * 1024:
-        return f"{size / (1024 * 1024):.1f} MB"
-    else:
-        return f"{size / (1024 * 1024 * 1024):.2f} GB"
+logger = logging.getLogger("pocketwiki")
+# Stage.execute() logs skip decisions and timings here
+_stage_logger = logging.getLogger("pocketwiki_shared")
+
+_BAR = "=" * 70
+_SECTION = "\n" + _BAR
+
+
+class _EchoHandler(logging.Handler):
+    """Write log records through click.echo so CliRunner captures them."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        click.echo(self.format(record))
+
+
+def _configure_logging() -> None:
+    """Route the pocketwiki loggers to stdout as bare messages (idempotent)."""
+    for log in (logger, _stage_logger):
+        if not any(isinstance(h, _EchoHandler) for h in log.handlers):
+            handler = _EchoHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+
+
+def _log_banner(title: str) -> None:
+    """Log a section banner."""
+    logger.info(_SECTION)
+    logger.info(title)
+    logger.info(_BAR)
 
 
 def _get_dir_size(path: Path) -> int:
     """Get total size of a directory recursively."""
     total = 0
-    if path.is_dir():
-        for p in path.rglob("*"):
-            if p.is_file():
-                total += p.stat().st_size
+    if not path.is_dir():
+        return total
+    # DirEntry caches its stat result, so each entry costs one syscall
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total += entry.stat(follow_symlinks=False).st_size
     return total
 
 
 @click.group()
 def cli():
     """PocketWiki Builder - Create Wikipedia bundles."""
-    pass
+    _configure_logging()
 
 
 @cli.command()
@@ -70,87 +86,84 @@ def cli():
     default="https://dumps.wikimedia.org/enwiki/latest/enwiki-latest-pages-articles.xml.bz2",
     help="Wikipedia dump URL",
 )
+@click.option(
+    "--source-index-url",
+    default=None,
+    help="Multistream index URL; decompresses the dump in parallel",
+)
 @click.option("--checkpoint-pages", default=1000, help="Pages between checkpoints")
 @click.option("--max-chunk-tokens", default=512, help="Max tokens per chunk")
 @click.option("--force-restart", is_flag=True, help="Force restart from beginning")
+@click.option(
+    "--compress-articles",
+    is_flag=True,
+    help="Store parsed articles as zstd-compressed JSONL",
+)
 def build(
     out: str,
     source_url: str,
+    source_index_url: Optional[str],
     checkpoint_pages: int,
     max_chunk_tokens: int,
     force_restart: bool,
+    compress_articles: bool,
 ):
     """Build a Wikipedia bundle."""
     pipeline_start = time.time()
 
     # Log pipeline start with all configuration
-    print("=" * 70)
-    print("POCKETWIKI BUILDER - Starting Pipeline")
-    print("=" * 70)
-    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"\nConfiguration:")
-    print(f"  Output directory: {out}")
-    print(f"  Source URL: {source_url}")
-    print(f"  Checkpoint every: {checkpoint_pages} pages")
-    print(f"  Max chunk tokens: {max_chunk_tokens}")
-    print(f"  Force restart: {force_restart}")
+    logger.info(_BAR)
+    logger.info("POCKETWIKI BUILDER - Starting Pipeline")
+    logger.info(_BAR)
+    logger.info(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("\nConfiguration:")
+    logger.info(f"  Output directory: {out}")
+    logger.info(f"  Source URL: {source_url}")
+    logger.info(f"  Source index URL: {source_index_url}")
+    logger.info(f"  Checkpoint every: {checkpoint_pages} pages")
+    logger.info(f"  Max chunk tokens: {max_chunk_tokens}")
+    logger.info(f"  Force restart: {force_restart}")
+    logger.info(f"  Compress articles: {compress_articles}")
 
     work_dir = Path(out) / "work"
     work_dir.mkdir(parents=True, exist_ok=True)
-    print(f"\nWork directory: {work_dir}")
-    print(f"  Created: {work_dir.exists()}")
+    logger.info(f"\nWork directory: {work_dir}")
+    logger.info(f"  Created: {work_dir.exists()}")
 
     # Stage 1: StreamParse
-    print("\n" + "=" * 70)
-    print("STAGE 1/6: StreamParse")
-    print("=" * 70)
+    _log_banner("STAGE 1/5: StreamParse")
     stream_config = StreamParseConfig(
         source_url=source_url,
+        source_index_url=source_index_url,
         output_dir=str(work_dir / "parsed"),
         checkpoint_every_pages=checkpoint_pages,
         force_restart=force_restart,
+        output_filename="articles.jsonl.zst" if compress_articles else "articles.jsonl",
     )
     stream_stage = StreamParseStage(stream_config, work_dir)
     stream_stage.execute()
 
-    # Stage 2: Chunk
-    print("\n" + "=" * 70)
-    print("STAGE 2/6: Chunk")
-    print("=" * 70)
-    chunk_config = ChunkConfig(
-        input_file=str(work_dir / "parsed" / "articles.jsonl"),
-        output_dir=str(work_dir / "chunks"),
-        max_chunk_tokens=max_chunk_tokens,
-    )
-    chunk_stage = ChunkStage(chunk_config, work_dir)
-    chunk_stage.execute()
-
-    # Stage 3: Filter
-    print("\n" + "=" * 70)
-    print("STAGE 3/6: Filter")
-    print("=" * 70)
-    filter_config = FilterConfig(
-        input_file=str(work_dir / "chunks" / "chunks.jsonl"),
+    # Stage 2: ChunkFilter
+    _log_banner("STAGE 2/5: ChunkFilter")
+    chunk_filter_config = ChunkFilterConfig(
+        input_file=str(stream_stage.output_file),
         output_dir=str(work_dir / "filtered"),
+        max_chunk_tokens=max_chunk_tokens,
     )
-    filter_stage = FilterStage(filter_config, work_dir)
-    filter_stage.execute()
+    chunk_filter_stage = ChunkFilterStage(chunk_filter_config, work_dir)
+    chunk_filter_stage.execute()
 
-    # Stage 4: Embed
-    print("\n" + "=" * 70)
-    print("STAGE 4/6: Embed")
-    print("=" * 70)
+    # Stage 3: Embed
+    _log_banner("STAGE 3/5: Embed")
     embed_config = EmbedConfig(
-        input_file=str(work_dir / "filtered" / "filtered.jsonl"),
+        input_file=str(work_dir / "filtered" / "filtered.parquet"),
         output_dir=str(work_dir / "embeddings"),
     )
     embed_stage = EmbedStage(embed_config, work_dir)
     embed_stage.execute()
 
-    # Stage 5: FAISS Index
-    print("\n" + "=" * 70)
-    print("STAGE 5/6: FAISS Index")
-    print("=" * 70)
+    # Stage 4: FAISS Index
+    _log_banner("STAGE 4/5: FAISS Index")
     faiss_config = FAISSConfig(
         embeddings_file=str(work_dir / "embeddings" / "embeddings.npy"),
         output_dir=str(work_dir / "indexes"),
@@ -158,10 +171,8 @@ def build(
     faiss_stage = FAISSIndexStage(faiss_config, work_dir)
     faiss_stage.execute()
 
-    # Stage 6: Package
-    print("\n" + "=" * 70)
-    print("STAGE 6/6: Package")
-    print("=" * 70)
+    # Stage 5: Package
+    _log_banner("STAGE 5/5: Package")
     package_config = PackageConfig(
         work_dir=str(work_dir),
         output_bundle=str(Path(out) / "bundle"),
@@ -174,20 +185,18 @@ def build(
     bundle_path = Path(out) / "bundle"
     bundle_size = _get_dir_size(bundle_path)
 
-    print("\n" + "=" * 70)
-    print("PIPELINE COMPLETE")
-    print("=" * 70)
-    print(f"Finished at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Total duration: {_format_duration(pipeline_duration)}")
-    print(f"\nBundle location: {bundle_path}")
-    print(f"Bundle size: {_format_size(bundle_size)}")
+    _log_banner("PIPELINE COMPLETE")
+    logger.info(f"Finished at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info(f"Total duration: {format_duration(pipeline_duration)}")
+    logger.info(f"\nBundle location: {bundle_path}")
+    logger.info(f"Bundle size: {format_size(bundle_size)}")
 
     # List bundle contents
     if bundle_path.exists():
-        print(f"\nBundle contents:")
+        logger.info("\nBundle contents:")
         for f in sorted(bundle_path.iterdir()):
             if f.is_file():
-                print(f"  {f.name}: {_format_size(f.stat().st_size)}")
+                logger.info(f"  {f.name}: {format_size(f.stat().st_size)}")
 
 
 if __name__ == "__main__":
@@ -1,33 +1,308 @@
 """Chunking stage - split articles into smaller chunks."""
-import hashlib
-import json
+import multiprocessing
+import os
+import shutil
+import warnings
+from contextlib import nullcontext
 from pathlib import Path
+from typing import Optional
 
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
 
 from pocketwiki_shared.base import Stage
 from pocketwiki_shared.schemas import ChunkConfig
 
+from ..streaming.compression import is_zstd, open_jsonl_reader
+
+# Smallest byte range worth handing to a separate worker process
+_MIN_RANGE_BYTES = 8 * 1024 * 1024
+
+_SP = " "
+
+# Output buffer size and records per writelines() call
+_WRITE_BUFFER_BYTES = 1 << 20
+_WRITE_BATCH = 1024
+
+# Rows per Parquet row group
+_PARQUET_BATCH_ROWS = 65536
+
+_CHUNK_SCHEMA = pa.schema(
+    [
+        ("chunk_id", pa.string()),
+        ("page_id", pa.string()),
+        ("page_title", pa.string()),
+        ("text", pa.string()),
+        ("chunk_index", pa.int32()),
+    ]
+)
+
+
+def _effective_overlap(chunk_size: int, overlap: int) -> int:
+    """Cap overlap at half the window so every chunk advances the article."""
+    return min(overlap, chunk_size // 2)
+
+
+def _write_columns(writer: pq.ParquetWriter, columns: dict[str, list]) -> None:
+    """Write buffered chunk columns as one row group and clear them."""
+    writer.write_table(pa.Table.from_pydict(columns, schema=_CHUNK_SCHEMA))
+    for values in columns.values():
+        values.clear()
+
+
+def _chunk_range(
+    input_file: str,
+    start: int,
+    end: Optional[int],
+    part_file: str,
+    chunk_size: int,
+    overlap: int,
+    min_length: int = 0,
+    max_length: Optional[int] = None,
+    parquet_file: Optional[str] = None,
+    with_text_len: bool = False,
+) -> tuple[int, int, int, int]:
+    """Chunk the articles whose lines start within [start, end).
+
+    Args:
+        input_file: Path to the articles JSONL file (plain or .zst)
+        start: Byte offset where this range begins
+        end: Byte offset where this range ends (None = end of file)
+        part_file: Path to write this range's chunks to
+        chunk_size: Maximum words per chunk
+        overlap: Words shared between consecutive chunks of an article
+        min_length: Drop chunks with fewer characters than this
+        max_length: Drop chunks with more characters than this (None = no limit)
+        parquet_file: Path to also write this range's chunks to as Parquet
+        with_text_len: Lead each record with its text length for FilterStage
+
+    Returns:
+        Tuple of (articles processed, chunks written, too short, too long)
+    """
+    stride = chunk_size - overlap
+    article_count = 0
+    total_chunks = 0
+    too_short = 0
+    too_long = 0
+
+    pending: list[bytes] = []
+    columns: dict[str, list] = {name: [] for name in _CHUNK_SCHEMA.names}
+    parquet_writer = (
+        pq.ParquetWriter(parquet_file, _CHUNK_SCHEMA, compression="zstd")
+        if parquet_file
+        else nullcontext()
+    )
+    with open_jsonl_reader(input_file) as in_file, open(
+        part_file, "wb", buffering=_WRITE_BUFFER_BYTES
+    ) as out_file, parquet_writer:
+        if start > 0:
+            # Skip the line straddling the boundary; the previous range owns it
+            in_file.seek(start - 1)
+            in_file.readline()
+
+        while end is None or in_file.tell() < end:
+            line = in_file.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+
+            article = orjson.loads(line)
+            article_count += 1
+
+            # IDs are always written as strings so readers can use them as-is
+            page_id = str(article["id"])
+
+            # Sliding-window chunking over tokens (approximated as words)
+            words = article["text"].split()
+            if not words:
+                continue
+
+            for i, start_word in enumerate(range(0, len(words), stride)):
+                chunk_text = _SP.join(words[start_word : start_word + chunk_size])
+                if len(chunk_text) < min_length:
+                    too_short += 1
+                elif max_length is not None and len(chunk_text) > max_length:
+                    too_long += 1
+                else:
+                    chunk = {
+                        "chunk_id": f"{page_id}-{i}",
+                        "page_id": page_id,
+                        "page_title": article["title"],
+                        "text": chunk_text,
+                        "chunk_index": i,
+                    }
+                    if with_text_len:
+                        # Leads so FilterStage can read it without parsing
+                        chunk = {"text_len": len(chunk_text), **chunk}
+                    pending.append(
+                        orjson.dumps(chunk, option=orjson.OPT_APPEND_NEWLINE)
+                    )
+                    if parquet_file:
+                        for name, values in columns.items():
+                            values.append(chunk[name])
+                    total_chunks += 1
+                if start_word + chunk_size >= len(words):
+                    break
+
+            if len(pending) >= _WRITE_BATCH:
+                out_file.writelines(pending)
+                pending.clear()
+            if len(columns["chunk_id"]) >= _PARQUET_BATCH_ROWS:
+                _write_columns(parquet_writer, columns)
+
+        out_file.writelines(pending)
+        if columns["chunk_id"]:
+            _write_columns(parquet_writer, columns)
+
+    return article_count, total_chunks, too_short, too_long
+
+
+def _split_ranges(input_size: int, num_workers: int) -> list[tuple[int, int]]:
+    """Split the input into roughly equal byte ranges, one per worker."""
+    num_workers = num_workers or os.cpu_count() or 1
+    num_ranges = max(1, min(num_workers, input_size // _MIN_RANGE_BYTES))
+    step = -(-input_size // num_ranges) if input_size else 1
+    return [
+        (start, min(start + step, input_size))
+        for start in range(0, max(input_size, 1), step)
+    ]
+
+
+def _merge_parquet(parts: list[Path], output_file: Path) -> None:
+    """Concatenate per-range Parquet files in range order."""
+    if len(parts) == 1:
+        os.replace(parts[0], output_file)
+        return
+    with pq.ParquetWriter(output_file, _CHUNK_SCHEMA, compression="zstd") as writer:
+        for part in parts:
+            for batch in pq.ParquetFile(part).iter_batches(
+                batch_size=_PARQUET_BATCH_ROWS
+            ):
+                writer.write_batch(batch)
+            part.unlink()
+
+
+def _chunk_file(
+    input_path: Path,
+    output_file: Path,
+    num_workers: int,
+    chunk_size: int,
+    overlap: int,
+    min_length: int = 0,
+    max_length: Optional[int] = None,
+    parquet_file: Optional[Path] = None,
+    with_text_len: bool = False,
+) -> tuple[int, int, int, int]:
+    """Chunk an articles JSONL file in parallel byte ranges.
+
+    zstd-compressed (.zst) input is chunked by a single worker.
+
+    Args:
+        input_path: Path to the articles JSONL file (plain or .zst)
+        output_file: Path to write all chunks to
+        num_workers: Worker processes to use (0 = one per CPU)
+        chunk_size: Maximum words per chunk
+        overlap: Words shared between consecutive chunks of an article
+        min_length: Drop chunks with fewer characters than this
+        max_length: Drop chunks with more characters than this (None = no limit)
+        parquet_file: Path to also write all chunks to as Parquet
+        with_text_len: Lead each record with its text length for FilterStage
+
+    Returns:
+        Tuple of (articles processed, chunks written, too short, too long)
+    """
+    if is_zstd(input_path):
+        # Compressed input can't be split at byte offsets
+        ranges = [(0, None)]
+    else:
+        input_size = input_path.stat().st_size if input_path.exists() else 0
+        ranges = _split_ranges(input_size, num_workers)
+    print(f"    Workers: {len(ranges)}")
+
+    part_files = [
+        output_file.with_suffix(f".part{k}.jsonl") for k in range(len(ranges))
+    ]
+    parquet_parts = [
+        parquet_file.with_suffix(f".part{k}.parquet") if parquet_file else None
+        for k in range(len(ranges))
+    ]
+    jobs = [
+        (
+            str(input_path),
+            start,
+            end,
+            str(part),
+            chunk_size,
+            overlap,
+            min_length,
+            max_length,
+            str(parquet_part) if parquet_part else None,
+            with_text_len,
+        )
+        for (start, end), part, parquet_part in zip(
+            ranges, part_files, parquet_parts
+        )
+    ]
+
+    totals = [0, 0, 0, 0]
+
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+        TimeElapsedColumn(),
+    ) as progress:
+        task = progress.add_task("Chunking articles...", total=len(jobs))
+
+        if len(jobs) == 1:
+            results = [_chunk_range(*jobs[0])]
+        else:
+            with multiprocessing.Pool(len(jobs)) as pool:
+                results = pool.starmap(_chunk_range, jobs)
+
+        for result in results:
+            totals = [total + n for total, n in zip(totals, result)]
+            progress.update(
+                task,
+                advance=1,
+                description=f"Chunked {totals[0]:,} articles → {totals[1]:,} chunks",
+            )
+
+    # Stitch part files together in range order
+    with open(output_file, "wb") as out_file:
+        for part in part_files:
+            with open(part, "rb") as part_file:
+                shutil.copyfileobj(part_file, out_file)
+            part.unlink()
+    if parquet_file:
+        _merge_parquet(parquet_parts, parquet_file)
+
+    return tuple(totals)
+
 
 class ChunkStage(Stage):
-    """Split articles into token-sized chunks."""
+    """Split articles into token-sized chunks.
+
+    Deprecated: use ChunkFilterStage, which chunks and filters in one pass.
+    """
 
     def __init__(self, config: ChunkConfig, work_dir: Path):
+        warnings.warn(
+            "ChunkStage is deprecated; use ChunkFilterStage",
+            DeprecationWarning,
+            stacklevel=2,
+        )
         super().__init__(config, work_dir)
         self.config: ChunkConfig = config
         self.output_file = Path(config.output_dir) / "chunks.jsonl"
 
     def compute_input_hash(self) -> str:
         """Compute hash of config + input file."""
-        input_path = Path(self.config.input_file)
-        if input_path.exists():
-            input_hash = hashlib.md5(input_path.read_bytes()).hexdigest()[:8]
-        else:
-            input_hash = "none"
-        config_hash = hashlib.sha256(
-            self.config.model_dump_json().encode()
-        ).hexdigest()[:8]
-        return f"{input_hash}-{config_hash}"
+        return self._hash_files([self.config.input_file])
 
     def get_output_files(self) -> list[Path]:
         return [self.output_file]
@@ -45,54 +320,22 @@ class ChunkStage(Stage):
         else:
             print(f"\n  WARNING: Input file not found: {input_path}")
 
+        overlap = _effective_overlap(
+            self.config.max_chunk_tokens, self.config.overlap_tokens
+        )
+
         print(f"  Chunking parameters:")
         print(f"    Max chunk tokens: {self.config.max_chunk_tokens}")
-        print(f"    Overlap tokens: {self.config.overlap_tokens}")
-
-        article_count = 0
-        total_chunks = 0
-
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-            TimeElapsedColumn(),
-        ) as progress:
-            task = progress.add_task("Chunking articles...", total=None)
-
-            with open(self.config.input_file, "r") as in_file:
-                with open(self.output_file, "w") as out_file:
-                    for line in in_file:
-                        article = json.loads(line)
-                        article_count += 1
-
-                        # Simple chunking: split by tokens (approximated as words)
-                        text = article["text"]
-                        words = text.split()
-                        chunk_size = self.config.max_chunk_tokens
-
-                        chunks = [
-                            " ".join(words[i : i + chunk_size])
-                            for i in range(0, len(words), chunk_size)
-                        ]
-
-                        for i, chunk_text in enumerate(chunks):
-                            chunk = {
-                                "chunk_id": f"{article['id']}-{i}",
-                                "page_id": article["id"],
-                                "page_title": article["title"],
-                                "text": chunk_text,
-                                "chunk_index": i,
-                            }
-                            out_file.write(json.dumps(chunk) + "\n")
-                            total_chunks += 1
-
-                        # Update progress
-                        progress.update(
-                            task,
-                            description=f"Chunked {article_count:,} articles → {total_chunks:,} chunks",
-                        )
+        print(f"    Overlap tokens: {overlap}")
+
+        article_count, total_chunks, _, _ = _chunk_file(
+            input_path,
+            self.output_file,
+            self.config.num_workers,
+            self.config.max_chunk_tokens,
+            overlap,
+            with_text_len=True,
+        )
 
         print(f"\n  Results:")
         print(f"    Articles processed: {article_count:,}")
@@ -0,0 +1,69 @@
+"""Chunk + filter stage - split articles and drop low-quality chunks in one pass."""
+from pathlib import Path
+
+from pocketwiki_shared.base import Stage
+from pocketwiki_shared.schemas import ChunkFilterConfig
+
+from .chunk import _chunk_file, _effective_overlap
+
+
+class ChunkFilterStage(Stage):
+    """Split articles into chunks, keeping only those within the length bounds."""
+
+    def __init__(self, config: ChunkFilterConfig, work_dir: Path):
+        super().__init__(config, work_dir)
+        self.config: ChunkFilterConfig = config
+        self.output_file = Path(config.output_dir) / "filtered.jsonl"
+        self.parquet_file = Path(config.output_dir) / "filtered.parquet"
+
+    def compute_input_hash(self) -> str:
+        """Compute hash of config + input file."""
+        return self._hash_files([self.config.input_file])
+
+    def get_output_files(self) -> list[Path]:
+        return [self.output_file, self.parquet_file]
+
+    def run(self) -> None:
+        """Chunk and filter articles."""
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+
+        # Log input file info
+        input_path = Path(self.config.input_file)
+        if input_path.exists():
+            input_size = input_path.stat().st_size
+            print(f"\n  Input file: {input_path}")
+            print(f"  Input size: {input_size:,} bytes")
+        else:
+            print(f"\n  WARNING: Input file not found: {input_path}")
+
+        overlap = _effective_overlap(
+            self.config.max_chunk_tokens, self.config.overlap_tokens
+        )
+
+        print(f"  Chunking parameters:")
+        print(f"    Max chunk tokens: {self.config.max_chunk_tokens}")
+        print(f"    Overlap tokens: {overlap}")
+        print(f"    Min chunk length: {self.config.min_chunk_length} chars")
+        print(f"    Max chunk length: {self.config.max_chunk_length} chars")
+
+        article_count, kept, too_short, too_long = _chunk_file(
+            input_path,
+            self.output_file,
+            self.config.num_workers,
+            self.config.max_chunk_tokens,
+            overlap,
+            self.config.min_chunk_length,
+            self.config.max_chunk_length,
+            self.parquet_file,
+        )
+
+        total_chunks = kept + too_short + too_long
+        filtered_out = too_short + too_long
+        print(f"\n  Results:")
+        print(f"    Articles processed: {article_count:,}")
+        print(f"    Total chunks created: {total_chunks:,}")
+        print(f"    Kept chunks: {kept:,}")
+        print(f"    Filtered out: {filtered_out:,} ({100*filtered_out/max(total_chunks,1):.1f}%)")
+        print(f"      - Too short (<{self.config.min_chunk_length}): {too_short:,}")
+        print(f"      - Too long (>{self.config.max_chunk_length}): {too_long:,}")
+        print(f"    Parquet file: {self.parquet_file}")
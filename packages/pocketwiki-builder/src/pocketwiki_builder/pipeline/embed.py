@@ -1,14 +1,56 @@
 """Embedding stage - generate embeddings for chunks."""
-import hashlib
-import json
 from pathlib import Path
+from typing import Iterator
 
 import numpy as np
+import orjson
+import pyarrow.parquet as pq
+import torch
 from sentence_transformers import SentenceTransformer
 
 from pocketwiki_shared.base import Stage
 from pocketwiki_shared.schemas import EmbedConfig
 
+from ..streaming.prefetch import prefetch
+
+
+def _resolve_device(device: str) -> str:
+    """Resolve the configured device, picking CUDA for "auto" when present."""
+    if device != "auto":
+        return device
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+# Chunks read per length-sorted encode call, in units of batch_size
+_BATCHES_PER_WINDOW = 64
+# Windows read ahead of the encoder
+_PREFETCH_WINDOWS = 2
+
+# Loaded models keyed by (model name, device), reused across stage runs
+_MODEL_CACHE: dict[tuple[str, str], SentenceTransformer] = {}
+
+
+def _load_model(model_name: str, device: str, batch_size: int) -> SentenceTransformer:
+    """Load a model once per process, compiling and warming it up on CUDA."""
+    key = (model_name, device)
+    if key in _MODEL_CACHE:
+        return _MODEL_CACHE[key]
+
+    model = SentenceTransformer(model_name, device=device)
+    if device.startswith("cuda"):
+        # fp16 inference roughly doubles GPU throughput at no recall cost
+        model.half()
+        transformer = model._first_module()
+        transformer.auto_model = torch.compile(
+            transformer.auto_model, mode="reduce-overhead", dynamic=True
+        )
+        # Trigger kernel compilation before timing-sensitive encoding
+        warmup = [" ".join(["warmup"] * model.max_seq_length)] * batch_size
+        model.encode(warmup * 2, batch_size=batch_size, show_progress_bar=False)
+
+    _MODEL_CACHE[key] = model
+    return model
+
 
 class EmbedStage(Stage):
     """Generate embeddings for chunks."""
@@ -17,55 +59,118 @@ class EmbedStage(Stage):
         super().__init__(config, work_dir)
         self.config: EmbedConfig = config
         self.output_file = Path(config.output_dir) / "embeddings.npy"
+        # Marks embeddings as unit-length so FAISS can skip normalizing them
+        self.normalized_marker = self.output_file.with_suffix(".normalized")
 
     def compute_input_hash(self) -> str:
         """Compute hash of config + input."""
-        input_path = Path(self.config.input_file)
-        if input_path.exists():
-            input_hash = hashlib.md5(input_path.read_bytes()).hexdigest()[:8]
-        else:
-            input_hash = "none"
-        config_hash = hashlib.sha256(
-            self.config.model_dump_json().encode()
-        ).hexdigest()[:8]
-        return f"{input_hash}-{config_hash}"
+        return self._hash_files([self.config.input_file])
 
     def get_output_files(self) -> list[Path]:
-        return [self.output_file]
+        return [self.output_file, self.normalized_marker]
 
     def run(self) -> None:
         """Generate embeddings."""
         self.output_file.parent.mkdir(parents=True, exist_ok=True)
 
         # Log model loading
+        device = _resolve_device(self.config.device)
         print(f"\n  Loading embedding model: {self.config.model_name}")
         print(f"  Batch size: {self.config.batch_size}")
-        model = SentenceTransformer(self.config.model_name)
+        print(f"  Device: {device}")
+        model = _load_model(self.config.model_name, device, self.config.batch_size)
         print(f"  Model loaded successfully")
         print(f"  Embedding dimension: {model.get_sentence_embedding_dimension()}")
 
-        # Read chunks
+        # Count chunks so the output can be preallocated
         print(f"\n  Reading chunks from: {self.config.input_file}")
-        chunks = []
-        with open(self.config.input_file, "r") as f:
-            for line in f:
-                chunk = json.loads(line)
-                chunks.append(chunk["text"])
-        print(f"  Loaded {len(chunks):,} chunks")
+        num_chunks = self._count_chunks()
+        print(f"  Found {num_chunks:,} chunks")
 
-        # Generate embeddings in batches
         print(f"\n  Generating embeddings...")
-        num_batches = (len(chunks) + self.config.batch_size - 1) // self.config.batch_size
+        num_batches = (num_chunks + self.config.batch_size - 1) // self.config.batch_size
         print(f"  Total batches: {num_batches}")
-        embeddings = model.encode(
-            chunks,
-            batch_size=self.config.batch_size,
-            show_progress_bar=True,
-        )
 
-        # Save embeddings
-        np.save(self.output_file, embeddings)
+        # Stream windows of chunks straight into an fp16 memmap so neither the
+        # texts nor the full embedding matrix are ever held in memory
+        embeddings = None
+        offset = 0
+        for texts in prefetch(
+            self._iter_windows(), _PREFETCH_WINDOWS, name="embed-prefetch"
+        ):
+            window = self._encode_window(model, texts)
+            if embeddings is None:
+                embeddings = np.lib.format.open_memmap(
+                    self.output_file,
+                    mode="w+",
+                    dtype=np.float16,
+                    shape=(num_chunks, window.shape[1]),
+                )
+            embeddings[offset : offset + len(window)] = window
+            offset += len(window)
+
+        if embeddings is None:
+            embeddings = np.lib.format.open_memmap(
+                self.output_file,
+                mode="w+",
+                dtype=np.float16,
+                shape=(0, model.get_sentence_embedding_dimension()),
+            )
+        embeddings.flush()
+        self.normalized_marker.touch()
+
         print(f"\n  Results:")
         print(f"    Generated {len(embeddings):,} embeddings")
         print(f"    Embedding shape: {embeddings.shape}")
         print(f"    Output file: {self.output_file}")
+
+    def _is_parquet(self) -> bool:
+        """Whether the input is the columnar Parquet export of the chunks."""
+        return Path(self.config.input_file).suffix == ".parquet"
+
+    def _count_chunks(self) -> int:
+        """Count chunks in the input file."""
+        if self._is_parquet():
+            return pq.ParquetFile(self.config.input_file).metadata.num_rows
+        with open(self.config.input_file, "rb") as f:
+            return sum(1 for line in f if line.strip())
+
+    def _iter_windows(self) -> Iterator[list[str]]:
+        """Yield chunk texts from the input file in fixed-size windows."""
+        window_size = self.config.batch_size * _BATCHES_PER_WINDOW
+        if self._is_parquet():
+            # Only the text column is decoded
+            parquet_file = pq.ParquetFile(self.config.input_file)
+            for batch in parquet_file.iter_batches(
+                batch_size=window_size, columns=["text"]
+            ):
+                yield batch.column("text").to_pylist()
+            return
+
+        texts: list[str] = []
+        with open(self.config.input_file, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                texts.append(orjson.loads(line)["text"])
+                if len(texts) >= window_size:
+                    yield texts
+                    texts = []
+        if texts:
+            yield texts
+
+    def _encode_window(self, model: SentenceTransformer, texts: list[str]) -> np.ndarray:
+        """Encode one window of texts as fp16, preserving input order."""
+        # Encode in length order so each batch pads to a similar length,
+        # then scatter rows back to the original chunk order
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        sorted_embeddings = model.encode(
+            [texts[i] for i in order],
+            batch_size=self.config.batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        window = np.empty(sorted_embeddings.shape, dtype=np.float16)
+        window[order] = sorted_embeddings
+        return window
@@ -1,5 +1,7 @@
 """FAISS indexing stage."""
-import hashlib
+import logging
+import os
+import tempfile
 from pathlib import Path
 
 import faiss
@@ -9,9 +11,98 @@ from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
 from pocketwiki_shared.base import Stage
 from pocketwiki_shared.schemas import FAISSConfig
 
+try:
+    from autofaiss import build_index
+
+    AUTOFAISS_AVAILABLE = True
+except ImportError:
+    AUTOFAISS_AVAILABLE = False
+
+# Training vectors per IVF list; more adds build time without improving recall
+_TRAIN_POINTS_PER_LIST = 256
+# Floor on the training sample so PQ codebooks see enough points
+_MIN_TRAIN_POINTS = 50_000
+# Bytes of fp32 vectors per index.add() call, sized to stay cache-resident
+_ADD_BLOCK_BYTES = 8_000_000
+
+
+def _ivf_nlist(n_vectors: int) -> int:
+    """Number of IVF lists for a corpus of n_vectors (4 * sqrt(n))."""
+    return max(1, int(4 * np.sqrt(n_vectors)))
+
+
+def _normalized_block(rows: np.ndarray, normalize: bool = True) -> np.ndarray:
+    """Copy rows into a contiguous fp32 array, L2-normalized for inner product."""
+    block = np.array(rows, dtype=np.float32, order="C")
+    if normalize:
+        faiss.normalize_L2(block)
+    return block
+
+
+def _training_sample(
+    embeddings: np.ndarray, nlist: int, normalize: bool = True
+) -> np.ndarray:
+    """Draw a random sample of rows large enough to train nlist lists."""
+    n_vectors = len(embeddings)
+    n_train = min(n_vectors, max(_TRAIN_POINTS_PER_LIST * nlist, _MIN_TRAIN_POINTS))
+    if n_train == n_vectors:
+        return _normalized_block(embeddings, normalize)
+    rng = np.random.default_rng(0)
+    train_ids = np.sort(rng.choice(n_vectors, size=n_train, replace=False))
+    return _normalized_block(embeddings[train_ids], normalize)
+
+
+def _block_rows(dimension: int) -> int:
+    """Rows per block of fp32 vectors of the given dimension."""
+    return max(1, _ADD_BLOCK_BYTES // (4 * dimension))
+
+
+def _add_in_blocks(
+    index: faiss.Index, embeddings: np.ndarray, normalize: bool = True
+) -> None:
+    """Add vectors to the index in normalized fp32 blocks."""
+    block_rows = _block_rows(embeddings.shape[1])
+    for start in range(0, len(embeddings), block_rows):
+        index.add(
+            _normalized_block(embeddings[start : start + block_rows], normalize)
+        )
+
+
+def _write_normalized(
+    embeddings: np.ndarray, path: Path, normalize: bool = True
+) -> None:
+    """Write vectors to an .npy file in normalized fp32 blocks."""
+    out = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float32, shape=embeddings.shape
+    )
+    block_rows = _block_rows(embeddings.shape[1])
+    for start in range(0, len(embeddings), block_rows):
+        out[start : start + block_rows] = _normalized_block(
+            embeddings[start : start + block_rows], normalize
+        )
+    out.flush()
+    del out
+
+
+def _num_gpus() -> int:
+    """Number of GPUs visible to FAISS (0 for faiss-cpu builds)."""
+    get_num_gpus = getattr(faiss, "get_num_gpus", None)
+    return get_num_gpus() if get_num_gpus else 0
+
+
+def _index_to_gpu(index: faiss.Index, num_gpus: int) -> faiss.Index:
+    """Clone a CPU index onto one or all GPUs for training and adding."""
+    options = faiss.GpuMultipleClonerOptions()
+    # fp16 lookup tables are required for IVF-PQ with many sub-quantizers
+    options.useFloat16 = True
+    if num_gpus > 1:
+        return faiss.index_cpu_to_all_gpus(index, co=options)
+    res = faiss.StandardGpuResources()
+    return faiss.index_cpu_to_gpu(res, 0, index, options)
+
 
 class FAISSIndexStage(Stage):
-    """Create FAISS IVF-PQ index."""
+    """Create FAISS dense index."""
 
     def __init__(self, config: FAISSConfig, work_dir: Path):
         super().__init__(config, work_dir)
@@ -20,17 +111,7 @@ class FAISSIndexStage(Stage):
 
     def compute_input_hash(self) -> str:
         """Compute hash of config + input."""
-        input_path = Path(self.config.embeddings_file)
-        if input_path.exists():
-            input_hash = hashlib.md5(
-                str(input_path.stat().st_size).encode()
-            ).hexdigest()[:8]
-        else:
-            input_hash = "none"
-        config_hash = hashlib.sha256(
-            self.config.model_dump_json().encode()
-        ).hexdigest()[:8]
-        return f"{input_hash}-{config_hash}"
+        return self._hash_files([self.config.embeddings_file])
 
     def get_output_files(self) -> list[Path]:
         return [self.output_file]
@@ -39,12 +120,21 @@ class FAISSIndexStage(Stage):
         """Create FAISS index."""
         self.output_file.parent.mkdir(parents=True, exist_ok=True)
 
-        # Load embeddings
-        print(f"\n  Loading embeddings from: {self.config.embeddings_file}")
-        embeddings = np.load(self.config.embeddings_file).astype("float32")
+        num_threads = self.config.num_threads or os.cpu_count() or 1
+        faiss.omp_set_num_threads(num_threads)
+        print(f"\n  FAISS threads: {num_threads}")
+
+        # Memory-map embeddings; blocks are cast and normalized as they are used
+        print(f"  Loading embeddings from: {self.config.embeddings_file}")
+        embeddings = np.load(self.config.embeddings_file, mmap_mode="r")
         n_vectors, dimension = embeddings.shape
         print(f"  Loaded {n_vectors:,} vectors of dimension {dimension}")
 
+        # EmbedStage writes unit-length vectors and marks them with a sidecar
+        marker = Path(self.config.embeddings_file).with_suffix(".normalized")
+        normalize = not marker.exists()
+        print(f"  Already normalized: {not normalize}")
+
         # Use simpler index for small datasets
         threshold = self.config.n_clusters * 2
 
@@ -60,42 +150,68 @@ class FAISSIndexStage(Stage):
                 print(f"    Index type: IndexFlatIP (inner product)")
                 index = faiss.IndexFlatIP(dimension)
 
-                # Normalize for inner product similarity
-                task = progress.add_task("Normalizing vectors...", total=None)
-                faiss.normalize_L2(embeddings)
-                progress.update(task, completed=True)
-
                 # Add vectors to index
                 task = progress.add_task(f"Adding {n_vectors:,} vectors to index...", total=None)
-                index.add(embeddings)
+                _add_in_blocks(index, embeddings, normalize)
+                progress.update(task, completed=True)
+            elif AUTOFAISS_AVAILABLE:
+                # Let autofaiss pick the index type and parameters for the budget
+                print(f"\n  Index selection: autofaiss (approximate search)")
+                print(f"    Reason: {n_vectors:,} vectors >= threshold of {threshold:,}")
+                print(f"    Max index memory: {self.config.max_index_memory}")
+
+                task = progress.add_task("Building index with autofaiss...", total=None)
+                # autofaiss reads an .npy directory batch by batch, so the
+                # fp32 copy stays on disk rather than in memory
+                with tempfile.TemporaryDirectory(
+                    dir=self.output_file.parent
+                ) as vectors_dir:
+                    _write_normalized(
+                        embeddings, Path(vectors_dir) / "embeddings.npy", normalize
+                    )
+                    index, _ = build_index(
+                        embeddings=vectors_dir,
+                        file_format="npy",
+                        save_on_disk=False,
+                        metric_type="ip",
+                        max_index_memory_usage=self.config.max_index_memory,
+                        verbose=logging.WARNING,
+                    )
                 progress.update(task, completed=True)
             else:
-                # Create IVF-PQ index for large datasets
-                print(f"\n  Index selection: IVF-PQ (approximate search)")
+                # OPQ-rotated IVF-PQ with a corpus-sized number of lists
+                nlist = _ivf_nlist(n_vectors)
+                m = self.config.n_subquantizers
+                index_key = f"OPQ{m},IVF{nlist},PQ{m}x{self.config.bits_per_code}"
+                print(f"\n  Index selection: OPQ+IVF-PQ (approximate search)")
                 print(f"    Reason: {n_vectors:,} vectors >= threshold of {threshold:,}")
-                print(f"    Parameters:")
-                print(f"      n_clusters: {self.config.n_clusters}")
-                print(f"      n_subquantizers: {self.config.n_subquantizers}")
-                print(f"      bits_per_code: {self.config.bits_per_code}")
-
-                quantizer = faiss.IndexFlatL2(dimension)
-                index = faiss.IndexIVFPQ(
-                    quantizer,
-                    dimension,
-                    self.config.n_clusters,
-                    self.config.n_subquantizers,
-                    self.config.bits_per_code,
-                )
+                print(f"    Index key: {index_key}")
 
-                # Train and add vectors
-                task = progress.add_task("Training FAISS index...", total=None)
-                index.train(embeddings)
+                index = faiss.index_factory(
+                    dimension, index_key, faiss.METRIC_INNER_PRODUCT
+                )
+                num_gpus = _num_gpus()
+                if num_gpus:
+                    print(f"    Training on {num_gpus} GPU(s)")
+                    index = _index_to_gpu(index, num_gpus)
+
+                # Train on a subsample; IVF/PQ quality saturates well below n
+                train_vecs = _training_sample(embeddings, nlist, normalize)
+                task = progress.add_task(
+                    f"Training FAISS index on {len(train_vecs):,} vectors...", total=None
+                )
+                index.train(train_vecs)
+                del train_vecs
                 progress.update(task, completed=True)
 
                 task = progress.add_task(f"Adding {n_vectors:,} vectors to index...", total=None)
-                index.add(embeddings)
+                _add_in_blocks(index, embeddings, normalize)
                 progress.update(task, completed=True)
 
+                if num_gpus:
+                    # Serve from CPU; the bundle must load without a GPU
+                    index = faiss.index_gpu_to_cpu(index)
+
         # Save index
         faiss.write_index(index, str(self.output_file))
 
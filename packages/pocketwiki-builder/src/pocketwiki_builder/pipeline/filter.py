@@ -1,33 +1,50 @@
 """Filtering stage - remove low-quality chunks."""
-import hashlib
-import json
+import warnings
 from pathlib import Path
 
+import orjson
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
 
 from pocketwiki_shared.base import Stage
 from pocketwiki_shared.schemas import FilterConfig
 
+# Output buffer size and records per writelines() call
+_WRITE_BUFFER_BYTES = 1 << 20
+_WRITE_BATCH = 1024
+# Chunks between progress bar updates
+_PROGRESS_EVERY = 10_000
+
+# ChunkStage writes text_len as the first key of every record
+_TEXT_LEN_PREFIX = b'{"text_len":'
+
+
+def _text_len(line: bytes) -> int:
+    """Length of a chunk's text, read from its text_len prefix when present."""
+    if line.startswith(_TEXT_LEN_PREFIX):
+        end = line.index(b",", len(_TEXT_LEN_PREFIX))
+        return int(line[len(_TEXT_LEN_PREFIX) : end])
+    return len(orjson.loads(line)["text"])
+
 
 class FilterStage(Stage):
-    """Filter low-quality chunks."""
+    """Filter low-quality chunks.
+
+    Deprecated: use ChunkFilterStage, which chunks and filters in one pass.
+    """
 
     def __init__(self, config: FilterConfig, work_dir: Path):
+        warnings.warn(
+            "FilterStage is deprecated; use ChunkFilterStage",
+            DeprecationWarning,
+            stacklevel=2,
+        )
         super().__init__(config, work_dir)
         self.config: FilterConfig = config
         self.output_file = Path(config.output_dir) / "filtered.jsonl"
 
     def compute_input_hash(self) -> str:
         """Compute hash of config + input."""
-        input_path = Path(self.config.input_file)
-        if input_path.exists():
-            input_hash = hashlib.md5(input_path.read_bytes()).hexdigest()[:8]
-        else:
-            input_hash = "none"
-        config_hash = hashlib.sha256(
-            self.config.model_dump_json().encode()
-        ).hexdigest()[:8]
-        return f"{input_hash}-{config_hash}"
+        return self._hash_files([self.config.input_file])
 
     def get_output_files(self) -> list[Path]:
         return [self.output_file]
@@ -53,32 +70,48 @@ class FilterStage(Stage):
             TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
             TimeElapsedColumn(),
         ) as progress:
-            task = progress.add_task("Filtering chunks...", total=None)
+            input_size = Path(self.config.input_file).stat().st_size
+            task = progress.add_task("Filtering chunks...", total=input_size)
 
-            with open(self.config.input_file, "r") as in_file:
-                with open(self.output_file, "w") as out_file:
+            pending: list[bytes] = []
+            with open(self.config.input_file, "rb") as in_file:
+                with open(
+                    self.output_file, "wb", buffering=_WRITE_BUFFER_BYTES
+                ) as out_file:
                     for line in in_file:
-                        chunk = json.loads(line)
+                        if not line.strip():
+                            continue
                         total_input += 1
 
-                        # Filter by length
-                        text_len = len(chunk["text"])
+                        # Filter by length; kept lines pass through unparsed
+                        text_len = _text_len(line)
                         if text_len < self.config.min_chunk_length:
                             too_short += 1
                         elif text_len > self.config.max_chunk_length:
                             too_long += 1
                         else:
                             kept += 1
-                            out_file.write(json.dumps(chunk) + "\n")
+                            pending.append(line if line.endswith(b"\n") else line + b"\n")
+                            if len(pending) >= _WRITE_BATCH:
+                                out_file.writelines(pending)
+                                pending.clear()
 
-                        # Update progress
-                        if total_input % 100 == 0:
-                            filtered_out = total_input - kept
+                        # Update progress by bytes consumed
+                        if total_input % _PROGRESS_EVERY == 0:
                             progress.update(
                                 task,
+                                completed=in_file.tell(),
                                 description=f"Processed {total_input:,} chunks → kept {kept:,} ({100*kept/max(total_input,1):.1f}%)",
                             )
 
+                    out_file.writelines(pending)
+
+            progress.update(
+                task,
+                completed=input_size,
+                description=f"Processed {total_input:,} chunks → kept {kept:,} ({100*kept/max(total_input,1):.1f}%)",
+            )
+
         filtered_out = total_input - kept
         print(f"\n  Results:")
         print(f"    Input chunks: {total_input:,}")
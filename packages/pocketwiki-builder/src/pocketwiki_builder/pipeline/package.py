@@ -1,15 +1,100 @@
 """Package stage - create final bundle."""
-import hashlib
+import errno
 import json
+import mmap
+import os
+import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
 
+import numpy as np
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
 
 from pocketwiki_shared.base import Stage
+from pocketwiki_shared.jsonl import scan_line_offsets
 from pocketwiki_shared.schemas import PackageConfig
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl request number for FICLONE (linux/fs.h); exposed by fcntl from 3.12
+_FICLONE = getattr(fcntl, "FICLONE", 0x40049409)
+
+# Errors meaning "not supported here" rather than a failed copy
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EBADF,
+}
+
+
+# page_id value of a chunk record, quoted or bare
+_PAGE_ID_RE = re.compile(rb'"page_id":\s*"?([^",}]*)')
+
+
+def _index_chunks(chunks_file: Path) -> tuple[np.ndarray, int]:
+    """Locate the records of a chunks JSONL file and count its pages.
+
+    Scans the memory-mapped bytes instead of parsing each record.
+
+    Returns:
+        Tuple of (int64 (offset, length) rows per record, num_articles)
+    """
+    if chunks_file.stat().st_size == 0:
+        return np.empty((0, 2), dtype=np.int64), 0
+    with open(chunks_file, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        offsets = scan_line_offsets(mm)
+        page_ids = {m.group(1) for m in _PAGE_ID_RE.finditer(mm)}
+    return offsets, len(page_ids)
+
+
+def _reflink(fsrc, fdst) -> bool:
+    """Clone src into dst as a copy-on-write reflink (btrfs, XFS)."""
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+    except OSError as e:
+        if e.errno in _UNSUPPORTED_ERRNOS:
+            return False
+        raise
+    return True
+
+
+def _copy_range(fsrc, fdst) -> bool:
+    """Copy src into dst in-kernel with copy_file_range."""
+    if not hasattr(os, "copy_file_range"):
+        return False
+    try:
+        while os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1 << 30):
+            pass
+    except OSError as e:
+        if e.errno in _UNSUPPORTED_ERRNOS:
+            return False
+        raise
+    return True
+
+
+def _copy_file(src: Path, dst: Path) -> None:
+    """Copy a file with metadata, avoiding user-space buffers where possible.
+
+    Tries a reflink first, then copy_file_range, then shutil.copyfile.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        copied = _reflink(fsrc, fdst) or _copy_range(fsrc, fdst)
+    if not copied:
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
 
 class PackageStage(Stage):
     """Package everything into final bundle."""
@@ -21,9 +106,7 @@ class PackageStage(Stage):
 
     def compute_input_hash(self) -> str:
         """Compute hash of config."""
-        return hashlib.sha256(
-            self.config.model_dump_json().encode()
-        ).hexdigest()[:16]
+        return self.config_hash()
 
     def get_output_files(self) -> list[Path]:
         return [self.bundle_dir / "manifest.json"]
@@ -55,39 +138,49 @@ class PackageStage(Stage):
         ) as progress:
             copy_task = progress.add_task("Copying files...", total=len(files_to_copy))
 
-            for src_rel, dst_name in files_to_copy:
-                src = work_path / src_rel
-                if src.exists():
-                    dst = self.bundle_dir / dst_name
-                    shutil.copy2(src, dst)
+            # Copies release the GIL, so run them concurrently
+            with ThreadPoolExecutor(max_workers=len(files_to_copy)) as executor:
+                futures = {}
+                for src_rel, dst_name in files_to_copy:
+                    src = work_path / src_rel
+                    if src.exists():
+                        future = executor.submit(_copy_file, src, self.bundle_dir / dst_name)
+                        futures[future] = (src, src_rel, dst_name)
+                    else:
+                        print(f"    {src_rel} -> SKIPPED (not found)")
+                        progress.advance(copy_task)
+
+                for future in as_completed(futures):
+                    future.result()
+                    src, src_rel, dst_name = futures[future]
                     size = src.stat().st_size
                     total_size += size
                     print(f"    {src_rel} -> {dst_name} ({size:,} bytes)")
-                else:
-                    print(f"    {src_rel} -> SKIPPED (not found)")
-
-                progress.advance(copy_task)
+                    progress.advance(copy_task)
 
             # Count chunks for manifest
             num_chunks = 0
-            num_articles = set()
+            num_articles = 0
             chunks_file = self.bundle_dir / "chunks.jsonl"
             if chunks_file.exists():
                 count_task = progress.add_task("Counting chunks...", total=None)
-                with open(chunks_file, "r") as f:
-                    for line in f:
-                        num_chunks += 1
-                        chunk = json.loads(line)
-                        num_articles.add(chunk.get("page_id"))
-                        if num_chunks % 1000 == 0:
-                            progress.update(count_task, description=f"Counted {num_chunks:,} chunks...")
-                progress.update(count_task, completed=True)
+                offsets, num_articles = _index_chunks(chunks_file)
+                num_chunks = len(offsets)
+                progress.update(
+                    count_task,
+                    description=f"Counted {num_chunks:,} chunks",
+                    completed=True,
+                )
+
+                # Record offsets so the chat app can map chunks on demand
+                offsets.tofile(self.bundle_dir / "chunks.idx")
+                print(f"    chunks.idx created")
 
         # Create manifest
         manifest = {
             "version": "0.1.0",
             "created_at": datetime.now(timezone.utc).isoformat(),
-            "num_articles": len(num_articles),
+            "num_articles": num_articles,
             "num_chunks": num_chunks,
         }
 
@@ -1,20 +1,121 @@
 """StreamParse stage - streams and parses Wikipedia dumps with checkpointing."""
-import hashlib
-import json
+from bisect import bisect_right
 from datetime import datetime, timezone
-from io import BytesIO
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
+import orjson
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
 
 from pocketwiki_shared.base import Stage
 from pocketwiki_shared.schemas import StreamParseConfig, StreamParseCheckpoint
 
 from ..streaming.checkpoint import CheckpointManager
-from ..streaming.http_stream import stream_bz2_from_url, get_etag
+from ..streaming.compression import open_jsonl_writer
+from ..streaming.errors import HttpStreamError
+from ..streaming.http_stream import (
+    get_etag,
+    source_not_modified,
+    stream_bz2_from_url,
+    stream_bz2_multistream,
+)
+from ..streaming.iter_stream import IterStream
+from ..streaming.prefetch import prefetch
 from ..streaming.xml_parser import WikiXmlParser
 
+# Output buffer size for the articles JSONL
+_WRITE_BUFFER_BYTES = 8 * 1024 * 1024
+# Serialized articles collected per writelines() call
+_WRITE_BATCH = 1000
+# Articles per hand-off from the parser thread, and hand-offs buffered
+_PARSE_BATCH = 64
+_PARSE_QUEUE_BATCHES = 16
+# Articles between checkpoint-trigger and progress checks
+_CHECK_EVERY_PAGES = 1000
+
+# Opening tag of every page element in a dump
+_PAGE_TAG = b"<page>"
+# Root element prepended when a parse resumes after the dump's header
+_RESUME_ROOT = f'<mediawiki xmlns="{WikiXmlParser.NS[1:-1]}">'.encode()
+
+
+class _StreamStarts:
+    """Source offsets a parse can resume from, by the pages preceding them.
+
+    bz2 can only be decoded from the start of a stream, so a checkpoint
+    records the last stream starting before the checkpointed page; the
+    resumed parse skips the pages it has already written.
+    """
+
+    def __init__(self, start_byte: int):
+        self.start_byte = start_byte
+        # (page tags before the stream, stream offset), in source order
+        self._starts: list[tuple[int, int]] = []
+
+    def track(self, chunks: Iterator[tuple[int, bytes]]) -> Iterator[bytes]:
+        """Record stream starts while passing on the decompressed chunks.
+
+        Args:
+            chunks: (stream offset, chunk) tuples from the bz2 readers
+        """
+        pages = 0
+        current = None
+        tail = b""
+        for offset, data in chunks:
+            if offset != current:
+                # A page tag split by the boundary began before it
+                split = (tail + data[: len(_PAGE_TAG) - 1]).count(_PAGE_TAG)
+                self._starts.append((pages + split, offset))
+                current = offset
+            pages += (tail + data).count(_PAGE_TAG)
+            tail = data[-(len(_PAGE_TAG) - 1) :]
+            yield data
+
+    def resume_offset(self, pages_read: int) -> int:
+        """Offset of the last stream starting before the pages_read-th page.
+
+        Streams before it are dropped, as later pages resume after them.
+        """
+        i = bisect_right(self._starts, pages_read - 1, key=itemgetter(0)) - 1
+        if i < 0:
+            return self.start_byte
+        offset = self._starts[i][1]
+        del self._starts[:i]
+        return offset
+
+
+def _parse_batches(
+    parser: WikiXmlParser,
+    xml_stream: IterStream,
+    skip_through: Optional[str] = None,
+) -> Iterator[list[tuple[dict, int]]]:
+    """Parse articles in batches, pairing each with the pages read through it.
+
+    Runs on the parser thread, so page counts are captured as articles are
+    produced rather than when the writer gets to them.
+
+    Args:
+        parser: XML parser
+        xml_stream: XML byte stream
+        skip_through: ID of the last article already written; it and the
+            articles before it are dropped
+    """
+    batch: list[tuple[dict, int]] = []
+    articles = parser.parse(xml_stream)
+    if skip_through is not None:
+        for article in articles:
+            if article.get("id") == skip_through:
+                break
+    for article in articles:
+        batch.append((article, parser.pages_read))
+        if len(batch) >= _PARSE_BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 
 class StreamParseStage(Stage):
     """Streaming Wikipedia dump parser with checkpoint support."""
@@ -41,9 +142,7 @@ class StreamParseStage(Stage):
 
     def compute_input_hash(self) -> str:
         """Compute hash of configuration."""
-        return hashlib.sha256(
-            self.config.model_dump_json().encode()
-        ).hexdigest()[:16]
+        return self.config_hash()
 
     def get_output_files(self) -> list[Path]:
         """Get list of output files."""
@@ -68,9 +167,13 @@ class StreamParseStage(Stage):
             else:
                 print(f"  No checkpoint found")
 
-        if checkpoint and self._should_resume_from_checkpoint():
+        if checkpoint and self._is_previous_parse_reusable(checkpoint):
+            # One conditional request replaces the download if unchanged
+            print(f"\n  Decision: previous parse COMPLETE - re-parsing only if source changed")
+            self._fresh_parse(if_none_match=checkpoint.source_etag)
+        elif checkpoint and self._should_resume_from_checkpoint(checkpoint):
             print(f"\n  Decision: RESUMING from checkpoint")
-            self._resume_parse()
+            self._resume_parse(checkpoint)
         else:
             if checkpoint:
                 print(f"\n  Decision: Starting FRESH (checkpoint invalid or output missing)")
@@ -78,17 +181,23 @@ class StreamParseStage(Stage):
                 print(f"\n  Decision: Starting FRESH (no checkpoint)")
             self._fresh_parse()
 
-    def _should_resume_from_checkpoint(self) -> bool:
+    def _should_resume_from_checkpoint(
+        self, checkpoint: Optional[StreamParseCheckpoint] = None
+    ) -> bool:
         """Check if we should resume from checkpoint.
 
+        Args:
+            checkpoint: Already-loaded checkpoint (loaded if None)
+
         Returns:
             True if checkpoint is valid and can be resumed
         """
-        if not self.checkpoint_mgr.is_checkpoint_valid():
+        if checkpoint is None:
+            checkpoint = self.checkpoint_mgr.load_checkpoint()
+        if checkpoint is None:
             return False
 
-        checkpoint = self.checkpoint_mgr.load_checkpoint()
-        if checkpoint is None:
+        if not self.checkpoint_mgr.is_checkpoint_valid(checkpoint):
             return False
 
         # Check if output file exists and matches checkpoint
@@ -102,8 +211,48 @@ class StreamParseStage(Stage):
 
         return True
 
-    def _fresh_parse(self) -> None:
-        """Start fresh parse from beginning."""
+    def _is_previous_parse_reusable(self, checkpoint: StreamParseCheckpoint) -> bool:
+        """Check if a checkpoint records a finished parse of this config.
+
+        Args:
+            checkpoint: Loaded checkpoint
+
+        Returns:
+            True if the checkpoint is complete, has a source ETag, matches
+            the current config, and its output is intact on disk
+        """
+        return (
+            checkpoint.completed
+            and checkpoint.source_etag is not None
+            and checkpoint.config_hash == self.checkpoint_mgr.config_hash
+            and self.output_file.exists()
+            and self.output_file.stat().st_size == checkpoint.output_bytes_written
+        )
+
+    def _source_not_modified(self, etag: str) -> bool:
+        """Check the source against a completed parse's ETag.
+
+        A failed check counts as modified, so the source is parsed again.
+        """
+        try:
+            return source_not_modified(
+                str(self.config.source_url), etag, timeout=self.config.http_timeout
+            )
+        except HttpStreamError as e:
+            print(f"  Could not check source ETag: {e}")
+            return False
+
+    def _fresh_parse(self, if_none_match: Optional[str] = None) -> None:
+        """Start fresh parse from beginning.
+
+        Args:
+            if_none_match: ETag of a completed previous parse; the existing
+                output is kept if the source still matches it
+        """
+        if if_none_match and self._source_not_modified(if_none_match):
+            print(f"  Source not modified (ETag {if_none_match}) - keeping {self.output_file}")
+            return
+
         # Create output directory
         self.output_dir.mkdir(parents=True, exist_ok=True)
         print(f"  Output directory created: {self.output_dir}")
@@ -118,16 +267,33 @@ class StreamParseStage(Stage):
             except Exception as e:
                 print(f"  Could not get ETag: {e}")
 
-        # Open output file
-        with open(self.output_file, "w") as out_file:
-            # Stream from URL
+        # Stream from URL, decompressing in parallel when indexed
+        if self.config.source_index_url:
+            print(f"  Multistream index: {self.config.source_index_url}")
+            byte_stream = stream_bz2_multistream(
+                str(self.config.source_url),
+                str(self.config.source_index_url),
+                workers=self.config.download_workers,
+                chunk_size=self.config.http_chunk_size,
+                max_retries=self.config.max_retries,
+                timeout=self.config.http_timeout,
+                with_offsets=True,
+            )
+        else:
             byte_stream = stream_bz2_from_url(
                 str(self.config.source_url),
                 start_byte=0,
                 chunk_size=self.config.http_chunk_size,
                 max_retries=self.config.max_retries,
                 timeout=self.config.http_timeout,
+                with_offsets=True,
             )
+        starts = _StreamStarts(0)
+
+        # Open output file
+        with open_jsonl_writer(
+            self.output_file, buffering=_WRITE_BUFFER_BYTES
+        ) as out_file:
 
             # Parse XML
             parser = WikiXmlParser(
@@ -136,25 +302,27 @@ class StreamParseStage(Stage):
                 allowed_namespaces=self.config.allowed_namespaces,
             )
 
-            # Collect bytes for parsing
-            xml_bytes = b"".join(byte_stream)
-            xml_stream = BytesIO(xml_bytes)
-            compressed_bytes_read = len(xml_bytes)
-
             # Parse and write articles with progress
             self._parse_and_write(
                 parser,
-                xml_stream,
+                IterStream(starts.track(byte_stream)),
                 out_file,
-                compressed_bytes_read,
+                starts,
                 source_etag,
                 pages_processed=0,
                 bytes_written=0,
             )
 
-    def _resume_parse(self) -> None:
-        """Resume parse from checkpoint."""
-        checkpoint = self.checkpoint_mgr.load_checkpoint()
+    def _resume_parse(
+        self, checkpoint: Optional[StreamParseCheckpoint] = None
+    ) -> None:
+        """Resume parse from checkpoint.
+
+        Args:
+            checkpoint: Already-loaded checkpoint (loaded if None)
+        """
+        if checkpoint is None:
+            checkpoint = self.checkpoint_mgr.load_checkpoint()
         if checkpoint is None:
             # Fallback to fresh parse
             self._fresh_parse()
@@ -163,15 +331,25 @@ class StreamParseStage(Stage):
         print(f"Resuming from checkpoint: {checkpoint.pages_processed} pages processed")
 
         # Open output file in append mode
-        with open(self.output_file, "a") as out_file:
-            # Stream from URL with Range request
+        with open_jsonl_writer(
+            self.output_file, append=True, buffering=_WRITE_BUFFER_BYTES
+        ) as out_file:
+            # Stream from URL with Range request, from the start of the
+            # bz2 stream holding the last written page
+            start_byte = checkpoint.compressed_bytes_read
             byte_stream = stream_bz2_from_url(
                 str(self.config.source_url),
-                start_byte=checkpoint.compressed_bytes_read,
+                start_byte=start_byte,
                 chunk_size=self.config.http_chunk_size,
                 max_retries=self.config.max_retries,
                 timeout=self.config.http_timeout,
+                with_offsets=True,
             )
+            starts = _StreamStarts(start_byte)
+            xml_bytes = starts.track(byte_stream)
+            if start_byte > 0:
+                # Streams after the header hold bare page elements
+                xml_bytes = chain([_RESUME_ROOT], xml_bytes)
 
             # Parse XML
             parser = WikiXmlParser(
@@ -180,41 +358,40 @@ class StreamParseStage(Stage):
                 allowed_namespaces=self.config.allowed_namespaces,
             )
 
-            # Collect bytes
-            xml_bytes = b"".join(byte_stream)
-            xml_stream = BytesIO(xml_bytes)
-
             # Parse and write, continuing from checkpoint
             self._parse_and_write(
                 parser,
-                xml_stream,
+                IterStream(xml_bytes),
                 out_file,
-                checkpoint.compressed_bytes_read + len(xml_bytes),
+                starts,
                 checkpoint.source_etag,
                 pages_processed=checkpoint.pages_processed,
                 bytes_written=checkpoint.output_bytes_written,
+                skip_through=checkpoint.last_page_id,
             )
 
     def _parse_and_write(
         self,
         parser: WikiXmlParser,
-        xml_stream: BytesIO,
+        xml_stream: IterStream,
         out_file,
-        compressed_bytes_read: int,
+        starts: _StreamStarts,
         source_etag: Optional[str],
         pages_processed: int,
         bytes_written: int,
+        skip_through: Optional[str] = None,
     ) -> None:
         """Parse XML and write articles with checkpointing.
 
         Args:
             parser: XML parser
-            xml_stream: XML byte stream
-            out_file: Output file handle
-            compressed_bytes_read: Total compressed bytes read
+            xml_stream: XML byte stream, consumed incrementally
+            out_file: Output file handle (binary mode, zstd for .zst outputs)
+            starts: Resumable stream starts, tracked as xml_stream is read
             source_etag: Source ETag for validation
             pages_processed: Pages processed so far
             bytes_written: Bytes written so far
+            skip_through: ID of the last article already written
         """
         with Progress(
             SpinnerColumn(),
@@ -228,50 +405,74 @@ class StreamParseStage(Stage):
             )
 
             last_article = None
-            for article in parser.parse(xml_stream):
+            pages_read = 0
+            pending: list[bytes] = []
+            # Never check less often than the page trigger itself needs
+            check_every = min(_CHECK_EVERY_PAGES, self.config.checkpoint_every_pages)
+            batches = prefetch(
+                _parse_batches(parser, xml_stream, skip_through),
+                _PARSE_QUEUE_BATCHES,
+                name="xml-parse",
+            )
+            for article, pages_read in chain.from_iterable(batches):
                 last_article = article
 
-                # Write article as JSON line
-                line = json.dumps(article) + "\n"
-                out_file.write(line)
-                bytes_written += len(line.encode("utf-8"))
+                # Serialize article as a JSON line, writing in batches
+                line = orjson.dumps(article, option=orjson.OPT_APPEND_NEWLINE)
+                pending.append(line)
+                bytes_written += len(line)
                 pages_processed += 1
+                if len(pending) >= _WRITE_BATCH:
+                    out_file.writelines(pending)
+                    pending.clear()
+
+                # Progress and checkpoint triggers are checked periodically,
+                # keeping the clock read and progress redraw off the per-page path
+                if pages_processed % check_every:
+                    continue
 
-                # Update progress
                 progress.update(
                     task,
                     description=f"Parsed {pages_processed:,} pages",
                 )
 
-                # Check if we should checkpoint
                 if self.checkpoint_mgr.should_checkpoint(
                     pages_processed, bytes_written
                 ):
+                    # Checkpointed sizes must match what is on disk
+                    out_file.writelines(pending)
+                    pending.clear()
+                    out_file.flush()
                     checkpoint = StreamParseCheckpoint(
                         source_url=str(self.config.source_url),
                         source_etag=source_etag,
-                        compressed_bytes_read=compressed_bytes_read,
+                        compressed_bytes_read=starts.resume_offset(pages_read),
                         pages_processed=pages_processed,
                         last_page_id=article.get("id"),
                         last_page_title=article.get("title"),
                         output_file=str(self.output_file),
-                        output_bytes_written=bytes_written,
+                        output_bytes_written=out_file.tell(),
                         last_checkpoint_time=datetime.now(timezone.utc).isoformat(),
                     )
                     self.checkpoint_mgr.save_checkpoint(checkpoint)
                     self.checkpoint_mgr.reset_counters()
 
+            out_file.writelines(pending)
+            out_file.flush()
+            progress.update(task, description=f"Parsed {pages_processed:,} pages")
+
             # Final checkpoint
             checkpoint = StreamParseCheckpoint(
                 source_url=str(self.config.source_url),
                 source_etag=source_etag,
-                compressed_bytes_read=compressed_bytes_read,
+                compressed_bytes_read=starts.resume_offset(pages_read),
                 pages_processed=pages_processed,
                 last_page_id=last_article.get("id") if last_article else None,
                 last_page_title=last_article.get("title") if last_article else None,
                 output_file=str(self.output_file),
-                output_bytes_written=bytes_written,
+                output_bytes_written=out_file.tell(),
                 last_checkpoint_time=datetime.now(timezone.utc).isoformat(),
+                completed=True,
             )
             self.checkpoint_mgr.save_checkpoint(checkpoint)
 
@@ -1,9 +1,11 @@
 """Checkpoint management for streaming parser."""
 import hashlib
 import json
+import os
 import time
 from datetime import datetime
 from enum import Enum
+from functools import cached_property
 from pathlib import Path
 from typing import Optional
 
@@ -39,6 +41,9 @@ class CheckpointManager:
         self.checkpoint_file = Path(checkpoint_file)
         self.config = config
         self.config_hash = self._compute_config_hash()
+        # Last checkpoint read from or written to disk, so resumes and
+        # validity checks never re-parse a file this process already knows
+        self._checkpoint: Optional[StreamParseCheckpoint] = None
 
         # Counters
         self.pages_since_checkpoint = 0
@@ -47,32 +52,40 @@ class CheckpointManager:
         self.last_checkpoint_pages = 0
         self.last_checkpoint_bytes = 0
 
+    @cached_property
+    def _config_json(self) -> bytes:
+        """Serialized parser configuration."""
+        return self.config.model_dump_json().encode()
+
     def _compute_config_hash(self) -> str:
         """Compute hash of configuration.
 
         Returns:
             Hex string hash
         """
-        config_json = self.config.model_dump_json()
-        return hashlib.sha256(config_json.encode()).hexdigest()[:16]
+        return hashlib.sha256(self._config_json).hexdigest()[:16]
 
     def load_checkpoint(self) -> Optional[StreamParseCheckpoint]:
-        """Load checkpoint from file.
+        """Load checkpoint from file, reusing the last load or save.
 
         Returns:
             Checkpoint data or None if doesn't exist
         """
+        if self._checkpoint is not None:
+            return self._checkpoint
+
         if not self.checkpoint_file.exists():
             return None
 
         try:
             checkpoint = StreamParseCheckpoint.model_validate_json(
-                self.checkpoint_file.read_text()
+                self.checkpoint_file.read_bytes()
             )
-            return checkpoint
         except Exception:
             # Corrupted checkpoint
             return None
+        self._checkpoint = checkpoint
+        return checkpoint
 
     def save_checkpoint(self, checkpoint: StreamParseCheckpoint) -> None:
         """Save checkpoint atomically.
@@ -82,15 +95,21 @@ class CheckpointManager:
         """
         # Add config hash
         checkpoint.config_hash = self.config_hash
+        self._checkpoint = None
 
         # Write to temp file first
         self.checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
         temp_file = self.checkpoint_file.with_suffix(".json.tmp")
 
         try:
-            temp_file.write_text(checkpoint.model_dump_json(indent=2))
-            # Atomic rename
-            temp_file.rename(self.checkpoint_file)
+            with open(temp_file, "wb") as f:
+                f.write(checkpoint.model_dump_json().encode())
+                f.flush()
+                os.fsync(f.fileno())
+            # Atomic rename, replacing any previous checkpoint on all platforms
+            os.replace(temp_file, self.checkpoint_file)
+            # Copy so later caller mutations don't leak into the cache
+            self._checkpoint = checkpoint.model_copy()
         except Exception as e:
             # Clean up temp file
             if temp_file.exists():
@@ -145,13 +164,19 @@ class CheckpointManager:
         self.pages_since_checkpoint = 0
         self.bytes_since_checkpoint = 0
 
-    def is_checkpoint_valid(self) -> bool:
+    def is_checkpoint_valid(
+        self, checkpoint: Optional[StreamParseCheckpoint] = None
+    ) -> bool:
         """Check if checkpoint is valid for resuming.
 
+        Args:
+            checkpoint: Already-loaded checkpoint (loaded from disk if None)
+
         Returns:
             True if checkpoint can be used for resume
         """
-        checkpoint = self.load_checkpoint()
+        if checkpoint is None:
+            checkpoint = self.load_checkpoint()
         if checkpoint is None:
             return False
 
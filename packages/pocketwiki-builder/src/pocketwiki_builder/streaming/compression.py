@@ -0,0 +1,106 @@
+"""Transparent zstd compression for intermediate JSONL files."""
+import io
+from pathlib import Path
+from typing import BinaryIO, Iterable, Union
+
+import zstandard as zstd
+
+# Files with this suffix are read and written zstd-compressed
+ZSTD_SUFFIX = ".zst"
+
+# Fast level; Wikipedia JSONL still shrinks several-fold
+_ZSTD_LEVEL = 3
+
+_READ_BUFFER_BYTES = 1 << 20
+
+
+def is_zstd(path: Union[str, Path]) -> bool:
+    """Check whether a path names a zstd-compressed file."""
+    return Path(path).suffix == ZSTD_SUFFIX
+
+
+class ZstdFrameWriter:
+    """Binary writer that zstd-compresses everything written to it.
+
+    Every flush() ends the current zstd frame, so after a flush the file is
+    a complete sequence of frames: it can be read back, appended to, and
+    tell() reports its size on disk.
+    """
+
+    def __init__(self, raw: BinaryIO, level: int = _ZSTD_LEVEL):
+        """Initialize writer.
+
+        Args:
+            raw: Underlying binary file, opened for writing or appending
+            level: zstd compression level
+        """
+        self._raw = raw
+        compressor = zstd.ZstdCompressor(level=level, threads=-1)
+        self._writer = compressor.stream_writer(raw, closefd=False)
+        # Whether data was written since the last frame ended
+        self._pending = False
+
+    def write(self, data: bytes) -> int:
+        self._pending = True
+        return self._writer.write(data)
+
+    def writelines(self, lines: Iterable[bytes]) -> None:
+        self.write(b"".join(lines))
+
+    def flush(self) -> None:
+        """End the current frame and flush it to the underlying file."""
+        # Ending a frame with no new data would still emit an empty frame
+        if self._pending:
+            self._writer.flush(zstd.FLUSH_FRAME)
+            self._pending = False
+        self._raw.flush()
+
+    def tell(self) -> int:
+        """Return the compressed bytes written (valid after flush())."""
+        return self._raw.tell()
+
+    def close(self) -> None:
+        self.flush()
+        self._raw.close()
+
+    def __enter__(self) -> "ZstdFrameWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_jsonl_reader(path: Union[str, Path]) -> BinaryIO:
+    """Open a JSONL file for binary line reading.
+
+    Args:
+        path: Path to a plain or .zst JSONL file
+
+    Returns:
+        Binary file object yielding decompressed lines
+    """
+    if not is_zstd(path):
+        return open(path, "rb")
+    reader = zstd.ZstdDecompressor().stream_reader(
+        open(path, "rb"), read_across_frames=True, closefd=True
+    )
+    return io.BufferedReader(reader, buffer_size=_READ_BUFFER_BYTES)
+
+
+def open_jsonl_writer(
+    path: Union[str, Path], append: bool = False, buffering: int = -1
+) -> Union[BinaryIO, ZstdFrameWriter]:
+    """Open a JSONL file for binary writing.
+
+    Args:
+        path: Path to a plain or .zst JSONL file
+        append: Append to the file instead of truncating it
+        buffering: Buffer size for the underlying file
+
+    Returns:
+        Binary file object; compresses when path ends in .zst
+    """
+    raw = open(path, "ab" if append else "wb", buffering=buffering)
+    if is_zstd(path):
+        return ZstdFrameWriter(raw)
+    return raw
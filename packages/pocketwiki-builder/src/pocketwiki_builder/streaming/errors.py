@@ -7,6 +7,12 @@ class HttpStreamError(Exception):
     pass
 
 
+class NotModifiedError(HttpStreamError):
+    """Source unchanged since the ETag given in a conditional request."""
+
+    pass
+
+
 class CheckpointError(Exception):
     """Error with checkpoint management."""
 
@@ -1,30 +1,241 @@
 """HTTP streaming with bz2 decompression."""
 import bz2
+import mmap
+import os
+import shutil
+import subprocess
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BufferedReader
 from pathlib import Path
-from typing import Iterator, Optional
+from typing import Iterable, Iterator, Optional
 from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError, Timeout, RequestException
+from urllib3.exceptions import HTTPError as Urllib3Error
 
-from .errors import HttpStreamError
+from .errors import HttpStreamError, NotModifiedError
+from .iter_stream import IterStream
+
+try:
+    import indexed_bzip2
+
+    INDEXED_BZIP2_AVAILABLE = True
+except ImportError:
+    INDEXED_BZIP2_AVAILABLE = False
+
+
+# Connections kept open per host
+_POOL_SIZE = 16
+
+
+def _make_session() -> requests.Session:
+    """Create a session that keeps connections open between requests."""
+    session = requests.Session()
+    # Room for every parallel multistream worker to keep its own connection;
+    # retries are handled by the callers' backoff loops
+    adapter = HTTPAdapter(
+        pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE, max_retries=0
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Shared so ETag/Range probes and the download reuse one TCP+TLS connection
+_SESSION = _make_session()
+
+# Compressed bytes handed to the bz2 decompressor per call
+_BZ2_INPUT_BYTES = 16 * 1024 * 1024
+
+# Every bz2 stream starts with this signature
+_BZ2_MAGIC = b"BZh"
+
+# Compressed bytes fetched and decompressed per multistream task
+_MULTISTREAM_SEGMENT_BYTES = 8 * 1024 * 1024
+
+# Parallel bz2 decoders to pipe HTTP downloads through, in order of preference
+_PARALLEL_BZ2_TOOLS = ("lbzip2", "pbzip2")
+
+
+def _read_raw(response: requests.Response, chunk_size: int) -> Iterator[bytes]:
+    """Read a streamed response body straight from the socket.
+
+    Bypasses iter_content's per-chunk generator and copies; the body is
+    read as sent, without content decoding.
+
+    Args:
+        response: Response opened with stream=True
+        chunk_size: Bytes per read
+
+    Yields:
+        Raw body chunks
+
+    Raises:
+        RequestException: If the connection fails mid-body
+    """
+    while True:
+        try:
+            chunk = response.raw.read(chunk_size, decode_content=False)
+        except Urllib3Error as e:
+            raise RequestException(e) from e
+        if not chunk:
+            return
+        yield chunk
+
+
+def _find_parallel_bz2() -> Optional[str]:
+    """Return the path of a parallel bz2 decoder on PATH, if any."""
+    for tool in _PARALLEL_BZ2_TOOLS:
+        path = shutil.which(tool)
+        if path:
+            return path
+    return None
+
+
+def _decompress_with_tool(
+    tool: str, chunks: Iterator[bytes], chunk_size: int
+) -> Iterator[bytes]:
+    """Decompress a bz2 byte stream by piping it through an external decoder.
+
+    Args:
+        tool: Path to a bzip2-compatible decoder (e.g. lbzip2)
+        chunks: Compressed byte chunks
+        chunk_size: Maximum size of decompressed chunks to yield
+
+    Yields:
+        Decompressed byte chunks
+
+    Raises:
+        HttpStreamError: If the decoder exits with an error
+    """
+    proc = subprocess.Popen(
+        [tool, "-d", "-c"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    feed_error: list[BaseException] = []
+
+    def feed() -> None:
+        try:
+            for chunk in chunks:
+                if chunk:
+                    proc.stdin.write(chunk)
+        except BrokenPipeError:
+            pass
+        except BaseException as e:
+            feed_error.append(e)
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    feeder = threading.Thread(target=feed, name="bz2-feed", daemon=True)
+    feeder.start()
+    try:
+        while True:
+            data = proc.stdout.read1(chunk_size)
+            if not data:
+                break
+            yield data
+    finally:
+        proc.stdout.close()
+        feeder.join()
+        returncode = proc.wait()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+
+    # Network errors surface here so the caller's retry logic sees them
+    if feed_error:
+        raise feed_error[0]
+    if returncode != 0:
+        raise HttpStreamError(
+            f"{Path(tool).name} failed ({returncode}): {stderr.decode(errors='replace').strip()}"
+        )
+
+
+def _bz2_decompress(
+    chunks: Iterable[bytes],
+    chunk_size: int,
+    start_byte: int = 0,
+    with_offsets: bool = False,
+) -> Iterator:
+    """Decompress bz2 data, continuing across concatenated streams.
+
+    Input may arrive in large pieces; output is yielded in pieces of at
+    most chunk_size bytes. Non-bz2 data after a complete stream is ignored.
+
+    Args:
+        chunks: Compressed byte chunks
+        chunk_size: Maximum size of decompressed chunks to yield
+        start_byte: Source offset of the first compressed byte
+        with_offsets: Pair each chunk with the source offset of the bz2
+            stream it was decompressed from
+
+    Yields:
+        Decompressed byte chunks, or (stream offset, chunk) tuples
+    """
+    decompressor: Optional[bz2.BZ2Decompressor] = bz2.BZ2Decompressor()
+    stream_start = start_byte
+    # Source offset of data[0]
+    pos = start_byte
+    carry = b""
+    for data in chunks:
+        if carry:
+            data = carry + data
+            carry = b""
+        while data:
+            if decompressor is None:
+                # Only start another stream if one actually follows
+                if len(data) < len(_BZ2_MAGIC):
+                    carry = data
+                    break
+                if not data.startswith(_BZ2_MAGIC):
+                    return
+                decompressor = bz2.BZ2Decompressor()
+                stream_start = pos
+
+            out = decompressor.decompress(data, max_length=chunk_size)
+            while True:
+                if out:
+                    yield (stream_start, out) if with_offsets else out
+                if decompressor.eof or decompressor.needs_input:
+                    break
+                out = decompressor.decompress(b"", max_length=chunk_size)
+
+            if decompressor.eof:
+                rest = decompressor.unused_data
+                pos += len(data) - len(rest)
+                data = rest
+                decompressor = None
+            else:
+                pos += len(data)
+                data = b""
 
 
 def _stream_from_file(
     file_path: str,
     start_byte: int = 0,
-    chunk_size: int = 1024 * 1024,
-) -> Iterator[bytes]:
+    chunk_size: int = 4 * 1024 * 1024,
+    with_offsets: bool = False,
+) -> Iterator:
     """Stream from a local file, handling bz2 if needed.
 
     Args:
         file_path: Path to local file
-        start_byte: Byte offset to resume from (only for uncompressed)
+        start_byte: Byte offset to resume from (a bz2 stream start for .bz2)
         chunk_size: Size of chunks to read
+        with_offsets: Pair each chunk with the offset it can be resumed
+            from: its bz2 stream's start, or start_byte for plain XML
 
     Yields:
-        Byte chunks (decompressed if .bz2)
+        Byte chunks (decompressed if .bz2), or (offset, chunk) tuples
     """
     path = Path(file_path)
     if not path.exists():
@@ -32,22 +243,27 @@ def _stream_from_file(
 
     is_bz2 = path.suffix.lower() == ".bz2"
 
-    if is_bz2:
-        # For bz2 files, we need to read and decompress
-        decompressor = bz2.BZ2Decompressor()
-        with open(path, "rb") as f:
-            if start_byte > 0:
-                f.seek(start_byte)
+    # indexed_bzip2 can't report where its streams start
+    if is_bz2 and start_byte == 0 and INDEXED_BZIP2_AVAILABLE and not with_offsets:
+        # Decode independent bz2 blocks on all cores
+        with indexed_bzip2.open(str(path), parallelization=os.cpu_count()) as f:
             while True:
                 chunk = f.read(chunk_size)
                 if not chunk:
                     break
-                try:
-                    decompressed = decompressor.decompress(chunk)
-                    if decompressed:
-                        yield decompressed
-                except EOFError:
-                    break
+                yield chunk
+    elif is_bz2:
+        # Feed large slices of the mapped file to amortize per-call overhead
+        if path.stat().st_size <= start_byte:
+            return
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            slices = (
+                mm[i : i + _BZ2_INPUT_BYTES]
+                for i in range(start_byte, len(mm), _BZ2_INPUT_BYTES)
+            )
+            yield from _bz2_decompress(slices, chunk_size, start_byte, with_offsets)
     else:
         # Plain XML file - just read directly
         with open(path, "rb") as f:
@@ -57,16 +273,18 @@ def _stream_from_file(
                 chunk = f.read(chunk_size)
                 if not chunk:
                     break
-                yield chunk
+                yield (start_byte, chunk) if with_offsets else chunk
 
 
 def stream_bz2_from_url(
     url: str,
     start_byte: int = 0,
-    chunk_size: int = 1024 * 1024,  # 1 MB
+    chunk_size: int = 4 * 1024 * 1024,  # 4 MB
     max_retries: int = 5,
     timeout: int = 300,
-) -> Iterator[bytes]:
+    if_none_match: Optional[str] = None,
+    with_offsets: bool = False,
+) -> Iterator:
     """Stream bz2-compressed data from URL with resume support.
 
     Supports both http(s):// and file:// URLs.
@@ -77,51 +295,64 @@ def stream_bz2_from_url(
         chunk_size: Size of chunks to read
         max_retries: Maximum number of retries
         timeout: Request timeout in seconds
+        if_none_match: ETag of a previous download; the source is only
+            streamed if it has changed since
+        with_offsets: Pair each chunk with the source offset of the bz2
+            stream it came from, a point the stream can be resumed at.
+            Decoding then stays in-process, since external decoders can't
+            report stream offsets.
 
     Yields:
-        Decompressed byte chunks
+        Decompressed byte chunks, or (stream offset, chunk) tuples
 
     Raises:
+        NotModifiedError: If the source still matches if_none_match
         HttpStreamError: If streaming fails after retries
     """
     # Handle file:// URLs
     parsed = urlparse(url)
     if parsed.scheme == "file":
         file_path = parsed.path
-        yield from _stream_from_file(file_path, start_byte, chunk_size)
+        if if_none_match and get_etag(url) == if_none_match:
+            raise NotModifiedError(f"Not modified since ETag {if_none_match}")
+        yield from _stream_from_file(file_path, start_byte, chunk_size, with_offsets)
         return
 
     # Handle http(s):// URLs
     headers = {}
     if start_byte > 0:
         headers["Range"] = f"bytes={start_byte}-"
+    if if_none_match:
+        headers["If-None-Match"] = if_none_match
 
     retries = 0
     backoff = 10  # seconds
 
     while retries <= max_retries:
         try:
-            response = requests.get(
+            response = _SESSION.get(
                 url,
                 stream=True,
                 headers=headers,
                 timeout=timeout,
             )
             response.raise_for_status()
-
-            # Initialize decompressor
-            decompressor = bz2.BZ2Decompressor()
-
-            # Stream and decompress
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    try:
-                        decompressed = decompressor.decompress(chunk)
-                        if decompressed:
-                            yield decompressed
-                    except EOFError:
-                        # End of bz2 stream
-                        break
+            if response.status_code == 304:
+                response.close()
+                raise NotModifiedError(f"Not modified since ETag {if_none_match}")
+
+            # Prefer a multi-threaded external decoder when one is installed
+            tool = None if with_offsets else _find_parallel_bz2()
+            if tool:
+                yield from _decompress_with_tool(
+                    tool, _read_raw(response, chunk_size), chunk_size
+                )
+                return
+
+            # Stream and decompress several bz2 blocks (900 KB each) per read
+            yield from _bz2_decompress(
+                _read_raw(response, chunk_size), chunk_size, start_byte, with_offsets
+            )
 
             # Success, return
             return
@@ -164,13 +395,45 @@ def get_etag(url: str) -> Optional[str]:
         return None
 
     try:
-        response = requests.head(url, timeout=30)
+        response = _SESSION.head(url, timeout=30)
         response.raise_for_status()
         return response.headers.get("ETag")
     except (HTTPError, RequestException) as e:
         raise HttpStreamError(f"Failed to get ETag: {e}") from e
 
 
+def source_not_modified(url: str, etag: str, timeout: int = 30) -> bool:
+    """Check whether a source still matches a previously seen ETag.
+
+    Sends a conditional HEAD request, so nothing is downloaded.
+
+    Args:
+        url: URL to check (http://, https://, or file://)
+        etag: ETag of a previous download
+        timeout: Request timeout in seconds
+
+    Returns:
+        True if the source is unchanged since etag
+
+    Raises:
+        HttpStreamError: If request fails
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        return get_etag(url) == etag
+
+    try:
+        response = _SESSION.head(
+            url, headers={"If-None-Match": etag}, timeout=timeout
+        )
+        if response.status_code == 304:
+            return True
+        response.raise_for_status()
+        return response.headers.get("ETag") == etag
+    except (HTTPError, RequestException) as e:
+        raise HttpStreamError(f"Failed to check ETag: {e}") from e
+
+
 def supports_range_requests(url: str) -> bool:
     """Check if server supports Range requests.
 
@@ -181,9 +444,190 @@ def supports_range_requests(url: str) -> bool:
         True if Range requests supported
     """
     try:
-        response = requests.head(url, timeout=30)
+        response = _SESSION.head(url, timeout=30)
         response.raise_for_status()
         accept_ranges = response.headers.get("Accept-Ranges", "")
         return accept_ranges.lower() == "bytes"
     except (HTTPError, RequestException):
         return False
+
+
+def _source_size(url: str, timeout: int = 30) -> int:
+    """Return the size in bytes of a local file or remote resource.
+
+    Raises:
+        HttpStreamError: If the size cannot be determined
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        try:
+            return Path(parsed.path).stat().st_size
+        except OSError as e:
+            raise HttpStreamError(f"Local file not found: {parsed.path}") from e
+
+    try:
+        response = _SESSION.head(url, timeout=timeout, allow_redirects=True)
+        response.raise_for_status()
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError) as e:
+        raise HttpStreamError(f"No Content-Length for {url}") from e
+    except (HTTPError, RequestException) as e:
+        raise HttpStreamError(f"Failed to get size of {url}: {e}") from e
+
+
+def _read_range(
+    url: str,
+    start: int,
+    end: int,
+    max_retries: int = 5,
+    timeout: int = 300,
+) -> bytes:
+    """Read bytes [start, end) of a local file or remote resource.
+
+    Raises:
+        HttpStreamError: If the range cannot be read after retries
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        with open(parsed.path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    retries = 0
+    backoff = 10  # seconds
+    while True:
+        try:
+            response = _SESSION.get(
+                url,
+                headers={"Range": f"bytes={start}-{end - 1}"},
+                timeout=timeout,
+            )
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise HttpStreamError(f"Server ignored Range request for {url}")
+            return response.content
+        except (HTTPError, Timeout, RequestException) as e:
+            if isinstance(e, HTTPError) and 400 <= e.response.status_code < 500:
+                raise HttpStreamError(f"HTTP {e.response.status_code}: {e}") from e
+
+            retries += 1
+            if retries > max_retries:
+                raise HttpStreamError(
+                    f"Failed after {max_retries} retries: {e}"
+                ) from e
+            time.sleep(backoff * (2 ** (retries - 1)))
+
+
+def parse_multistream_index(lines: Iterable[bytes]) -> list[int]:
+    """Extract stream offsets from a multistream dump index.
+
+    Args:
+        lines: Index lines of the form ``offset:page_id:title``
+
+    Returns:
+        Sorted, de-duplicated byte offsets of the bz2 streams
+    """
+    offsets = set()
+    for line in lines:
+        offset, sep, _ = line.partition(b":")
+        if sep:
+            offsets.add(int(offset))
+    return sorted(offsets)
+
+
+def _load_multistream_index(index_url: str, timeout: int = 300) -> list[int]:
+    """Download (decompressing if .bz2) and parse a multistream index."""
+    if index_url.lower().endswith(".bz2"):
+        chunks = stream_bz2_from_url(index_url, timeout=timeout)
+    else:
+        size = _source_size(index_url)
+        chunks = iter([_read_range(index_url, 0, size, timeout=timeout)])
+    return parse_multistream_index(BufferedReader(IterStream(chunks)))
+
+
+def _decompress_segment(
+    url: str,
+    start: int,
+    end: int,
+    chunk_size: int,
+    max_retries: int,
+    timeout: int,
+    with_offsets: bool = False,
+) -> list:
+    """Fetch one run of whole bz2 streams and decompress it."""
+    data = _read_range(url, start, end, max_retries=max_retries, timeout=timeout)
+    return list(_bz2_decompress([data], chunk_size, start, with_offsets))
+
+
+def stream_bz2_multistream(
+    url: str,
+    index_url: str,
+    workers: int = 8,
+    chunk_size: int = 4 * 1024 * 1024,
+    max_retries: int = 5,
+    timeout: int = 300,
+    with_offsets: bool = False,
+) -> Iterator:
+    """Stream a multistream bz2 dump, decompressing streams in parallel.
+
+    Multistream dumps are concatenated bz2 streams whose offsets are listed
+    in a companion index. Runs of whole streams are fetched with Range
+    requests and decompressed on a thread pool (bz2 releases the GIL), then
+    yielded in file order.
+
+    Args:
+        url: Dump URL (http://, https://, or file://)
+        index_url: URL of the dump's multistream index (.txt or .txt.bz2)
+        workers: Segments fetched and decompressed concurrently
+        chunk_size: Maximum size of decompressed chunks to yield
+        max_retries: Maximum retries per Range request
+        timeout: Request timeout in seconds
+        with_offsets: Pair each chunk with the source offset of the bz2
+            stream it came from
+
+    Yields:
+        Decompressed byte chunks (or (stream offset, chunk) tuples), in
+        file order
+
+    Raises:
+        HttpStreamError: If the index or any segment cannot be read
+    """
+    size = _source_size(url)
+    offsets = _load_multistream_index(index_url, timeout=timeout)
+
+    # The header stream precedes the first indexed offset and the footer
+    # stream follows the last one, so both ends are always included
+    boundaries = sorted({0, size, *(o for o in offsets if 0 < o < size)})
+
+    # Merge adjacent streams into segments big enough to amortize a request
+    segments: list[tuple[int, int]] = []
+    start = 0
+    for boundary in boundaries[1:]:
+        if boundary - start >= _MULTISTREAM_SEGMENT_BYTES or boundary == size:
+            segments.append((start, boundary))
+            start = boundary
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bz2-segment") as pool:
+        # Bound the segments in flight so memory stays proportional to workers
+        pending: deque[Future] = deque()
+        try:
+            for seg_start, seg_end in segments:
+                pending.append(
+                    pool.submit(
+                        _decompress_segment,
+                        url,
+                        seg_start,
+                        seg_end,
+                        chunk_size,
+                        max_retries,
+                        timeout,
+                        with_offsets,
+                    )
+                )
+                if len(pending) > workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,44 @@
+"""File-like adapter over an iterator of byte chunks."""
+import io
+from typing import Iterator
+
+
+class IterStream(io.RawIOBase):
+    """Expose an iterator of byte chunks as a readable binary stream.
+
+    Lets parsers that expect a file object consume a decompression stream
+    incrementally instead of buffering it in memory first.
+
+    Attributes:
+        bytes_read: Number of bytes handed to the reader so far
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        """Initialize stream.
+
+        Args:
+            chunks: Iterator of byte chunks
+        """
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._buffer = b""
+        self._pos = 0
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        """Fill b with the next available bytes, returning 0 at EOF."""
+        while self._pos >= len(self._buffer):
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+            self._pos = 0
+
+        n = min(len(b), len(self._buffer) - self._pos)
+        b[:n] = self._buffer[self._pos : self._pos + n]
+        self._pos += n
+        self.bytes_read += n
+        return n
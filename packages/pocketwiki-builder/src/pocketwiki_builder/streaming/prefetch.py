@@ -0,0 +1,41 @@
+"""Background read-ahead for iterators."""
+import queue
+import threading
+from typing import Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+def prefetch(items: Iterator[T], depth: int, name: str = "prefetch") -> Iterator[T]:
+    """Read ahead up to depth items on a background thread.
+
+    Lets the producer (parsing, decoding, reading) run while the consumer
+    works on the previous item. Producer exceptions are re-raised in the
+    consumer.
+
+    Args:
+        items: Iterator to consume in the background
+        depth: Maximum number of items buffered ahead of the consumer
+        name: Name of the background thread
+
+    Yields:
+        Items from the iterator, in order
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    done = object()
+
+    def produce() -> None:
+        try:
+            for item in items:
+                buffer.put(item)
+        except BaseException as e:
+            buffer.put(e)
+        buffer.put(done)
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    while (item := buffer.get()) is not done:
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+    thread.join()
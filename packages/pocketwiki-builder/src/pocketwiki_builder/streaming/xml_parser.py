@@ -1,18 +1,35 @@
 """Incremental XML parser for Wikipedia dumps."""
 import re
-from typing import Iterator, Dict, Optional, BinaryIO
+from typing import Iterable, Iterator, Dict, Optional, BinaryIO
 
 from lxml import etree
 
 from .errors import ParseError
 
 
+# Pages between detaching cleared pages from the document root
+_ROOT_CLEAR_EVERY_PAGES = 1000
+
+
 class WikiXmlParser:
-    """Incremental parser for Wikipedia XML dumps."""
+    """Incremental parser for Wikipedia XML dumps.
+
+    Attributes:
+        pages_read: Page elements read by the current parse, skipped ones
+            included
+    """
 
     # Wikipedia MediaWiki namespace
     NS = "{http://www.mediawiki.org/xml/export-0.10/}"
 
+    # Qualified tags compared directly while walking a page's children
+    _TAG_ID = f"{NS}id"
+    _TAG_TITLE = f"{NS}title"
+    _TAG_NS = f"{NS}ns"
+    _TAG_REDIRECT = f"{NS}redirect"
+    _TAG_REVISION = f"{NS}revision"
+    _TAG_TEXT = f"{NS}text"
+
     def __init__(
         self,
         skip_redirects: bool = True,
@@ -29,6 +46,7 @@ class WikiXmlParser:
         self.skip_redirects = skip_redirects
         self.skip_disambiguation = skip_disambiguation
         self.allowed_namespaces = allowed_namespaces or [0]
+        self.pages_read = 0
 
     def parse(self, stream: BinaryIO) -> Iterator[Dict[str, str]]:
         """Parse Wikipedia XML stream incrementally.
@@ -40,29 +58,81 @@ class WikiXmlParser:
             Dictionary with keys: id, title, text, namespace
         """
         try:
-            context = etree.iterparse(
-                stream,
-                events=("end",),
-                tag=f"{self.NS}page",
-            )
+            context = etree.iterparse(stream, **self._parser_options())
+            yield from self._take_pages(context)
 
-            for event, elem in context:
-                try:
-                    article = self._extract_article(elem)
+        except etree.XMLSyntaxError as e:
+            # Log but don't crash on malformed XML
+            pass
+
+    def parse_chunks(self, byte_stream: Iterable[bytes]) -> Iterator[Dict[str, str]]:
+        """Parse Wikipedia XML pushed in as byte chunks.
 
-                    if article and self._should_include(article):
-                        yield article
+        Feeds each chunk to an lxml pull parser and yields the pages it
+        completes, so no file-like adapter sits between the decompressor
+        and the parser.
 
-                finally:
-                    # Critical: Clear element to prevent memory leak
-                    elem.clear()
-                    while elem.getprevious() is not None:
-                        del elem.getparent()[0]
+        Args:
+            byte_stream: Iterable of XML byte chunks
+
+        Yields:
+            Dictionary with keys: id, title, text, namespace
+        """
+        parser = etree.XMLPullParser(**self._parser_options())
+
+        def events() -> Iterator[tuple]:
+            for chunk in byte_stream:
+                parser.feed(chunk)
+                yield from parser.read_events()
+            parser.close()
+            yield from parser.read_events()
+
+        try:
+            yield from self._take_pages(events())
 
         except etree.XMLSyntaxError as e:
             # Log but don't crash on malformed XML
             pass
 
+    def _parser_options(self) -> dict:
+        """Options shared by the file and push parsers."""
+        return {
+            "events": ("end",),
+            "tag": f"{self.NS}page",
+            # Some pages exceed libxml2's default 10 MB text node limit
+            "huge_tree": True,
+            # Skip past undefined entities and similar damage in dumps
+            "recover": True,
+        }
+
+    def _take_pages(self, events: Iterator[tuple]) -> Iterator[Dict[str, str]]:
+        """Yield included articles from page end events, freeing each page.
+
+        Each page is cleared once read, and the emptied pages before it are
+        detached from the root in batches, so memory stays flat without
+        walking previous siblings on every page.
+        """
+        self.pages_read = 0
+        for event, elem in events:
+            try:
+                article = self._extract_article(elem)
+            finally:
+                # Critical: Clear element to prevent memory leak
+                elem.clear(keep_tail=True)
+
+                # Only pages before this one are dropped: the parser may
+                # already have attached the pages it read ahead
+                self.pages_read += 1
+                root = elem.getparent()
+                if (
+                    root is not None
+                    and self.pages_read % _ROOT_CLEAR_EVERY_PAGES == 0
+                ):
+                    del root[: root.index(elem)]
+
+            if article and self._should_include(article):
+                yield article
+
     def _extract_article(self, elem: etree.Element) -> Optional[Dict[str, str]]:
         """Extract article data from page element.
 
@@ -73,14 +143,26 @@ class WikiXmlParser:
             Article dictionary or None if invalid
         """
         try:
-            page_id = elem.findtext(f".//{self.NS}id")
-            title = elem.findtext(f".//{self.NS}title")
-            namespace = elem.findtext(f".//{self.NS}ns")
-            text = elem.findtext(f".//{self.NS}revision/{self.NS}text")
-
-            # Check for redirect
-            redirect = elem.find(f".//{self.NS}redirect")
-            is_redirect = redirect is not None
+            page_id = title = namespace = text = None
+            is_redirect = False
+
+            # One pass over the page's direct children instead of a subtree
+            # search per field
+            for child in elem:
+                tag = child.tag
+                if tag == self._TAG_ID:
+                    page_id = child.text
+                elif tag == self._TAG_TITLE:
+                    title = child.text
+                elif tag == self._TAG_NS:
+                    namespace = child.text
+                elif tag == self._TAG_REDIRECT:
+                    is_redirect = True
+                elif tag == self._TAG_REVISION and text is None:
+                    for rev_child in child:
+                        if rev_child.tag == self._TAG_TEXT:
+                            text = rev_child.text or ""
+                            break
 
             if not all([page_id, title, text]):
                 return None
@@ -109,12 +191,11 @@ class WikiXmlParser:
         if article["namespace"] not in self.allowed_namespaces:
             return False
 
-        # Check redirect
-        if self.skip_redirects and article.get("is_redirect"):
-            return False
-
-        # Check if it's a redirect by text
-        if self.skip_redirects and is_redirect(article["text"]):
+        # Check redirect: dumps mark redirects with a <redirect> element, so
+        # the text is only scanned as a fallback for pages without one
+        if self.skip_redirects and (
+            article.get("is_redirect") or is_redirect(article["text"])
+        ):
             return False
 
         # Check disambiguation
@@ -135,15 +216,13 @@ def parse_wiki_xml_stream(byte_stream: Iterator[bytes]) -> Iterator[Dict[str, st
     Yields:
         Article dictionaries
     """
-    # Create a readable stream from iterator
-    from io import BytesIO
+    parser = WikiXmlParser()
+    yield from parser.parse_chunks(byte_stream)
 
-    # Collect all bytes (for simplicity, could be optimized)
-    data = b"".join(byte_stream)
-    stream = BytesIO(data)
 
-    parser = WikiXmlParser()
-    yield from parser.parse(stream)
+# Compiled once; matching is anchored so only the page prefix is scanned
+_REDIRECT_RE = re.compile(r"\s*#redirect", re.IGNORECASE)
+_DISAMBIG_RE = re.compile(r"\{\{\s*disambig(?:uation)?\s*\}\}", re.IGNORECASE)
 
 
 def is_redirect(text: str) -> bool:
@@ -157,7 +236,7 @@ def is_redirect(text: str) -> bool:
     """
     if not text:
         return False
-    return text.strip().lower().startswith("#redirect")
+    return _REDIRECT_RE.match(text) is not None
 
 
 def is_disambiguation(text: str, title: str = "") -> bool:
@@ -177,15 +256,4 @@ def is_disambiguation(text: str, title: str = "") -> bool:
         return False
 
     # Check for disambiguation templates
-    disambig_patterns = [
-        r"\{\{disambiguation\}\}",
-        r"\{\{disambig\}\}",
-        r"\{\{Disambiguation\}\}",
-    ]
-
-    text_lower = text.lower()
-    for pattern in disambig_patterns:
-        if re.search(pattern, text_lower):
-            return True
-
-    return False
+    return _DISAMBIG_RE.search(text) is not None
@@ -0,0 +1,122 @@
+"""On-demand access to bundle chunks."""
+import mmap
+import re
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from pocketwiki_shared.jsonl import scan_line_offsets
+
+# chunk_id and page_id values of a chunk record, quoted or bare
+_CHUNK_ID_RE = re.compile(rb'"chunk_id":\s*"?([^",}]*)')
+_PAGE_ID_RE = re.compile(rb'"page_id":\s*"?([^",}]*)')
+
+# Joined page texts kept per store; page reads cluster on a few hot pages
+_PAGE_TEXT_CACHE_SIZE = 256
+
+
+class ChunkStore:
+    """Chunks of a bundle, parsed from the memory-mapped JSONL on demand.
+
+    Only row numbers are kept in memory: chunk records stay on disk and are
+    decoded when they are looked up.
+
+    Attributes:
+        offsets: (offset, length) of each chunk record in the chunks file
+        row_chunk_ids: chunk_id of each row, in file order
+        chunks_by_id: Row of each chunk, by chunk_id
+        chunks_by_page: Rows of each page's chunks in file order, by page_id
+    """
+
+    def __init__(self, chunks_path: Path, index_path: Optional[Path] = None):
+        """Open a chunks file.
+
+        Args:
+            chunks_path: Path to chunks.jsonl
+            index_path: Path to the chunks.idx written with the bundle; the
+                chunks file is scanned for record boundaries if missing
+        """
+        self._file = open(chunks_path, "rb")
+        size = Path(chunks_path).stat().st_size
+        self._data = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        )
+
+        if index_path is not None and Path(index_path).exists():
+            if Path(index_path).stat().st_size:
+                self.offsets = np.memmap(index_path, dtype=np.int64, mode="r")
+                self.offsets = self.offsets.reshape(-1, 2)
+            else:
+                self.offsets = np.empty((0, 2), dtype=np.int64)
+        else:
+            self.offsets = scan_line_offsets(self._data)
+
+        self.row_chunk_ids: List[str] = []
+        self.chunks_by_id: Dict[str, int] = {}
+        self.chunks_by_page: Dict[str, np.ndarray] = {}
+        self._build_lookup()
+        # Per-store cache, so it is dropped with the store on bundle reload
+        self.page_text = lru_cache(maxsize=_PAGE_TEXT_CACHE_SIZE)(self._join_page)
+
+    def _build_lookup(self) -> None:
+        """Index rows by chunk_id and page_id without decoding records."""
+        pages = defaultdict(list)
+        for row, (offset, length) in enumerate(self.offsets.tolist()):
+            end = offset + length
+            chunk_id = self._field(_CHUNK_ID_RE, offset, end)
+            self.row_chunk_ids.append(chunk_id)
+            self.chunks_by_id[chunk_id] = row
+            pages[self._field(_PAGE_ID_RE, offset, end)].append(row)
+        # Most pages have a few chunks, so the narrowest row type that fits
+        # the store keeps the per-page arrays small
+        fits_int32 = len(self.offsets) <= np.iinfo(np.int32).max
+        row_dtype = np.int32 if fits_int32 else np.int64
+        self.chunks_by_page = {
+            page_id: np.array(rows, dtype=row_dtype) for page_id, rows in pages.items()
+        }
+
+    def _field(self, pattern: re.Pattern, start: int, end: int) -> str:
+        """Read a key's value from the record in data[start:end], or ""."""
+        match = pattern.search(self._data, start, end)
+        return match.group(1).decode() if match else ""
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def get_chunk(self, row: int) -> dict:
+        """Decode the chunk record at a row."""
+        offset, length = self.offsets[row]
+        return orjson.loads(self._data[offset : offset + length])
+
+    def get(self, chunk_id: str) -> Optional[dict]:
+        """Look up a chunk by chunk_id, or None if absent."""
+        row = self.chunks_by_id.get(chunk_id)
+        return None if row is None else self.get_chunk(row)
+
+    def page_chunks(self, page_id: str) -> List[dict]:
+        """Return a page's chunks in file order (empty if unknown)."""
+        rows = self.chunks_by_page.get(page_id)
+        if rows is None:
+            return []
+        return [self.get_chunk(row) for row in rows]
+
+    def _join_page(self, page_id: str) -> Optional[Tuple[str, str]]:
+        """Return a page's (title, text), or None if unknown.
+
+        Cached per page by page_text().
+        """
+        page_chunks = self.page_chunks(page_id)
+        if not page_chunks:
+            return None
+        title = page_chunks[0].get("page_title", "Unknown")
+        return title, "\n\n".join(c.get("text", "") for c in page_chunks)
+
+    def close(self) -> None:
+        """Release the mapped chunks file."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
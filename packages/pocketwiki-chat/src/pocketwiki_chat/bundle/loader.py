@@ -54,3 +54,7 @@ class BundleLoader:
     def get_chunks_path(self) -> Path:
         """Get path to chunks file."""
         return self.bundle_dir / "chunks.jsonl"
+
+    def get_chunks_index_path(self) -> Path:
+        """Get path to chunk offsets index (absent in older bundles)."""
+        return self.bundle_dir / "chunks.idx"
@@ -4,6 +4,7 @@ from pathlib import Path
 import click
 import uvicorn
 
+from .retrieval.fusion import FusionConfig
 from .web.app import create_app
 
 
@@ -17,7 +18,19 @@ def cli():
 @click.option("--bundle", required=True, help="Path to bundle directory")
 @click.option("--host", default="0.0.0.0", help="Host to bind to")
 @click.option("--port", default=8000, help="Port to bind to")
-def serve(bundle: str, host: str, port: int):
+@click.option(
+    "--fusion",
+    type=click.Choice(["rrf", "linear"]),
+    default="rrf",
+    help="How dense and sparse results are combined",
+)
+@click.option(
+    "--hybrid-alpha",
+    default=0.3,
+    type=float,
+    help="Weight of the sparse score in linear fusion",
+)
+def serve(bundle: str, host: str, port: int, fusion: str, hybrid_alpha: float):
     """Start the chat web server."""
     bundle_path = Path(bundle)
 
@@ -26,7 +39,10 @@ def serve(bundle: str, host: str, port: int):
         return
 
     click.echo(f"Loading bundle from {bundle_path}")
-    app = create_app(bundle_path)
+    app = create_app(
+        bundle_path,
+        fusion_config=FusionConfig(method=fusion, hybrid_alpha=hybrid_alpha),
+    )
 
     click.echo(f"Starting server on http://{host}:{port}")
     uvicorn.run(app, host=host, port=port)
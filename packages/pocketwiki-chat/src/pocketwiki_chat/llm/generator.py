@@ -1,16 +1,26 @@
 """LLM generator using llama-cpp-python."""
+import os
+import threading
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterator, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Distinct texts whose token counts are remembered per generator
+_TOKEN_COUNT_CACHE_SIZE = 16384
+
+# Sequences that end an answer, shared by every completion call
+_DEFAULT_STOP = ["Question:", "\n\nContext:"]
+
 
 class LLMGenerator:
     """LLM text generation using llama-cpp-python.
 
     Supports GGUF model files with streaming generation.
-    Model is loaded lazily on first use.
+    Model is loaded lazily on first use, or in the background from
+    construction when eager_load is set.
     """
 
     def __init__(
@@ -19,6 +29,10 @@ class LLMGenerator:
         n_ctx: int = 4096,
         n_gpu_layers: int = 0,
         verbose: bool = False,
+        n_threads: Optional[int] = None,
+        n_batch: int = 512,
+        use_mlock: bool = True,
+        eager_load: bool = False,
     ):
         """Initialize generator.
 
@@ -27,20 +41,50 @@ class LLMGenerator:
             n_ctx: Context window size (default 4096)
             n_gpu_layers: Number of layers to offload to GPU (0 = CPU only)
             verbose: Enable verbose llama.cpp output
+            n_threads: CPU threads for generation (default: all cores)
+            n_batch: Prompt tokens evaluated per batch
+            use_mlock: Lock model weights in RAM so they are never paged out
+            eager_load: Start loading the model in a background thread now
+                instead of on first use
         """
         self.model_path = Path(model_path)
         self.n_ctx = n_ctx
         self.n_gpu_layers = n_gpu_layers
         self.verbose = verbose
+        self.n_threads = n_threads or os.cpu_count()
+        self.n_batch = n_batch
+        self.use_mlock = use_mlock
         self._model: Optional["Llama"] = None
+        # Held while loading so a request waits for a background load in progress
+        self._load_lock = threading.Lock()
+
+        # Retrieved chunks recur across queries, so counts are cached
+        self.count_tokens = lru_cache(maxsize=_TOKEN_COUNT_CACHE_SIZE)(
+            self._count_tokens
+        )
+
+        if eager_load:
+            threading.Thread(
+                target=self._preload, name="llm-preload", daemon=True
+            ).start()
 
     @property
     def model(self) -> "Llama":
         """Get or load the LLM model (lazy loading)."""
         if self._model is None:
-            self._model = self._load_model()
+            with self._load_lock:
+                if self._model is None:
+                    self._model = self._load_model()
         return self._model
 
+    def _preload(self) -> None:
+        """Load the model ahead of the first request."""
+        try:
+            self.model
+        except Exception as e:
+            # The first request retries the load and surfaces the error
+            logger.warning(f"Background LLM load failed: {e}")
+
     def _load_model(self) -> "Llama":
         """Load the GGUF model.
 
@@ -63,13 +107,45 @@ class LLMGenerator:
                 model_path=str(self.model_path),
                 n_ctx=self.n_ctx,
                 n_gpu_layers=self.n_gpu_layers,
+                n_threads=self.n_threads,
+                n_batch=self.n_batch,
+                use_mmap=True,
+                use_mlock=self.use_mlock,
                 verbose=self.verbose,
             )
             logger.info("LLM model loaded successfully")
-            return model
         except Exception as e:
             raise RuntimeError(f"Failed to load model: {e}") from e
 
+        self._warm_preamble(model)
+        return model
+
+    def _warm_preamble(self, model: "Llama") -> None:
+        """Evaluate the shared prompt preamble once, ahead of any query.
+
+        llama.cpp reuses the KV cache for the longest token prefix a new
+        prompt shares with what it evaluated last, so every query skips
+        re-evaluating the preamble.
+        """
+        from pocketwiki_chat.llm.prompts import RAG_PREAMBLE
+
+        try:
+            # Tokenized exactly as create_completion tokenizes prompts
+            model.eval(model.tokenize(RAG_PREAMBLE.encode("utf-8"), special=True))
+        except Exception as e:
+            logger.warning(f"Prompt preamble warm-up failed: {e}")
+
+    def _count_tokens(self, text: str) -> int:
+        """Count the tokens text occupies in the model's context.
+
+        Args:
+            text: Text to tokenize
+
+        Returns:
+            Number of tokens, excluding the BOS token
+        """
+        return len(self.model.tokenize(text.encode("utf-8"), add_bos=False))
+
     def generate(
         self,
         context: str,
@@ -95,7 +171,7 @@ class LLMGenerator:
         prompt = format_rag_prompt(query=query, context=context)
 
         if stop is None:
-            stop = ["Question:", "\n\nContext:"]
+            stop = _DEFAULT_STOP
 
         response = self.model.create_completion(
             prompt=prompt,
@@ -132,7 +208,7 @@ class LLMGenerator:
         prompt = format_rag_prompt(query=query, context=context)
 
         if stop is None:
-            stop = ["Question:", "\n\nContext:"]
+            stop = _DEFAULT_STOP
 
         stream = self.model.create_completion(
             prompt=prompt,
@@ -1,5 +1,12 @@
 """RAG prompt templates."""
 
+# Invariant start of every RAG prompt; the model keeps it evaluated so each
+# query only pays for its own context and question
+RAG_PREAMBLE = """Answer the question based on the context provided. Include relevant information from the sources.
+
+Context:
+"""
+
 
 def format_rag_prompt(query: str, context: str) -> str:
     """Format RAG prompt for LLM.
@@ -11,10 +18,7 @@ def format_rag_prompt(query: str, context: str) -> str:
     Returns:
         Formatted prompt
     """
-    return f"""Answer the question based on the context provided. Include relevant information from the sources.
-
-Context:
-{context}
+    return f"""{RAG_PREAMBLE}{context}
 
 Question: {query}
 
@@ -1,19 +1,28 @@
 """Context assembly from chunks."""
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 
 
-def assemble_context(chunks: List[Dict], max_tokens: int = 4000) -> str:
+def assemble_context(
+    chunks: List[Dict],
+    max_tokens: int = 4000,
+    count_tokens: Optional[Callable[[str], int]] = None,
+) -> str:
     """Assemble context from chunks.
 
     Args:
         chunks: List of chunk dictionaries with text, page_title, etc.
         max_tokens: Maximum tokens for context
+        count_tokens: Exact token counter for the target LLM; when omitted,
+            the context is capped at max_tokens * 4 characters
 
     Returns:
         Assembled context string
     """
+    if count_tokens is None:
+        return _assemble_by_chars(chunks, max_tokens * 4)
+
     context_parts = []
-    total_length = 0
+    total_tokens = 0
 
     for chunk in chunks:
         text = chunk.get("text", "")
@@ -22,11 +31,40 @@ def assemble_context(chunks: List[Dict], max_tokens: int = 4000) -> str:
         # Format chunk with citation
         formatted = f"[{page_title}]\n{text}\n\n"
 
-        # Check if we exceed max tokens (approximate as characters / 4)
-        if total_length + len(formatted) > max_tokens * 4:
+        # Check if we exceed max tokens
+        n_tokens = count_tokens(formatted)
+        if total_tokens + n_tokens > max_tokens:
             break
 
         context_parts.append(formatted)
-        total_length += len(formatted)
+        total_tokens += n_tokens
 
     return "".join(context_parts)
+
+
+# Characters the citation format adds around a chunk: "[", "]\n" and "\n\n"
+_CITATION_CHARS = 5
+
+
+def _assemble_by_chars(chunks: List[Dict], budget: int) -> str:
+    """Assemble context within a character budget (about 4 per token).
+
+    The size of each formatted chunk is known from its parts, so chunks are
+    written straight into the output list and the one that would overflow
+    is never formatted.
+    """
+    parts = []
+    total_length = 0
+
+    for chunk in chunks:
+        text = chunk.get("text", "")
+        page_title = chunk.get("page_title", "Unknown")
+
+        need = len(page_title) + len(text) + _CITATION_CHARS
+        if total_length + need > budget:
+            break
+
+        parts += ("[", page_title, "]\n", text, "\n\n")
+        total_length += need
+
+    return "".join(parts)
@@ -1,6 +1,7 @@
 """Dense retrieval with FAISS."""
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 import faiss
 import numpy as np
@@ -9,23 +10,68 @@ from sentence_transformers import SentenceTransformer
 
 DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
+# Recent query embeddings kept per retriever
+_QUERY_CACHE_SIZE = 1024
+# Queries per forward pass in search_batch
+_ENCODE_BATCH_SIZE = 32
+# Default recall/latency trade-off for approximate indexes
+DEFAULT_NPROBE = 8
+DEFAULT_EF_SEARCH = 64
+
+
+def _unwrap_index(index: faiss.Index) -> faiss.Index:
+    """Return the index beneath any OPQ/PCA pre-transforms."""
+    while isinstance(index, faiss.IndexPreTransform):
+        index = faiss.downcast_index(index.index)
+    return index
+
 
 class DenseRetriever:
-    """Dense vector search with FAISS."""
+    """Dense vector search with FAISS.
+
+    The index must be an inner-product index over L2-normalized embeddings
+    (as built by the FAISS index stage), so scores are cosine similarities.
+    """
 
     def __init__(
         self,
         index_path: Path,
         model_name: str = DEFAULT_EMBEDDING_MODEL,
+        nprobe: int = DEFAULT_NPROBE,
+        ef_search: int = DEFAULT_EF_SEARCH,
     ):
         """Initialize retriever.
 
         Args:
             index_path: Path to FAISS index
             model_name: Sentence-transformers model name (default: all-MiniLM-L6-v2)
+            nprobe: Inverted lists scanned per query (IVF indexes only)
+            ef_search: Candidate list size per query (HNSW indexes only)
         """
         self.index = faiss.read_index(str(index_path))
         self.model = SentenceTransformer(model_name)
+        # Repeat queries skip the encoder forward pass
+        self._encode_query = lru_cache(maxsize=_QUERY_CACHE_SIZE)(self._encode)
+        self.set_search_params(nprobe=nprobe, ef_search=ef_search)
+
+    def set_search_params(
+        self, nprobe: Optional[int] = None, ef_search: Optional[int] = None
+    ) -> None:
+        """Set the approximate-search parameters of the loaded index.
+
+        Parameters that do not apply to the index type are ignored, so a
+        flat index stays exact.
+
+        Args:
+            nprobe: Inverted lists scanned per query (IVF indexes only)
+            ef_search: Candidate list size per query (HNSW indexes only)
+        """
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None and nprobe is not None:
+            ivf.nprobe = nprobe
+        base = _unwrap_index(self.index)
+        if isinstance(base, faiss.IndexHNSW) and ef_search is not None:
+            base.hnsw.efSearch = ef_search
 
     def search(self, query: str, k: int = 10) -> List[Dict]:
         """Search for similar chunks.
@@ -37,16 +83,57 @@ class DenseRetriever:
         Returns:
             List of results with chunk_id, score, rank
         """
-        # Encode query
-        query_vec = self.model.encode([query])[0].astype("float32")
-        query_vec = np.expand_dims(query_vec, axis=0)
+        ids, scores = self.search_arrays(query, k)
+        return self._format_results(ids, scores)
+
+    def search_arrays(self, query: str, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Search for similar chunks, returning columns instead of dicts.
+
+        Args:
+            query: Query text
+            k: Number of results
+
+        Returns:
+            Tuple of (chunk IDs as int64, scores as float32), best first
+        """
+        distances, indices = self.index.search(self._encode_query(query), k)
+        return indices[0], distances[0]
+
+    def search_batch(self, queries: List[str], k: int = 10) -> List[List[Dict]]:
+        """Search for similar chunks for several queries at once.
+
+        Args:
+            queries: Query texts
+            k: Number of results per query
+
+        Returns:
+            One result list per query, in input order
+        """
+        if not queries:
+            return []
+        distances, indices = self.index.search(self._encode(*queries), k)
+        return [
+            self._format_results(row_indices, row_distances)
+            for row_indices, row_distances in zip(indices, distances)
+        ]
 
-        # Search
-        distances, indices = self.index.search(query_vec, k)
+    def _encode(self, *queries: str) -> np.ndarray:
+        """Encode queries as normalized fp32 rows for the inner-product index."""
+        query_vecs = self.model.encode(
+            list(queries),
+            batch_size=_ENCODE_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype(np.float32, copy=False)
+        # Cached arrays are shared between calls
+        query_vecs.setflags(write=False)
+        return query_vecs
 
-        # Format results
+    @staticmethod
+    def _format_results(indices: np.ndarray, distances: np.ndarray) -> List[Dict]:
+        """Format one row of FAISS output as ranked results."""
         results = []
-        for rank, (idx, dist) in enumerate(zip(indices[0], distances[0])):
+        for rank, (idx, dist) in enumerate(zip(indices, distances)):
             results.append({
                 "chunk_id": str(idx),
                 "score": float(dist),
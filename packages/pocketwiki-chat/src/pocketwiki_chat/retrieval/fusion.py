@@ -1,5 +1,20 @@
-"""Reciprocal Rank Fusion for hybrid retrieval."""
-from typing import List, Dict
+"""Reciprocal Rank Fusion and linear score fusion for hybrid retrieval."""
+from typing import List, Dict, Literal, Optional, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from .fusion_numba import rrf_kernel
+
+
+class FusionConfig(BaseModel):
+    """How dense and sparse results are combined."""
+
+    # "rrf" uses ranks only; "linear" combines normalized scores
+    method: Literal["rrf", "linear"] = "rrf"
+    # Weight of the sparse score in linear fusion
+    hybrid_alpha: float = Field(default=0.3, ge=0.0)
+    rrf_k: int = Field(default=60, gt=0)
 
 
 def rrf_score(rank: int, k: int = 60) -> float:
@@ -16,49 +31,191 @@ def rrf_score(rank: int, k: int = 60) -> float:
 
 
 def rrf_fusion(
-    dense_results: List[Dict],
-    sparse_results: List[Dict],
+    dense_results: Union[List[Dict], np.ndarray],
+    sparse_results: Union[List[Dict], np.ndarray],
     k: int = 60,
 ) -> List[Dict]:
     """Fuse dense and sparse results using RRF.
 
     Args:
-        dense_results: Results from dense retrieval
-        sparse_results: Results from sparse retrieval
+        dense_results: Results from dense retrieval, as result dicts or as
+            an array of integer chunk IDs in rank order
+        sparse_results: Results from sparse retrieval, in either form
         k: RRF constant
 
     Returns:
         Fused and ranked results
     """
-    # Collect scores for each chunk
-    chunk_scores = {}
-
     # Process sparse first (convention: sparse gets priority in ties)
-    for result in sparse_results:
-        chunk_id = result["chunk_id"]
-        rank = result["rank"]
-        score = rrf_score(rank, k)
-        chunk_scores[chunk_id] = chunk_scores.get(chunk_id, 0.0) + score
-
-    for result in dense_results:
-        chunk_id = result["chunk_id"]
-        rank = result["rank"]
-        score = rrf_score(rank, k)
-        chunk_scores[chunk_id] = chunk_scores.get(chunk_id, 0.0) + score
+    columns = [_as_columns(sparse_results), _as_columns(dense_results)]
+    if all(c is not None for c in columns):
+        ids = np.concatenate([c[0] for c in columns])
+        ranks = np.concatenate([c[1] for c in columns])
+        labels = None
+    else:
+        # Other IDs are fused as integer codes and mapped back afterwards
+        results = _as_dicts(sparse_results) + _as_dicts(dense_results)
+        ids, labels = _factorize([str(r["chunk_id"]) for r in results])
+        ranks = np.fromiter(
+            (r["rank"] for r in results), dtype=np.float64, count=len(results)
+        )
+
+    if rrf_kernel is not None:
+        fused_ids, fused_scores = rrf_kernel(ids, ranks, float(k))
+    else:
+        fused_ids, fused_scores = _rrf_fusion_numpy(ids, ranks, k)
+
+    fused_ids = fused_ids.tolist()
+    if labels is None:
+        chunk_ids = [str(chunk_id) for chunk_id in fused_ids]
+    else:
+        chunk_ids = [labels[code] for code in fused_ids]
+    return [
+        {"chunk_id": chunk_id, "score": score, "rank": rank}
+        for rank, (chunk_id, score) in enumerate(zip(chunk_ids, fused_scores.tolist()))
+    ]
+
+
+def _rrf_fusion_numpy(
+    ids: np.ndarray, ranks: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse ranked ID columns with NumPy, best first."""
+    # Accumulate scores per unique chunk in one vectorized pass
+    unique_ids, inverse = np.unique(ids, return_inverse=True)
+    scores = np.zeros(len(unique_ids))
+    np.add.at(scores, inverse, 1.0 / (k + ranks))
 
     # Sort by score (descending), then by chunk_id (descending) for determinism
-    sorted_chunks = sorted(
-        chunk_scores.items(),
-        key=lambda x: (-x[1], -int(x[0]) if x[0].isdigit() else x[0]),
+    order = np.lexsort((-unique_ids, -scores))
+    return unique_ids[order], scores[order]
+
+
+def _as_columns(
+    results: Union[List[Dict], np.ndarray]
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Convert results to (int64 chunk IDs, float ranks) columns.
+
+    Returns None when a chunk ID isn't a canonical integer string, since
+    round-tripping it through an int would change it.
+    """
+    if isinstance(results, np.ndarray):
+        ids = results.astype(np.int64, copy=False)
+        return ids, np.arange(len(ids), dtype=np.float64)
+
+    chunk_ids = [result["chunk_id"] for result in results]
+    if not all(_is_canonical_int(c) for c in chunk_ids):
+        return None
+    ids = np.array([int(c) for c in chunk_ids], dtype=np.int64)
+    ranks = np.fromiter(
+        (result["rank"] for result in results), dtype=np.float64, count=len(results)
     )
+    return ids, ranks
 
-    # Format results
-    results = []
-    for rank, (chunk_id, score) in enumerate(sorted_chunks):
-        results.append({
-            "chunk_id": chunk_id,
-            "score": score,
-            "rank": rank,
-        })
 
+def _is_canonical_int(chunk_id) -> bool:
+    """Whether chunk_id is a digit string that int() round-trips exactly."""
+    return (
+        isinstance(chunk_id, str)
+        and chunk_id.isdigit()
+        and (len(chunk_id) == 1 or chunk_id[0] != "0")
+    )
+
+
+def _as_dicts(results: Union[List[Dict], np.ndarray]) -> List[Dict]:
+    """Convert results to result dicts."""
+    if isinstance(results, np.ndarray):
+        return [
+            {"chunk_id": str(chunk_id), "rank": rank}
+            for rank, chunk_id in enumerate(results)
+        ]
     return results
+
+
+def _factorize(chunk_ids: List[str]) -> Tuple[np.ndarray, List[str]]:
+    """Encode chunk IDs as int64 codes for the integer fusion kernels.
+
+    Codes are assigned so that descending code order is the tie-break order
+    for chunk IDs: numeric IDs descending, ahead of other IDs in ascending
+    order.
+
+    Returns:
+        Tuple of (code of each chunk ID, chunk ID of each code)
+    """
+    labels = sorted(set(chunk_ids), key=_tie_key, reverse=True)
+    codes = {chunk_id: code for code, chunk_id in enumerate(labels)}
+    ids = np.fromiter(
+        (codes[c] for c in chunk_ids), dtype=np.int64, count=len(chunk_ids)
+    )
+    return ids, labels
+
+
+def _tie_key(chunk_id: str) -> tuple:
+    """Sort key placing tied chunk IDs in output order."""
+    if chunk_id.isdigit():
+        return (0, -int(chunk_id), chunk_id)
+    return (1, chunk_id)
+
+
+def linear_fusion(
+    dense_results: Union[List[Dict], Tuple[np.ndarray, np.ndarray]],
+    sparse_results: List[Dict],
+    alpha: float = 0.3,
+) -> List[Dict]:
+    """Fuse dense and sparse results by a weighted sum of their scores.
+
+    Candidates missing from one list take that list's lowest score, then
+    each list's scores are z-normalized and combined as
+    alpha * sparse + dense.
+
+    Args:
+        dense_results: Results from dense retrieval, as result dicts or as
+            (integer chunk IDs, scores) columns
+        sparse_results: Result dicts from sparse retrieval
+        alpha: Weight of the sparse score
+
+    Returns:
+        Fused and ranked results
+    """
+    dense_scores = _score_map(dense_results)
+    sparse_scores = _score_map(sparse_results)
+    # Union of candidates, dense first so ties keep dense order
+    chunk_ids = list(dict.fromkeys([*dense_scores, *sparse_scores]))
+    if not chunk_ids:
+        return []
+
+    sparse_column = _normalized_column(sparse_scores, chunk_ids)
+    dense_column = _normalized_column(dense_scores, chunk_ids)
+    combined = alpha * sparse_column + dense_column
+    order = np.argsort(-combined, kind="stable")
+    return [
+        {"chunk_id": chunk_ids[i], "score": float(combined[i]), "rank": rank}
+        for rank, i in enumerate(order)
+    ]
+
+
+def _score_map(
+    results: Union[List[Dict], Tuple[np.ndarray, np.ndarray]]
+) -> Dict[str, float]:
+    """Map chunk IDs to scores, keeping the first score of a repeated ID."""
+    if isinstance(results, tuple):
+        ids, scores = results
+        # FAISS pads short result lists with ID -1
+        found = ids >= 0
+        pairs = zip(map(str, ids[found].tolist()), scores[found].tolist())
+    else:
+        pairs = ((str(r["chunk_id"]), float(r["score"])) for r in results)
+    score_map: Dict[str, float] = {}
+    for chunk_id, score in pairs:
+        score_map.setdefault(chunk_id, score)
+    return score_map
+
+
+def _normalized_column(scores: Dict[str, float], chunk_ids: List[str]) -> np.ndarray:
+    """Z-normalized scores of chunk_ids, substituting the minimum when missing."""
+    if not scores:
+        return np.zeros(len(chunk_ids))
+    fill = min(scores.values())
+    column = np.array([scores.get(c, fill) for c in chunk_ids], dtype=np.float64)
+    std = column.std()
+    column -= column.mean()
+    return column / std if std > 0 else column
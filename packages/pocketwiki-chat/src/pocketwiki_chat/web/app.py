@@ -1,17 +1,44 @@
 """FastAPI web application with SSE streaming."""
 import asyncio
-import json
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from functools import partial
 from pathlib import Path
-from typing import AsyncGenerator, Dict, Optional
+from typing import AsyncGenerator, AsyncIterator, Dict, Optional, Tuple
 
+import orjson
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
+from pocketwiki_chat.retrieval import fusion_numba
+from pocketwiki_chat.retrieval.context import assemble_context
+from pocketwiki_chat.retrieval.fusion import FusionConfig, linear_fusion, rrf_fusion
+
+try:
+    from sse_starlette.sse import EventSourceResponse
+
+    SSE_STARLETTE_AVAILABLE = True
+except ImportError:
+    SSE_STARLETTE_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Seconds between keep-alive comments on idle event streams
+_SSE_PING_SECONDS = 15
+# LLM tokens are coalesced into one event per this many tokens or seconds
+_TOKEN_BATCH_SIZE = 16
+_TOKEN_BATCH_SECONDS = 0.02
+# Search results kept per normalized query, and for how long
+_QUERY_CACHE_SIZE = 1024
+_QUERY_CACHE_TTL_SECONDS = 300
+
 
 class ChatRequest(BaseModel):
     """Chat request model."""
@@ -33,10 +60,24 @@ class AppState:
         self.dense_retriever = None
         self.sparse_retriever = None
         self.llm_generator = None
-        self.chunks: list = []
-        self.chunks_by_id: Dict[str, dict] = {}  # O(1) lookup index
-        self.chunks_by_page: Dict[str, list] = {}  # Group by page_id
+        self.chunk_store = None  # Chunks decoded on demand from disk
+        self.fusion_config = FusionConfig()
+        # (query, top_k) -> (time cached, results), least recently used first
+        self.query_cache: "OrderedDict[Tuple[str, int], Tuple[float, list]]" = (
+            OrderedDict()
+        )
+        # Searches in progress, shared by concurrent identical queries
+        self.pending_searches: Dict[Tuple[str, int], asyncio.Task] = {}
         self.is_loaded = False
+        # Blocking retrieval and context work runs here, off the event loop;
+        # at least two workers so a query's dense and sparse searches overlap
+        self.search_executor = ThreadPoolExecutor(
+            max_workers=max(2, os.cpu_count() or 1), thread_name_prefix="search"
+        )
+        # One model context can only run one generation at a time
+        self.llm_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="llm"
+        )
 
     def load_bundle(self, bundle_dir: Path, model_path: Optional[Path] = None) -> None:
         """Load bundle and initialize components."""
@@ -44,6 +85,7 @@ class AppState:
         from pocketwiki_chat.retrieval.dense import DenseRetriever
 
         self.bundle_dir = bundle_dir
+        self.query_cache.clear()
         loader = BundleLoader(bundle_dir)
 
         if not loader.validate():
@@ -66,30 +108,24 @@ class AppState:
             except Exception as e:
                 logger.warning(f"Failed to load sparse retriever: {e}")
 
-        # Load chunks and build indices
+        # Map chunks; only their row numbers are held in memory
         chunks_path = loader.get_chunks_path()
         if chunks_path.exists():
-            self.chunks = []
-            self.chunks_by_id = {}
-            self.chunks_by_page = {}
-            with open(chunks_path, encoding="utf-8") as f:
-                for line in f:
-                    chunk = json.loads(line)
-                    self.chunks.append(chunk)
-                    # Build O(1) lookup indices
-                    chunk_id = str(chunk.get("chunk_id", ""))
-                    page_id = str(chunk.get("page_id", ""))
-                    self.chunks_by_id[chunk_id] = chunk
-                    if page_id not in self.chunks_by_page:
-                        self.chunks_by_page[page_id] = []
-                    self.chunks_by_page[page_id].append(chunk)
-            logger.info(f"Loaded {len(self.chunks)} chunks with indices")
+            from pocketwiki_chat.bundle.chunks import ChunkStore
+
+            if self.chunk_store is not None:
+                self.chunk_store.close()
+            self.chunk_store = ChunkStore(
+                chunks_path, loader.get_chunks_index_path()
+            )
+            logger.info(f"Loaded {len(self.chunk_store)} chunks with indices")
 
         # Load LLM if model path provided
         if model_path and model_path.exists():
             try:
                 from pocketwiki_chat.llm.generator import LLMGenerator
-                self.llm_generator = LLMGenerator(model_path)
+                # Load in the background so the first query doesn't pay for it
+                self.llm_generator = LLMGenerator(model_path, eager_load=True)
                 logger.info(f"LLM generator configured: {model_path}")
             except Exception as e:
                 logger.warning(f"Failed to configure LLM: {e}")
@@ -104,12 +140,14 @@ app_state = AppState()
 def create_app(
     bundle_dir: Optional[Path] = None,
     model_path: Optional[Path] = None,
+    fusion_config: Optional[FusionConfig] = None,
 ) -> FastAPI:
     """Create FastAPI application.
 
     Args:
         bundle_dir: Path to bundle directory
         model_path: Path to LLM model file (GGUF)
+        fusion_config: How dense and sparse results are combined (default RRF)
 
     Returns:
         FastAPI app
@@ -121,10 +159,16 @@ def create_app(
     if static_dir.exists():
         app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
+    if fusion_config is not None:
+        app_state.fusion_config = fusion_config
+
     # Load bundle if provided
     if bundle_dir:
         app_state.load_bundle(bundle_dir, model_path)
 
+    # Compile the fusion kernel before the first request
+    fusion_numba.warm_up()
+
     @app.get("/", response_class=HTMLResponse)
     async def root():
         """Serve main page."""
@@ -156,12 +200,22 @@ def create_app(
     @app.post("/api/chat/stream")
     async def chat_stream(request: ChatRequest):
         """Chat endpoint with SSE streaming."""
+        # Keep reverse proxies from buffering the token stream
+        headers = {"X-Accel-Buffering": "no"}
+        if SSE_STARLETTE_AVAILABLE:
+            return EventSourceResponse(
+                _stream_chat(request.query),
+                ping=_SSE_PING_SECONDS,
+                sep="\n",
+                headers=headers,
+            )
         return StreamingResponse(
-            _stream_chat(request.query),
+            _sse_frames(_stream_chat(request.query)),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
+                **headers,
             },
         )
 
@@ -174,15 +228,11 @@ def create_app(
     @app.get("/api/page/{page_id}")
     async def get_page(page_id: str):
         """Get full page content."""
-        # Use indexed lookup O(1) instead of linear search O(n)
-        page_chunks = app_state.chunks_by_page.get(page_id, [])
-
-        if not page_chunks:
+        store = app_state.chunk_store
+        page = store.page_text(page_id) if store is not None else None
+        if page is None:
             raise HTTPException(status_code=404, detail="Page not found")
-
-        # Combine chunks for full page
-        text = "\n\n".join(c.get("text", "") for c in page_chunks)
-        title = page_chunks[0].get("page_title", "Unknown")
+        title, text = page
 
         return {
             "page_id": page_id,
@@ -199,45 +249,176 @@ def create_app(
             "dense_retriever": app_state.dense_retriever is not None,
             "sparse_retriever": app_state.sparse_retriever is not None,
             "llm_available": app_state.llm_generator is not None,
-            "chunks_count": len(app_state.chunks),
+            "chunks_count": len(app_state.chunk_store or ()),
         }
 
     return app
 
 
-async def _search_sources(query: str, top_k: int = 10) -> list:
-    """Search for relevant sources."""
-    from pocketwiki_chat.retrieval.fusion import rrf_fusion
+async def _run_blocking(executor: ThreadPoolExecutor, func, *args, **kwargs):
+    """Run a blocking call in an executor without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
 
-    dense_results = []
-    sparse_results = []
 
-    # Dense search
-    if app_state.dense_retriever:
-        try:
-            dense_results = app_state.dense_retriever.search(query, top_k=top_k)
-        except Exception as e:
-            logger.warning(f"Dense search failed: {e}")
+class _IterationEnd:
+    """Last item queued by _iterate_blocking, carrying the iterator's error."""
+
+    def __init__(self, error: Optional[Exception] = None):
+        self.error = error
+
+
+async def _iterate_blocking(
+    executor: ThreadPoolExecutor, func, *args, **kwargs
+) -> AsyncIterator:
+    """Iterate a blocking iterator in an executor without stalling the event loop.
+
+    The iterator returned by func(*args, **kwargs) is advanced in a worker
+    thread that hands each item to the loop through a queue. Exceptions it
+    raises are re-raised here, and closing this iterator early stops the
+    worker at its next item.
+    """
+    loop = asyncio.get_running_loop()
+    # Unbounded: a blocked producer would hold its worker after a disconnect
+    queue: asyncio.Queue = asyncio.Queue()
+    stopped = threading.Event()
 
-    # Sparse search
-    if app_state.sparse_retriever:
+    def produce() -> None:
         try:
-            sparse_results = app_state.sparse_retriever.search(query, top_k=top_k)
+            for item in func(*args, **kwargs):
+                if stopped.is_set():
+                    return
+                loop.call_soon_threadsafe(queue.put_nowait, item)
         except Exception as e:
-            logger.warning(f"Sparse search failed: {e}")
+            loop.call_soon_threadsafe(queue.put_nowait, _IterationEnd(e))
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, _IterationEnd())
+
+    producer = loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if isinstance(item, _IterationEnd):
+                if item.error is not None:
+                    raise item.error
+                break
+            yield item
+        await producer
+    finally:
+        stopped.set()
+
+
+def _dense_search(retriever, chunk_store, query: str, top_k: int) -> list:
+    """Dense search, with hits named by their chunk records' chunk_id.
+
+    FAISS returns rows of chunks.jsonl, while sparse search and the chunk
+    store key chunks by chunk_id; naming dense hits the same way lets both
+    retrievers fuse in one ID space.
+    """
+    rows, scores = retriever.search_arrays(query, k=top_k)
+    if chunk_store is None:
+        return []
+    num_rows = len(chunk_store)
+    # FAISS pads short result lists with row -1
+    return [
+        {"chunk_id": chunk_store.row_chunk_ids[row], "score": score, "rank": rank}
+        for rank, (row, score) in enumerate(zip(rows.tolist(), scores.tolist()))
+        if 0 <= row < num_rows
+    ]
+
+
+async def _no_results(empty):
+    """Stand-in search for a retriever that isn't loaded."""
+    return empty
+
+
+def _normalize_query(query: str) -> str:
+    """Normalize case and whitespace so equivalent queries share a cache entry."""
+    return " ".join(query.lower().split())
+
+
+async def _search_sources(query: str, top_k: int = 10) -> list:
+    """Search for relevant sources, reusing recent results for repeat queries.
+
+    Concurrent identical queries share one search. Results are cached only
+    when every loaded retriever succeeded.
+    """
+    key = (_normalize_query(query), top_k)
+    cached = app_state.query_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < _QUERY_CACHE_TTL_SECONDS:
+        app_state.query_cache.move_to_end(key)
+        return cached[1]
+
+    task = app_state.pending_searches.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_retrieve_sources(query, top_k))
+        app_state.pending_searches[key] = task
+        task.add_done_callback(lambda _: app_state.pending_searches.pop(key, None))
+
+    # Shielded so one cancelled request doesn't cancel the shared search
+    results, complete = await asyncio.shield(task)
+    if complete:
+        app_state.query_cache[key] = (time.monotonic(), results)
+        app_state.query_cache.move_to_end(key)
+        if len(app_state.query_cache) > _QUERY_CACHE_SIZE:
+            app_state.query_cache.popitem(last=False)
+    return results
+
+
+async def _retrieve_sources(query: str, top_k: int) -> Tuple[list, bool]:
+    """Search for relevant sources.
+
+    Returns:
+        Tuple of (results, whether every loaded retriever succeeded)
+    """
+    # Run both retrievers concurrently in worker threads so neither blocks
+    # the event loop and latency is the slower search, not the sum
+    executor = app_state.search_executor
+    dense_task = (
+        _run_blocking(
+            executor,
+            _dense_search,
+            app_state.dense_retriever,
+            app_state.chunk_store,
+            query,
+            top_k,
+        )
+        if app_state.dense_retriever
+        else _no_results([])
+    )
+    sparse_task = (
+        _run_blocking(executor, app_state.sparse_retriever.search, query, k=top_k)
+        if app_state.sparse_retriever
+        else _no_results([])
+    )
+    dense_results, sparse_results = await asyncio.gather(
+        dense_task, sparse_task, return_exceptions=True
+    )
+    complete = True
+    if isinstance(dense_results, Exception):
+        logger.warning(f"Dense search failed: {dense_results}")
+        dense_results = []
+        complete = False
+    if isinstance(sparse_results, Exception):
+        logger.warning(f"Sparse search failed: {sparse_results}")
+        sparse_results = []
+        complete = False
 
     # Fuse results
-    if dense_results or sparse_results:
-        fused = rrf_fusion(dense_results, sparse_results)
-    else:
+    fusion = app_state.fusion_config
+    if not (dense_results or sparse_results):
         fused = []
+    elif fusion.method == "linear":
+        fused = linear_fusion(dense_results, sparse_results, alpha=fusion.hybrid_alpha)
+    else:
+        fused = rrf_fusion(dense_results, sparse_results, k=fusion.rrf_k)
 
     # Enrich with chunk data using indexed lookup O(1)
     results = []
     for item in fused[:top_k]:
         chunk_id = str(item["chunk_id"])
         # Use indexed lookup instead of linear search
-        chunk = app_state.chunks_by_id.get(chunk_id)
+        chunk = app_state.chunk_store.get(chunk_id) if app_state.chunk_store else None
 
         if chunk:
             results.append({
@@ -261,21 +442,38 @@ async def _search_sources(query: str, top_k: int = 10) -> list:
             }
         ]
 
-    return results
+    return results, complete
+
+
+def _context_token_counter():
+    """Exact token counter of the loaded LLM, or None to approximate."""
+    generator = app_state.llm_generator
+    # Never block a request on a model that is still loading
+    if generator is not None and generator.is_loaded():
+        return generator.count_tokens
+    return None
 
 
 async def _generate_response(query: str, sources: list) -> str:
     """Generate LLM response."""
-    from pocketwiki_chat.retrieval.context import assemble_context
-
     if not sources:
         return "I couldn't find any relevant information for your query."
 
-    context = assemble_context(sources)
+    context = await _run_blocking(
+        app_state.search_executor,
+        assemble_context,
+        sources,
+        count_tokens=_context_token_counter(),
+    )
 
     if app_state.llm_generator:
         try:
-            return app_state.llm_generator.generate(context=context, query=query)
+            return await _run_blocking(
+                app_state.llm_executor,
+                app_state.llm_generator.generate,
+                context=context,
+                query=query,
+            )
         except Exception as e:
             logger.error(f"LLM generation failed: {e}")
             return f"Error generating response: {e}"
@@ -284,49 +482,87 @@ async def _generate_response(query: str, sources: list) -> str:
         return f"Based on the sources I found:\n\n{context[:1000]}..."
 
 
+def _dumps(payload: dict) -> str:
+    """Serialize an SSE event payload with orjson."""
+    return orjson.dumps(payload).decode()
+
+
+async def _sse_frames(events: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    """Frame event payloads as SSE data lines, without sse-starlette."""
+    async for data in events:
+        yield f"data: {data}\n\n"
+
+
 async def _stream_chat(query: str) -> AsyncGenerator[str, None]:
-    """Stream chat response via SSE."""
-    from pocketwiki_chat.retrieval.context import assemble_context
+    """Stream chat response as SSE event payloads.
 
+    Yields the data of each event; framing is left to the response. Events
+    are JSON objects: "sources", then LLM output as "tokens" lists (batched
+    by count and time) or "token" strings without an LLM, or "error";
+    the stream ends with "[DONE]".
+    """
     try:
         # First, search for sources
         sources = await _search_sources(query)
 
         # Send sources event
-        yield f"data: {json.dumps({'type': 'sources', 'sources': sources[:5]})}\n\n"
+        yield _dumps({'type': 'sources', 'sources': sources[:5]})
         await asyncio.sleep(0)  # Allow event loop to send
 
         if not sources:
             msg = "I couldn't find any relevant information."
-            yield f"data: {json.dumps({'type': 'token', 'token': msg})}\n\n"
-            yield "data: [DONE]\n\n"
+            yield _dumps({'type': 'token', 'token': msg})
+            yield "[DONE]"
             return
 
-        context = assemble_context(sources)
+        context = await _run_blocking(
+            app_state.search_executor,
+            assemble_context,
+            sources,
+            count_tokens=_context_token_counter(),
+        )
 
         # Stream LLM response
         if app_state.llm_generator:
+            loop = asyncio.get_running_loop()
+            buf = []
             try:
-                for token in app_state.llm_generator.stream_generate(
-                    context=context, query=query
-                ):
-                    yield f"data: {json.dumps({'type': 'token', 'token': token})}\n\n"
-                    await asyncio.sleep(0)  # Allow event loop to send
+                last_flush = loop.time()
+                tokens = _iterate_blocking(
+                    app_state.llm_executor,
+                    app_state.llm_generator.stream_generate,
+                    context=context,
+                    query=query,
+                )
+                async with aclosing(tokens):
+                    async for token in tokens:
+                        buf.append(token)
+                        if (
+                            len(buf) >= _TOKEN_BATCH_SIZE
+                            or loop.time() - last_flush > _TOKEN_BATCH_SECONDS
+                        ):
+                            yield _dumps({'type': 'tokens', 'tokens': buf})
+                            buf = []
+                            last_flush = loop.time()
+                if buf:
+                    yield _dumps({'type': 'tokens', 'tokens': buf})
             except Exception as e:
                 logger.error(f"LLM streaming failed: {e}")
-                yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+                if buf:
+                    yield _dumps({'type': 'tokens', 'tokens': buf})
+                yield _dumps({'type': 'error', 'message': str(e)})
         else:
             # No LLM, send context as response
             response = f"Based on the sources I found:\n\n{context[:1500]}..."
             # Send in chunks to simulate streaming
             for i in range(0, len(response), 20):
                 chunk = response[i : i + 20]
-                yield f"data: {json.dumps({'type': 'token', 'token': chunk})}\n\n"
+                yield _dumps({'type': 'token', 'token': chunk})
                 await asyncio.sleep(0.01)
 
-        yield "data: [DONE]\n\n"
+        yield "[DONE]"
 
     except Exception as e:
         logger.error(f"Stream chat error: {e}")
-        yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
-        yield "data: [DONE]\n\n"
+        yield _dumps({'type': 'error', 'message': str(e)})
+        yield "[DONE]"
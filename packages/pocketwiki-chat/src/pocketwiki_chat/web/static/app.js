@@ -162,6 +162,11 @@ async function sendMessage(query) {
                                 fullResponse += parsed.token;
                                 assistantMsg.classList.remove('loading');
                                 updateAssistantMessage(assistantMsg, fullResponse);
+                            } else if (parsed.type === 'tokens') {
+                                // LLM tokens arrive batched, in order
+                                fullResponse += parsed.tokens.join('');
+                                assistantMsg.classList.remove('loading');
+                                updateAssistantMessage(assistantMsg, fullResponse);
                             } else if (parsed.type === 'error') {
                                 throw new Error(parsed.message);
                             }
@@ -6,6 +6,7 @@ from .schemas import (
     StageConfig,
     ChunkConfig,
     FilterConfig,
+    ChunkFilterConfig,
     EmbedConfig,
     FAISSConfig,
     PackageConfig,
@@ -20,6 +21,7 @@ __all__ = [
     "Stage",
     "ChunkConfig",
     "FilterConfig",
+    "ChunkFilterConfig",
     "EmbedConfig",
     "FAISSConfig",
     "PackageConfig",
@@ -1,18 +1,35 @@
 """Base Stage class for pipeline."""
 import hashlib
 import json
+import logging
+import os
+import re
 import time
 from abc import ABC, abstractmethod
 from datetime import datetime, timezone
+from functools import cached_property
 from pathlib import Path
 from typing import Optional
 
+from .formatting import format_duration, format_size
+from .hashing import fingerprint_file, hash_bytes
 from .schemas import StageState, StageConfig
 
+logger = logging.getLogger(__name__)
+
+# Boundaries before each inner capital, for CamelCase -> snake_case
+_CAMEL_RE = re.compile(r"(?<!^)(?=[A-Z])")
+
+# Stage name of each Stage subclass, computed once per class
+_STAGE_NAMES: dict[type, str] = {}
+
 
 class Stage(ABC):
     """Base class for pipeline stages."""
 
+    # Input hash computed once by execute() and reused until it returns
+    _cached_input_hash: Optional[str] = None
+
     def __init__(self, config: StageConfig, work_dir: Path):
         """Initialize stage.
 
@@ -33,6 +50,45 @@ class Stage(ABC):
         """
         pass
 
+    def _input_hash(self) -> str:
+        """Return the input hash, reusing the one computed by execute()."""
+        if self._cached_input_hash is not None:
+            return self._cached_input_hash
+        return self.compute_input_hash()
+
+    @cached_property
+    def _config_json(self) -> bytes:
+        """Serialized stage config; configs don't change during a run."""
+        return self.config.model_dump_json().encode()
+
+    @cached_property
+    def _config_digest(self) -> str:
+        return hash_bytes(self._config_json)[:8]
+
+    def config_hash(self) -> str:
+        """Short digest of the stage config, computed once per stage.
+
+        Returns:
+            8-character hex digest of the serialized config
+        """
+        return self._config_digest
+
+    def _hash_files(self, paths: list[Path]) -> str:
+        """Input hash from file fingerprints plus the config digest.
+
+        Files are fingerprinted from their size, mtime and sampled bytes
+        rather than hashed in full, so multi-GB inputs cost the same to
+        check as small ones.
+
+        Args:
+            paths: Input files of the stage
+
+        Returns:
+            Fingerprints and config digest joined with "-"
+        """
+        fingerprints = [fingerprint_file(Path(p)) for p in paths]
+        return "-".join([*fingerprints, self.config_hash()])
+
     @abstractmethod
     def run(self) -> None:
         """Execute the stage logic."""
@@ -44,11 +100,12 @@ class Stage(ABC):
         Returns:
             Snake-case stage name
         """
-        name = self.__class__.__name__
-        # Convert CamelCase to snake_case
-        import re
-
-        return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+        cls = self.__class__
+        name = _STAGE_NAMES.get(cls)
+        if name is None:
+            # Convert CamelCase to snake_case
+            name = _STAGE_NAMES[cls] = _CAMEL_RE.sub("_", cls.__name__).lower()
+        return name
 
     def get_state_file(self) -> Path:
         """Get path to state file.
@@ -77,7 +134,7 @@ class Stage(ABC):
             return None
 
         try:
-            return StageState.model_validate_json(state_file.read_text())
+            return StageState.model_validate_json(state_file.read_bytes())
         except Exception:
             return None
 
@@ -85,15 +142,26 @@ class Stage(ABC):
         """Persist stage completion state."""
         state = StageState(
             stage_name=self.get_stage_name(),
-            input_hash=self.compute_input_hash(),
+            input_hash=self._input_hash(),
             completed=True,
             completed_at=datetime.now(timezone.utc).isoformat(),
             output_files=[str(f) for f in self.get_output_files()],
         )
 
+        # Write to a temp file and rename, so a crash mid-write can't leave a
+        # truncated state file behind
         state_file = self.get_state_file()
         state_file.parent.mkdir(parents=True, exist_ok=True)
-        state_file.write_text(state.model_dump_json(indent=2))
+        temp_file = state_file.with_suffix(".json.tmp")
+        try:
+            with open(temp_file, "wb") as f:
+                f.write(state.model_dump_json().encode())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, state_file)
+        except BaseException:
+            temp_file.unlink(missing_ok=True)
+            raise
 
     def should_skip(self) -> bool:
         """Check if stage should be skipped (already completed with same inputs).
@@ -109,8 +177,7 @@ class Stage(ABC):
             return False
 
         # Check if input hash matches
-        current_hash = self.compute_input_hash()
-        if state.input_hash != current_hash:
+        if state.input_hash != self._input_hash():
             return False
 
         # Check if output files exist
@@ -120,73 +187,66 @@ class Stage(ABC):
 
         return True
 
-    def _log_config_summary(self) -> None:
-        """Log configuration summary for this stage."""
-        stage_name = self.get_stage_name()
-        config_dict = self.config.model_dump()
-        print(f"  Config:")
-        for key, value in config_dict.items():
+    def _config_summary_lines(self) -> list[str]:
+        """Format the configuration summary, one line per setting."""
+        lines = ["  Config:"]
+        for key, value in self.config.model_dump().items():
             # Truncate long values
             str_val = str(value)
             if len(str_val) > 60:
                 str_val = str_val[:57] + "..."
-            print(f"    {key}: {str_val}")
-
-    def _format_duration(self, seconds: float) -> str:
-        """Format duration in human-readable format."""
-        if seconds < 60:
-            return f"{seconds:.1f}s"
-        elif seconds < 3600:
-            minutes = int(seconds // 60)
-            secs = seconds % 60
-            return f"{minutes}m {secs:.1f}s"
-        else:
-            hours = int(seconds // 3600)
-            minutes = int((seconds % 3600) // 60)
-            return f"{hours}h {minutes}m"
+            lines.append(f"    {key}: {str_val}")
+        return lines
 
     def execute(self) -> None:
         """Execute stage if needed, handling skip logic."""
+        # Hash inputs once; should_skip() and persist_state() reuse the hash
+        self._cached_input_hash = self.compute_input_hash()
+        try:
+            self._execute(self._cached_input_hash)
+        finally:
+            self._cached_input_hash = None
+
+    def _execute(self, input_hash: str) -> None:
+        """Run or skip the stage, logging the decision and results."""
         stage_name = self.get_stage_name()
 
-        # Log stage start with config
-        print(f"\n{'='*60}")
-        print(f"Stage: {stage_name}")
-        print(f"{'='*60}")
-        self._log_config_summary()
+        # Each block of log lines is emitted as a single record
+        lines = [f"\n{'='*60}", f"Stage: {stage_name}", "=" * 60]
+        lines.extend(self._config_summary_lines())
 
-        # Compute and log input hash
-        input_hash = self.compute_input_hash()
-        print(f"  Input hash: {input_hash}")
+        lines.append(f"  Input hash: {input_hash}")
 
         # Check skip logic with detailed logging
         state = self.load_state()
         if state is not None:
-            print(f"  Previous state found:")
-            print(f"    Completed: {state.completed}")
-            print(f"    Previous hash: {state.input_hash}")
-            print(f"    Hash match: {state.input_hash == input_hash}")
+            lines.append(f"  Previous state found:")
+            lines.append(f"    Completed: {state.completed}")
+            lines.append(f"    Previous hash: {state.input_hash}")
+            lines.append(f"    Hash match: {state.input_hash == input_hash}")
 
         if self.should_skip():
-            print(f"\n→ SKIPPING: Stage already completed with matching inputs")
+            lines.append("\n→ SKIPPING: Stage already completed with matching inputs")
             if state:
-                print(f"  Completed at: {state.completed_at}")
+                lines.append(f"  Completed at: {state.completed_at}")
+            logger.info("\n".join(lines))
             return
 
         # Log why we're running
         if state is None:
-            print(f"\n→ RUNNING: No previous state found")
+            lines.append(f"\n→ RUNNING: No previous state found")
         elif not state.completed:
-            print(f"\n→ RUNNING: Previous run was incomplete")
+            lines.append(f"\n→ RUNNING: Previous run was incomplete")
         elif state.input_hash != input_hash:
-            print(f"\n→ RUNNING: Input hash changed")
+            lines.append(f"\n→ RUNNING: Input hash changed")
         else:
             missing = [f for f in self.get_output_files() if not f.exists()]
-            print(f"\n→ RUNNING: Output files missing: {missing}")
+            lines.append(f"\n→ RUNNING: Output files missing: {missing}")
 
         # Execute with timing
         self._start_time = time.time()
-        print(f"  Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        lines.append(f"  Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info("\n".join(lines))
 
         self.run()
 
@@ -194,24 +254,16 @@ class Stage(ABC):
         duration = time.time() - self._start_time
         self.persist_state()
 
-        print(f"\n✓ {stage_name} COMPLETED")
-        print(f"  Duration: {self._format_duration(duration)}")
-        print(f"  Output files:")
+        lines = [
+            f"\n✓ {stage_name} COMPLETED",
+            f"  Duration: {format_duration(duration)}",
+            f"  Output files:",
+        ]
         for output_file in self.get_output_files():
             if output_file.exists():
                 size = output_file.stat().st_size
-                size_str = self._format_size(size)
-                print(f"    {output_file.name}: {size_str}")
+                size_str = format_size(size)
+                lines.append(f"    {output_file.name}: {size_str}")
             else:
-                print(f"    {output_file.name}: (not created)")
-
-    def _format_size(self, size: int) -> str:
-        """Format file size in human-readable format."""
-        if size < 1024:
-            return f"{size} B"
-        elif size < 1024 * 1024:
-            return f"{size / 1024:.1f} KB"
-        elif size < 1024 * 1024 * 1024:
-            return f"{size / (1024 * 1024):.1f} MB"
-        else:
-            return f"{size / (1024 * 1024 * 1024):.2f} GB"
+                lines.append(f"    {output_file.name}: (not created)")
+        logger.info("\n".join(lines))
@@ -0,0 +1,26 @@
+"""Human-readable formatting for pipeline reports."""
+
+# (divisor, format) per power of 1024, indexed by the exponent of the size
+_SIZE_UNITS = (
+    (1, "{:.0f} B"),
+    (1 << 10, "{:.1f} KB"),
+    (1 << 20, "{:.1f} MB"),
+    (1 << 30, "{:.2f} GB"),
+)
+
+
+def format_size(size: int) -> str:
+    """Format a byte count, e.g. "1.5 MB"."""
+    exponent = max(size.bit_length() - 1, 0) // 10
+    divisor, fmt = _SIZE_UNITS[min(exponent, len(_SIZE_UNITS) - 1)]
+    return fmt.format(size / divisor)
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration, e.g. "2m 3.0s"."""
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, secs = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{int(minutes)}m {secs:.1f}s"
+    return f"{int(minutes // 60)}h {int(minutes % 60)}m"
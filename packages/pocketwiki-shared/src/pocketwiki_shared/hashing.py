@@ -0,0 +1,74 @@
+"""Cheap file fingerprints for stage cache validation."""
+import hashlib
+import os
+from pathlib import Path
+
+try:
+    import xxhash
+
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    from blake3 import blake3
+
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+# Bytes sampled from each end of a file
+SAMPLE_BYTES = 1 << 20
+
+
+def _new_hasher():
+    """Return a fresh non-cryptographic-grade hasher, fastest available first.
+
+    Prefers xxHash (XXH3-128), then BLAKE3, then the stdlib's BLAKE2b.
+    """
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_128()
+    if BLAKE3_AVAILABLE:
+        return blake3()
+    return hashlib.blake2b(digest_size=16)
+
+
+def hash_bytes(data: bytes) -> str:
+    """Hex digest of data, using xxHash or BLAKE3 when installed.
+
+    Args:
+        data: Bytes to hash
+
+    Returns:
+        Hex digest string
+    """
+    hasher = _new_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def fingerprint_file(path: Path) -> str:
+    """Fingerprint a file from its size, mtime and sampled head/tail bytes.
+
+    Runs in constant time regardless of file size, so it is safe to call on
+    multi-GB intermediate files every time a stage checks its cache.
+
+    Args:
+        path: File to fingerprint
+
+    Returns:
+        8-character hex digest, or "none" if the file does not exist
+    """
+    path = Path(path)
+    if not path.exists():
+        return "none"
+
+    st = path.stat()
+    hasher = _new_hasher()
+    hasher.update(f"{st.st_size}:{st.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        hasher.update(f.read(SAMPLE_BYTES))
+        if st.st_size > SAMPLE_BYTES:
+            f.seek(-min(SAMPLE_BYTES, st.st_size - SAMPLE_BYTES), os.SEEK_END)
+            hasher.update(f.read())
+    return hasher.hexdigest()[:8]
@@ -0,0 +1,30 @@
+"""Record boundaries of JSONL files."""
+import numpy as np
+
+# Bytes scanned per newline search
+_SCAN_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def scan_line_offsets(data) -> np.ndarray:
+    """Locate the records of a JSONL buffer.
+
+    Args:
+        data: Bytes-like JSONL content, e.g. a memory-mapped file
+
+    Returns:
+        int64 array of (offset, length) rows, one per non-empty line
+    """
+    size = len(data)
+    ends = [
+        np.flatnonzero(
+            np.frombuffer(data[i : i + _SCAN_BLOCK_BYTES], dtype=np.uint8) == 0x0A
+        )
+        + i
+        for i in range(0, size, _SCAN_BLOCK_BYTES)
+    ]
+    ends = np.concatenate(ends) if ends else np.empty(0, dtype=np.int64)
+    if size and data[size - 1 : size] != b"\n":
+        ends = np.append(ends, size)
+    starts = np.concatenate(([0], ends[:-1] + 1)) if len(ends) else ends
+    offsets = np.column_stack((starts, ends - starts)).astype(np.int64)
+    return offsets[offsets[:, 1] > 0]
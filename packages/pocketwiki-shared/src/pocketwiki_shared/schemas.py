@@ -29,6 +29,8 @@ class StreamParseCheckpoint(BaseModel):
     last_checkpoint_time: str  # ISO format datetime
     checkpoint_version: int = 1
     config_hash: Optional[str] = None
+    # Set on the final checkpoint once the whole source has been parsed
+    completed: bool = False
 
 
 class StreamParseConfig(BaseModel):
@@ -44,8 +46,11 @@ class StreamParseConfig(BaseModel):
     checkpoint_every_bytes: int = Field(default=104857600, ge=1)  # 100 MB
 
     # HTTP streaming
-    http_chunk_size: int = Field(default=1048576, ge=1024)  # 1 MB
+    http_chunk_size: int = Field(default=4 * 1024 * 1024, ge=1024)  # 4 MB
     http_timeout: int = Field(default=300, ge=1)  # 5 minutes
+    # Multistream index of the dump; enables parallel bz2 decompression
+    source_index_url: Optional[FileOrHttpUrl] = None
+    download_workers: int = Field(default=8, ge=1)
 
     # Retry behavior
     max_retries: int = Field(default=5, ge=0)
@@ -85,6 +90,7 @@ class ChunkConfig(StageConfig):
     output_dir: str
     max_chunk_tokens: int = Field(default=512, ge=1)
     overlap_tokens: int = Field(default=50, ge=0)
+    num_workers: int = Field(default=0, ge=0)  # 0 = one per CPU
 
 
 class FilterConfig(StageConfig):
@@ -96,6 +102,13 @@ class FilterConfig(StageConfig):
     max_chunk_length: int = Field(default=10000, ge=1)
 
 
+class ChunkFilterConfig(ChunkConfig):
+    """Configuration for the fused chunk + filter stage."""
+
+    min_chunk_length: int = Field(default=100, ge=0)
+    max_chunk_length: int = Field(default=10000, ge=1)
+
+
 class EmbedConfig(StageConfig):
     """Configuration for embedding stage."""
 
@@ -103,7 +116,7 @@ class EmbedConfig(StageConfig):
     output_dir: str
     model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
     batch_size: int = Field(default=32, ge=1)
-    device: str = "cpu"
+    device: str = "auto"  # "auto" picks CUDA when available, else CPU
 
 
 class FAISSConfig(StageConfig):
@@ -114,6 +127,8 @@ class FAISSConfig(StageConfig):
     n_clusters: int = Field(default=100, ge=1)
     n_subquantizers: int = Field(default=96, ge=1)
     bits_per_code: int = Field(default=8, ge=1)
+    max_index_memory: str = "4G"  # autofaiss memory budget for the index
+    num_threads: int = Field(default=0, ge=0)  # 0 = one per CPU
 
 
 class PackageConfig(StageConfig):
@@ -1,11 +1,36 @@
 """Shared test fixtures."""
+import bz2
 import json
 import os
 from pathlib import Path
-from typing import Iterator
+from typing import BinaryIO, Iterator
 
 import pytest
 
+from pocketwiki_shared.schemas import EmbedConfig
+
+try:
+    import indexed_bzip2
+
+    INDEXED_BZIP2_AVAILABLE = True
+except ImportError:
+    INDEXED_BZIP2_AVAILABLE = False
+
+# Stage directories created under temp_work_dir
+WORK_SUBDIRS = ("parsed", "checkpoints", "chunks", "embeddings", "indexes")
+
+# Default EmbedConfig model, used by the integration tests
+EMBED_MODEL_NAME = EmbedConfig.model_fields["model_name"].default
+
+
+def share_model(mp: pytest.MonkeyPatch, model) -> None:
+    """Make EmbedStage and DenseRetriever reuse model until mp is undone."""
+    from pocketwiki_builder.pipeline import embed
+    from pocketwiki_chat.retrieval import dense
+
+    mp.setitem(embed._MODEL_CACHE, (EMBED_MODEL_NAME, "cpu"), model)
+    mp.setattr(dense, "SentenceTransformer", lambda *args, **kw: model)
+
 
 @pytest.fixture
 def fixtures_dir() -> Path:
@@ -25,16 +50,43 @@ def sample_wiki_bz2(fixtures_dir: Path) -> Path:
     return fixtures_dir / "sample_wiki.xml.bz2"
 
 
+@pytest.fixture
+def sample_wiki_bz2_stream(sample_wiki_bz2: Path) -> Iterator[BinaryIO]:
+    """Open the bz2 sample as a decompressed stream, like a local dump is read.
+
+    Blocks are decoded in parallel with indexed_bzip2 when it is installed.
+    """
+    if INDEXED_BZIP2_AVAILABLE:
+        stream = indexed_bzip2.open(
+            str(sample_wiki_bz2), parallelization=os.cpu_count()
+        )
+    else:
+        stream = bz2.open(sample_wiki_bz2, "rb")
+    with stream:
+        yield stream
+
+
+@pytest.fixture(scope="session")
+def st_model():
+    """Load the default embedding model once for the whole test session."""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBED_MODEL_NAME, device="cpu")
+
+
+@pytest.fixture
+def shared_st_model(st_model, monkeypatch):
+    """Make EmbedStage and DenseRetriever reuse the session model."""
+    share_model(monkeypatch, st_model)
+    return st_model
+
+
 @pytest.fixture
 def temp_work_dir(tmp_path: Path) -> Path:
     """Create temporary work directory structure."""
     work_dir = tmp_path / "work"
-    work_dir.mkdir()
-    (work_dir / "parsed").mkdir()
-    (work_dir / "checkpoints").mkdir()
-    (work_dir / "chunks").mkdir()
-    (work_dir / "embeddings").mkdir()
-    (work_dir / "indexes").mkdir()
+    for subdir in WORK_SUBDIRS:
+        (work_dir / subdir).mkdir(parents=True)
     return work_dir
 
 
@@ -2,12 +2,14 @@
 import bz2
 import json
 import shutil
-import tempfile
 from pathlib import Path
 
 import numpy as np
+import orjson
 import pytest
 
+from fixtures.conftest import share_model
+
 
 # Sample Wikipedia XML for testing
 SAMPLE_XML = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">
@@ -58,25 +60,101 @@ SAMPLE_XML = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">
 </mediawiki>"""
 
 
+def _write_jsonl(path: Path, rows: list) -> None:
+    """Write rows as JSONL in one call."""
+    path.write_bytes(b"".join(orjson.dumps(row) + b"\n" for row in rows))
+
+
+def _read_jsonl(path: Path) -> list:
+    """Read every record of a JSONL file."""
+    return [orjson.loads(line) for line in path.read_bytes().splitlines() if line]
+
+
+def _parse_sample_dump(work_dir: Path) -> list:
+    """Parse SAMPLE_XML the way real dumps are read: streamed from .xml.bz2."""
+    from pocketwiki_builder.streaming.xml_parser import WikiXmlParser
+
+    dump_path = work_dir / "sample.xml.bz2"
+    dump_path.write_bytes(bz2.compress(SAMPLE_XML.encode("utf-8")))
+
+    parser = WikiXmlParser(skip_redirects=True, skip_disambiguation=True)
+    with bz2.open(dump_path, "rb") as stream:
+        return list(parser.parse(stream))
+
+
+def _run_pipeline(work_dir: Path) -> Path:
+    """Run every stage over SAMPLE_XML and return the bundle directory."""
+    from pocketwiki_builder.pipeline.chunk_filter import ChunkFilterStage
+    from pocketwiki_builder.pipeline.embed import EmbedStage
+    from pocketwiki_builder.pipeline.faiss_index import FAISSIndexStage
+    from pocketwiki_builder.pipeline.package import PackageStage
+    from pocketwiki_shared.schemas import (
+        ChunkFilterConfig, EmbedConfig, FAISSConfig, PackageConfig
+    )
+
+    # Stage 1: Parse XML
+    articles = _parse_sample_dump(work_dir)
+
+    parsed_dir = work_dir / "parsed"
+    parsed_dir.mkdir()
+    _write_jsonl(parsed_dir / "articles.jsonl", articles)
+
+    # Stage 2: Chunk + filter
+    chunk_filter_config = ChunkFilterConfig(
+        input_file=str(parsed_dir / "articles.jsonl"),
+        output_dir=str(work_dir / "filtered"),
+        max_chunk_tokens=200,
+    )
+    ChunkFilterStage(chunk_filter_config, work_dir).run()
+
+    # Stage 3: Embed
+    embed_config = EmbedConfig(
+        input_file=str(work_dir / "filtered" / "filtered.parquet"),
+        output_dir=str(work_dir / "embeddings"),
+        device="cpu",
+    )
+    EmbedStage(embed_config, work_dir).run()
+
+    # Stage 4: FAISS Index
+    faiss_config = FAISSConfig(
+        embeddings_file=str(work_dir / "embeddings" / "embeddings.npy"),
+        output_dir=str(work_dir / "indexes"),
+    )
+    FAISSIndexStage(faiss_config, work_dir).run()
+
+    # Stage 5: Package
+    package_config = PackageConfig(
+        work_dir=str(work_dir),
+        output_bundle=str(work_dir / "bundle"),
+    )
+    PackageStage(package_config, work_dir).run()
+
+    return work_dir / "bundle"
+
+
+@pytest.fixture
+def work_dir(tmp_path: Path) -> Path:
+    """Per-test work directory; pytest prunes old runs' directories."""
+    return tmp_path
+
+
+@pytest.fixture(scope="session")
+def prebuilt_bundle(tmp_path_factory: pytest.TempPathFactory, st_model) -> Path:
+    """Build the SAMPLE_XML bundle once per session.
+
+    Tests that modify the bundle must work on a copy.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        share_model(mp, st_model)
+        return _run_pipeline(tmp_path_factory.mktemp("pipeline"))
+
+
 class TestEndToEndPipeline:
     """End-to-end integration tests."""
 
-    @pytest.fixture
-    def work_dir(self) -> Path:
-        """Create temporary work directory."""
-        tmp = tempfile.mkdtemp(prefix="pocketwiki_integration_")
-        yield Path(tmp)
-        shutil.rmtree(tmp, ignore_errors=True)
-
     def test_xml_parsing(self, work_dir: Path) -> None:
         """Test XML parsing produces valid articles."""
-        from io import BytesIO
-        from pocketwiki_builder.streaming.xml_parser import WikiXmlParser
-
-        # Parse XML
-        parser = WikiXmlParser(skip_redirects=True, skip_disambiguation=True)
-        xml_bytes = SAMPLE_XML.encode("utf-8")
-        articles = list(parser.parse(BytesIO(xml_bytes)))
+        articles = _parse_sample_dump(work_dir)
 
         # Should have 3 articles (redirect and disambiguation skipped)
         assert len(articles) == 3
@@ -100,13 +178,12 @@ class TestEndToEndPipeline:
         parsed_dir.mkdir()
         input_file = parsed_dir / "articles.jsonl"
 
-        with open(input_file, "w") as f:
-            f.write(json.dumps({
-                "id": "736",
-                "title": "Albert Einstein",
-                "text": "Albert Einstein was a physicist. " * 100,  # Long text
-                "namespace": 0,
-            }) + "\n")
+        _write_jsonl(input_file, [{
+            "id": "736",
+            "title": "Albert Einstein",
+            "text": "Albert Einstein was a physicist. " * 100,  # Long text
+            "namespace": 0,
+        }])
 
         # Run chunking
         chunk_config = ChunkConfig(
@@ -121,10 +198,7 @@ class TestEndToEndPipeline:
         output_file = work_dir / "chunks" / "chunks.jsonl"
         assert output_file.exists()
 
-        chunks = []
-        with open(output_file) as f:
-            for line in f:
-                chunks.append(json.loads(line))
+        chunks = _read_jsonl(output_file)
 
         # Should have multiple chunks due to small max_chunk_tokens
         assert len(chunks) >= 2
@@ -140,21 +214,22 @@ class TestEndToEndPipeline:
         chunks_dir.mkdir()
         input_file = chunks_dir / "chunks.jsonl"
 
-        with open(input_file, "w") as f:
+        _write_jsonl(input_file, [
             # Good chunk with many words
-            f.write(json.dumps({
+            {
                 "chunk_id": "1",
                 "page_id": "736",
                 "page_title": "Einstein",
                 "text": "Albert Einstein was a renowned physicist who developed the theory of relativity and made many important contributions to science.",
-            }) + "\n")
+            },
             # Short chunk (should be filtered)
-            f.write(json.dumps({
+            {
                 "chunk_id": "2",
                 "page_id": "736",
                 "page_title": "Einstein",
                 "text": "Short text here.",
-            }) + "\n")
+            },
+        ])
 
         # Run filtering with higher min_tokens to ensure filtering happens
         filter_config = FilterConfig(
@@ -169,16 +244,13 @@ class TestEndToEndPipeline:
         output_file = work_dir / "filtered" / "filtered.jsonl"
         assert output_file.exists()
 
-        filtered = []
-        with open(output_file) as f:
-            for line in f:
-                filtered.append(json.loads(line))
+        filtered = _read_jsonl(output_file)
 
         # Short chunk should be filtered out
         assert len(filtered) == 1
         assert filtered[0]["chunk_id"] == "1"
 
-    def test_embedding(self, work_dir: Path) -> None:
+    def test_embedding(self, work_dir: Path, shared_st_model) -> None:
         """Test embedding generation."""
         from pocketwiki_builder.pipeline.embed import EmbedStage
         from pocketwiki_shared.schemas import EmbedConfig
@@ -188,15 +260,10 @@ class TestEndToEndPipeline:
         filtered_dir.mkdir()
         input_file = filtered_dir / "filtered.jsonl"
 
-        with open(input_file, "w") as f:
-            f.write(json.dumps({
-                "chunk_id": "1",
-                "text": "Albert Einstein was a physicist.",
-            }) + "\n")
-            f.write(json.dumps({
-                "chunk_id": "2",
-                "text": "Python is a programming language.",
-            }) + "\n")
+        _write_jsonl(input_file, [
+            {"chunk_id": "1", "text": "Albert Einstein was a physicist."},
+            {"chunk_id": "2", "text": "Python is a programming language."},
+        ])
 
         # Run embedding
         embed_config = EmbedConfig(
@@ -210,7 +277,7 @@ class TestEndToEndPipeline:
         output_file = work_dir / "embeddings" / "embeddings.npy"
         assert output_file.exists()
 
-        embeddings = np.load(output_file)
+        embeddings = np.load(output_file, mmap_mode="r")
         assert embeddings.shape[0] == 2  # 2 chunks
         assert embeddings.shape[1] == 384  # all-MiniLM-L6-v2 dimension
 
@@ -223,8 +290,9 @@ class TestEndToEndPipeline:
         # Create embeddings
         embeddings_dir = work_dir / "embeddings"
         embeddings_dir.mkdir()
-        embeddings = np.random.randn(10, 384).astype("float32")
-        np.save(embeddings_dir / "embeddings.npy", embeddings)
+        rng = np.random.default_rng(0)
+        embeddings = rng.standard_normal((10, 384), dtype=np.float32)
+        np.save(embeddings_dir / "embeddings.npy", embeddings, allow_pickle=False)
 
         # Run indexing
         faiss_config = FAISSConfig(
@@ -241,69 +309,9 @@ class TestEndToEndPipeline:
         index = faiss.read_index(str(index_file))
         assert index.ntotal == 10
 
-    def test_full_pipeline(self, work_dir: Path) -> None:
+    def test_full_pipeline(self, prebuilt_bundle: Path) -> None:
         """Test full pipeline from parsing to bundle."""
-        from io import BytesIO
-        from pocketwiki_builder.streaming.xml_parser import WikiXmlParser
-        from pocketwiki_builder.pipeline.chunk import ChunkStage
-        from pocketwiki_builder.pipeline.filter import FilterStage
-        from pocketwiki_builder.pipeline.embed import EmbedStage
-        from pocketwiki_builder.pipeline.faiss_index import FAISSIndexStage
-        from pocketwiki_builder.pipeline.package import PackageStage
-        from pocketwiki_shared.schemas import (
-            ChunkConfig, FilterConfig, EmbedConfig, FAISSConfig, PackageConfig
-        )
-
-        # Stage 1: Parse XML
-        parser = WikiXmlParser(skip_redirects=True, skip_disambiguation=True)
-        xml_bytes = SAMPLE_XML.encode("utf-8")
-        articles = list(parser.parse(BytesIO(xml_bytes)))
-
-        parsed_dir = work_dir / "parsed"
-        parsed_dir.mkdir()
-        with open(parsed_dir / "articles.jsonl", "w") as f:
-            for article in articles:
-                f.write(json.dumps(article) + "\n")
-
-        # Stage 2: Chunk
-        chunk_config = ChunkConfig(
-            input_file=str(parsed_dir / "articles.jsonl"),
-            output_dir=str(work_dir / "chunks"),
-            max_chunk_tokens=200,
-        )
-        ChunkStage(chunk_config, work_dir).run()
-
-        # Stage 3: Filter
-        filter_config = FilterConfig(
-            input_file=str(work_dir / "chunks" / "chunks.jsonl"),
-            output_dir=str(work_dir / "filtered"),
-            min_tokens=10,
-        )
-        FilterStage(filter_config, work_dir).run()
-
-        # Stage 4: Embed
-        embed_config = EmbedConfig(
-            input_file=str(work_dir / "filtered" / "filtered.jsonl"),
-            output_dir=str(work_dir / "embeddings"),
-        )
-        EmbedStage(embed_config, work_dir).run()
-
-        # Stage 5: FAISS Index
-        faiss_config = FAISSConfig(
-            embeddings_file=str(work_dir / "embeddings" / "embeddings.npy"),
-            output_dir=str(work_dir / "indexes"),
-        )
-        FAISSIndexStage(faiss_config, work_dir).run()
-
-        # Stage 6: Package
-        package_config = PackageConfig(
-            work_dir=str(work_dir),
-            output_bundle=str(work_dir / "bundle"),
-        )
-        PackageStage(package_config, work_dir).run()
-
-        # Verify bundle
-        bundle_dir = work_dir / "bundle"
+        bundle_dir = prebuilt_bundle
         assert (bundle_dir / "manifest.json").exists()
         assert (bundle_dir / "dense.faiss").exists()
         assert (bundle_dir / "chunks.jsonl").exists()
@@ -312,53 +320,62 @@ class TestEndToEndPipeline:
         manifest = json.loads((bundle_dir / "manifest.json").read_text())
         assert manifest["version"] == "0.1.0"
 
-    def test_chat_with_bundle(self, work_dir: Path) -> None:
+    def test_search_api_with_bundle(
+        self, prebuilt_bundle: Path, shared_st_model, monkeypatch
+    ) -> None:
+        """Test the search API returns dense hits from a pipeline-built bundle."""
+        from fastapi.testclient import TestClient
+        from pocketwiki_chat.web import app as web_app
+
+        monkeypatch.setattr(web_app, "app_state", web_app.AppState())
+        client = TestClient(web_app.create_app(bundle_dir=prebuilt_bundle))
+        try:
+            response = client.post(
+                "/api/search", json={"query": "physicist theory of relativity"}
+            )
+            assert response.status_code == 200
+            results = response.json()["results"]
+
+            # Dense hits resolve to the bundle's own chunk records
+            store = web_app.app_state.chunk_store
+            assert len(results) == len(store)
+            assert results[0]["page_title"] == "Albert Einstein"
+            assert {r["chunk_id"] for r in results} == set(store.row_chunk_ids)
+        finally:
+            web_app.app_state.chunk_store.close()
+
+    def test_chat_with_bundle(
+        self, work_dir: Path, prebuilt_bundle: Path, shared_st_model
+    ) -> None:
         """Test chat app with created bundle."""
-        import faiss
+        from pocketwiki_chat.bundle.chunks import ChunkStore
         from pocketwiki_chat.bundle.loader import BundleLoader
         from pocketwiki_chat.retrieval.dense import DenseRetriever
         from pocketwiki_chat.retrieval.fusion import rrf_fusion
 
-        # Create minimal bundle
+        # Work on a copy so the shared bundle stays pristine
         bundle_dir = work_dir / "bundle"
-        bundle_dir.mkdir()
-
-        # Create chunks file
-        chunks = [
-            {"chunk_id": "0", "page_id": "736", "page_title": "Einstein", "text": "Einstein was a physicist."},
-            {"chunk_id": "1", "page_id": "23862", "page_title": "Python", "text": "Python is a programming language."},
-        ]
-        with open(bundle_dir / "chunks.jsonl", "w") as f:
-            for chunk in chunks:
-                f.write(json.dumps(chunk) + "\n")
-
-        # Create FAISS index with embeddings
-        from sentence_transformers import SentenceTransformer
-        model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-        texts = [c["text"] for c in chunks]
-        embeddings = model.encode(texts).astype("float32")
-
-        index = faiss.IndexFlatIP(384)
-        faiss.normalize_L2(embeddings)
-        index.add(embeddings)
-        faiss.write_index(index, str(bundle_dir / "dense.faiss"))
-
-        # Create manifest
-        manifest = {"version": "0.1.0", "created_at": "2024-01-01T00:00:00Z"}
-        (bundle_dir / "manifest.json").write_text(json.dumps(manifest))
+        shutil.copytree(prebuilt_bundle, bundle_dir)
 
         # Test bundle loading
         loader = BundleLoader(bundle_dir)
         assert loader.validate()
 
         # Test dense retrieval
-        retriever = DenseRetriever(bundle_dir / "dense.faiss")
-        results = retriever.search("physicist scientist", k=2)
-        assert len(results) == 2
-
-        # Einstein should rank higher for physics query
-        chunk_ids = [r["chunk_id"] for r in results]
-        assert "0" in chunk_ids  # Einstein chunk
+        store = ChunkStore(loader.get_chunks_path(), loader.get_chunks_index_path())
+        try:
+            assert len(store) == 3
+            retriever = DenseRetriever(bundle_dir / "dense.faiss")
+            results = retriever.search("physicist scientist", k=2)
+            assert len(results) == 2
+
+            # Einstein should rank high for physics query; dense IDs are rows
+            titles = [
+                store.get_chunk(int(r["chunk_id"]))["page_title"] for r in results
+            ]
+            assert "Albert Einstein" in titles
+        finally:
+            store.close()
 
         # Test RRF fusion
         dense_results = [{"chunk_id": "0", "rank": 0}, {"chunk_id": "1", "rank": 1}]
@@ -370,13 +387,6 @@ class TestEndToEndPipeline:
 class TestRustBM25Integration:
     """Test Rust BM25 integration."""
 
-    @pytest.fixture
-    def work_dir(self) -> Path:
-        """Create temporary work directory."""
-        tmp = tempfile.mkdtemp(prefix="pocketwiki_bm25_")
-        yield Path(tmp)
-        shutil.rmtree(tmp, ignore_errors=True)
-
     def test_bm25_index_creation(self) -> None:
         """Test BM25 index creation with Rust backend."""
         try:
@@ -2,6 +2,7 @@
 import hashlib
 from pathlib import Path
 from typing import Any
+from unittest.mock import patch
 
 import pytest
 
@@ -94,6 +95,24 @@ class TestStageBase:
         state = StageState.model_validate_json(state_file.read_text())
         assert state.completed is True
         assert state.stage_name == "mock_stage"
+        assert not (temp_work_dir / "mock_stage.state.json.tmp").exists()
+
+    def test_stage_persist_state_failure_keeps_previous(
+        self, temp_work_dir: Path
+    ) -> None:
+        """Test a failed state write leaves the previous state file intact."""
+        stage = MockStage(MockConfig(), temp_work_dir)
+        stage.run()
+        stage.persist_state()
+        state_file = stage.get_state_file()
+        previous = state_file.read_bytes()
+
+        with patch("pocketwiki_shared.base.os.fsync", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                stage.persist_state()
+
+        assert state_file.read_bytes() == previous
+        assert not (temp_work_dir / "mock_stage.state.json.tmp").exists()
 
     def test_stage_load_state(self, temp_work_dir: Path) -> None:
         """Test load_state reads state file correctly."""
@@ -132,3 +151,90 @@ class TestStageBase:
 
         # run_called should still be False for second instance
         assert stage2.run_called is False
+
+    def test_stage_config_hash(self, temp_work_dir: Path) -> None:
+        """Test config_hash is short, cached and sensitive to config changes."""
+        stage = MockStage(MockConfig(value=10), temp_work_dir)
+        other = MockStage(MockConfig(value=11), temp_work_dir)
+
+        assert len(stage.config_hash()) == 8
+        assert stage.config_hash() == stage.config_hash()
+        assert stage.config_hash() != other.config_hash()
+
+    def test_config_serialized_once(self, temp_work_dir: Path) -> None:
+        """Test the config is dumped to JSON once per stage instance."""
+        stage = MockStage(MockConfig(value=10), temp_work_dir)
+
+        with patch.object(
+            MockConfig, "model_dump_json", autospec=True, return_value='{"value":10}'
+        ) as mock_dump:
+            first = stage.config_hash()
+            assert stage._config_json == b'{"value":10}'
+            assert stage.config_hash() == first
+
+        assert mock_dump.call_count == 1
+
+    def test_stage_name_memoized_per_class(self, temp_work_dir: Path) -> None:
+        """Test stage names are snake_case and computed once per class."""
+        from pocketwiki_shared import base
+
+        class FAISSIndexStage(MockStage):
+            pass
+
+        stage = MockStage(MockConfig(), temp_work_dir)
+        assert stage.get_stage_name() == "mock_stage"
+
+        with patch.object(base, "_CAMEL_RE", wraps=base._CAMEL_RE) as camel_re:
+            first = FAISSIndexStage(MockConfig(), temp_work_dir)
+            second = FAISSIndexStage(MockConfig(), temp_work_dir)
+            assert first.get_stage_name() == "f_a_i_s_s_index_stage"
+            assert second.get_stage_name() == first.get_stage_name()
+
+        assert camel_re.sub.call_count == 1
+
+    def test_hash_files(self, temp_work_dir: Path) -> None:
+        """Test input hashes combine file fingerprints with the config digest."""
+        from pocketwiki_shared.hashing import fingerprint_file
+
+        stage = MockStage(MockConfig(), temp_work_dir)
+        path = temp_work_dir / "input.jsonl"
+        path.write_text("a\n")
+
+        before = stage._hash_files([path])
+        assert before == f"{fingerprint_file(path)}-{stage.config_hash()}"
+
+        path.write_text("b\nc\n")
+        assert stage._hash_files([path]) != before
+
+    def test_execute_logs_one_record_per_block(
+        self, temp_work_dir: Path, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        """Test execute() logs each block of its report as a single record."""
+        stage = MockStage(MockConfig(), temp_work_dir)
+
+        with caplog.at_level("INFO", logger="pocketwiki_shared.base"):
+            stage.execute()
+            stage.execute()
+
+        messages = [r.getMessage() for r in caplog.records]
+        assert len(messages) == 3
+        assert "RUNNING: No previous state found" in messages[0]
+        assert "COMPLETED" in messages[1]
+        assert "SKIPPING" in messages[2]
+
+    def test_execute_hashes_inputs_once(self, temp_work_dir: Path) -> None:
+        """Test execute() computes the input hash once per call."""
+        stage = MockStage(MockConfig(), temp_work_dir)
+
+        with patch.object(
+            MockStage, "compute_input_hash", autospec=True, return_value="abc"
+        ) as compute:
+            stage.execute()
+            assert compute.call_count == 1
+            assert stage.load_state().input_hash == "abc"
+
+            stage.execute()
+            assert compute.call_count == 2
+
+        # Outside execute() the hash is recomputed on demand
+        assert stage.should_skip() is False
@@ -7,6 +7,25 @@ import pytest
 import numpy as np
 
 
+def _write_flat_index(path: Path, num_rows: int, dim: int = 384) -> Path:
+    """Write an exact inner-product index whose row i is the unit vector e_i."""
+    import faiss
+
+    index = faiss.IndexFlatIP(dim)
+    index.add(np.eye(num_rows, dim, dtype=np.float32))
+    faiss.write_index(index, str(path))
+    return path
+
+
+def _query_vectors(*weights: dict, dim: int = 384) -> np.ndarray:
+    """Build query rows scoring each index row by the given {row: weight}."""
+    vectors = np.zeros((len(weights), dim), dtype=np.float32)
+    for i, row_weights in enumerate(weights):
+        for row, weight in row_weights.items():
+            vectors[i, row] = weight
+    return vectors
+
+
 class TestBundleLoader:
     """Tests for bundle loading."""
 
@@ -43,38 +62,207 @@ class TestBundleLoader:
         assert loader.validate() is False
 
 
+class TestChunkStore:
+    """Tests for on-demand chunk access."""
+
+    CHUNKS = [
+        {"chunk_id": "736-0", "page_id": "736", "text": "a"},
+        {"chunk_id": "42-0", "page_id": 42, "text": "b"},
+        {"chunk_id": "736-1", "page_id": "736", "text": "c"},
+    ]
+
+    def test_lookup_without_index(self, temp_work_dir: Path) -> None:
+        """Test records are located by scanning when there is no chunks.idx."""
+        from pocketwiki_chat.bundle.chunks import ChunkStore
+
+        path = temp_work_dir / "chunks.jsonl"
+        # Last record deliberately lacks a trailing newline
+        path.write_text("\n".join(json.dumps(c) for c in self.CHUNKS))
+
+        store = ChunkStore(path, temp_work_dir / "chunks.idx")
+
+        assert len(store) == 3
+        assert store.get("42-0")["text"] == "b"
+        assert store.get("missing") is None
+        assert [c["text"] for c in store.page_chunks("736")] == ["a", "c"]
+        assert store.page_chunks("42")[0]["chunk_id"] == "42-0"
+        assert store.chunks_by_page["736"].dtype == np.int32
+        store.close()
+
+    def test_non_ascii_chunks(self, temp_work_dir: Path) -> None:
+        """Test raw UTF-8 and \\u-escaped records decode to the same text."""
+        import orjson
+
+        from pocketwiki_chat.bundle.chunks import ChunkStore
+
+        chunks = [
+            {"chunk_id": "1-0", "page_id": "1", "page_title": "東京", "text": "首都"},
+            {"chunk_id": "1-1", "page_id": "1", "page_title": "東京", "text": "café"},
+        ]
+        path = temp_work_dir / "chunks.jsonl"
+        path.write_bytes(
+            orjson.dumps(chunks[0]) + b"\n" + json.dumps(chunks[1]).encode() + b"\n"
+        )
+
+        store = ChunkStore(path)
+
+        assert [store.get_chunk(row) for row in range(len(store))] == chunks
+        assert store.page_text("1") == ("東京", "首都\n\ncafé")
+        store.close()
+
+    def test_lookup_with_index(self, temp_work_dir: Path) -> None:
+        """Test the builder's chunks.idx is used as the record offsets."""
+        from pocketwiki_chat.bundle.chunks import ChunkStore
+        from pocketwiki_shared.jsonl import scan_line_offsets
+
+        path = temp_work_dir / "chunks.jsonl"
+        data = "".join(json.dumps(c) + "\n" for c in self.CHUNKS).encode()
+        path.write_bytes(data)
+        index_path = temp_work_dir / "chunks.idx"
+        scan_line_offsets(data).tofile(index_path)
+
+        store = ChunkStore(path, index_path)
+
+        assert isinstance(store.offsets, np.memmap)
+        assert [store.get_chunk(i)["text"] for i in range(len(store))] == ["a", "b", "c"]
+        store.close()
+
+    def test_page_text_cached(self, temp_work_dir: Path) -> None:
+        """Test page text is joined once and reused."""
+        from pocketwiki_chat.bundle.chunks import ChunkStore
+
+        path = temp_work_dir / "chunks.jsonl"
+        path.write_text("".join(json.dumps(c) + "\n" for c in self.CHUNKS))
+        store = ChunkStore(path)
+
+        assert store.page_text("736") == ("Unknown", "a\n\nc")
+        assert store.page_text("736") is store.page_text("736")
+        assert store.page_text.cache_info().hits == 2
+        assert store.page_text("missing") is None
+        store.close()
+
+
 class TestDenseRetrieval:
     """Tests for FAISS dense retrieval."""
 
-    @patch("faiss.read_index")
-    @patch("sentence_transformers.SentenceTransformer")
-    def test_dense_search(
-        self, mock_model_class: Mock, mock_faiss: Mock, temp_work_dir: Path
-    ) -> None:
+    @patch("pocketwiki_chat.retrieval.dense.SentenceTransformer")
+    def test_dense_search(self, mock_model_class: Mock, temp_work_dir: Path) -> None:
         """Test dense vector search."""
         from pocketwiki_chat.retrieval.dense import DenseRetriever
 
-        # Mock FAISS index
-        mock_index = Mock()
-        mock_index.search.return_value = (
-            np.array([[0.9, 0.8, 0.7]]),  # distances
-            np.array([[0, 1, 2]]),  # indices
-        )
-        mock_faiss.return_value = mock_index
+        index_path = _write_flat_index(temp_work_dir / "dense.faiss", 3)
 
         # Mock embedding model
         mock_model = Mock()
-        mock_model.encode.return_value = np.random.rand(384).astype(np.float32)
+        mock_model.encode.return_value = _query_vectors({0: 0.5, 1: 0.25, 2: 0.125})
         mock_model_class.return_value = mock_model
 
-        index_path = temp_work_dir / "dense.faiss"
-        index_path.write_text("fake")
-
         retriever = DenseRetriever(index_path, "all-MiniLM-L6-v2")
+        retriever.index = Mock(wraps=retriever.index)
         results = retriever.search("test query", k=3)
 
-        assert len(results) == 3
-        assert results[0]["rank"] == 0
+        assert results == [
+            {"chunk_id": "0", "score": 0.5, "rank": 0},
+            {"chunk_id": "1", "score": 0.25, "rank": 1},
+            {"chunk_id": "2", "score": 0.125, "rank": 2},
+        ]
+
+        # The query is encoded normalized, as a single fp32 row
+        assert mock_model.encode.call_args.kwargs["normalize_embeddings"] is True
+        query_vec = retriever.index.search.call_args[0][0]
+        assert query_vec.shape == (1, 384)
+        assert query_vec.dtype == np.float32
+
+    @patch("pocketwiki_chat.retrieval.dense.SentenceTransformer")
+    def test_repeat_query_uses_cached_embedding(
+        self, mock_model_class: Mock, temp_work_dir: Path
+    ) -> None:
+        """Test a repeated query is encoded only once."""
+        from pocketwiki_chat.retrieval.dense import DenseRetriever
+
+        index_path = _write_flat_index(temp_work_dir / "dense.faiss", 8)
+        mock_model = Mock()
+        mock_model.encode.return_value = _query_vectors({7: 0.5})
+        mock_model_class.return_value = mock_model
+
+        retriever = DenseRetriever(index_path)
+        retriever.index = Mock(wraps=retriever.index)
+        first = retriever.search("einstein", k=1)
+        second = retriever.search("einstein", k=1)
+
+        assert first == second == [{"chunk_id": "7", "score": 0.5, "rank": 0}]
+        assert mock_model.encode.call_count == 1
+        assert retriever.index.search.call_count == 2
+
+    @patch("pocketwiki_chat.retrieval.dense.SentenceTransformer")
+    def test_search_arrays(self, mock_model_class: Mock, temp_work_dir: Path) -> None:
+        """Test columnar search returns the FAISS row without building dicts."""
+        from pocketwiki_chat.retrieval.dense import DenseRetriever
+
+        index_path = _write_flat_index(temp_work_dir / "dense.faiss", 6)
+        mock_model = Mock()
+        mock_model.encode.return_value = _query_vectors({5: 0.5, 2: 0.25})
+        mock_model_class.return_value = mock_model
+
+        retriever = DenseRetriever(index_path)
+        ids, scores = retriever.search_arrays("query", k=2)
+
+        assert ids.tolist() == [5, 2]
+        assert scores.dtype == np.float32
+        assert [r["chunk_id"] for r in retriever.search("query", k=2)] == ["5", "2"]
+
+    @patch("pocketwiki_chat.retrieval.dense.SentenceTransformer")
+    def test_search_params_applied_to_index(
+        self, mock_model_class: Mock, temp_work_dir: Path
+    ) -> None:
+        """Test nprobe reaches an OPQ-wrapped IVF index and efSearch an HNSW one."""
+        import faiss
+
+        from pocketwiki_chat.retrieval.dense import DenseRetriever
+
+        vectors = np.random.default_rng(0).random((256, 8), dtype=np.float32)
+        ivf_path = temp_work_dir / "ivf.faiss"
+        ivf = faiss.index_factory(8, "OPQ2,IVF4,PQ2x4", faiss.METRIC_INNER_PRODUCT)
+        ivf.train(vectors)
+        faiss.write_index(ivf, str(ivf_path))
+        hnsw_path = temp_work_dir / "hnsw.faiss"
+        faiss.write_index(
+            faiss.index_factory(8, "HNSW8", faiss.METRIC_INNER_PRODUCT),
+            str(hnsw_path),
+        )
+
+        retriever = DenseRetriever(ivf_path, nprobe=3)
+        assert faiss.extract_index_ivf(retriever.index).nprobe == 3
+        retriever.set_search_params(nprobe=2)
+        assert faiss.extract_index_ivf(retriever.index).nprobe == 2
+
+        retriever = DenseRetriever(hnsw_path, ef_search=48)
+        assert retriever.index.hnsw.efSearch == 48
+
+    @patch("pocketwiki_chat.retrieval.dense.SentenceTransformer")
+    def test_search_batch(self, mock_model_class: Mock, temp_work_dir: Path) -> None:
+        """Test several queries share one encode and one index search."""
+        from pocketwiki_chat.retrieval.dense import DenseRetriever
+
+        index_path = _write_flat_index(temp_work_dir / "dense.faiss", 5)
+        mock_model = Mock()
+        mock_model.encode.return_value = _query_vectors(
+            {1: 0.5, 2: 0.25}, {3: 0.5, 4: 0.25}
+        )
+        mock_model_class.return_value = mock_model
+
+        retriever = DenseRetriever(index_path)
+        retriever.index = Mock(wraps=retriever.index)
+        results = retriever.search_batch(["a", "b"], k=2)
+
+        assert [[r["chunk_id"] for r in row] for row in results] == [
+            ["1", "2"],
+            ["3", "4"],
+        ]
+        mock_model.encode.assert_called_once()
+        assert mock_model.encode.call_args[0][0] == ["a", "b"]
+        assert retriever.index.search.call_args[0][0].shape == (2, 384)
+        assert retriever.search_batch([], k=2) == []
 
 
 class TestSparseRetrieval:
@@ -114,6 +302,134 @@ class TestRRFFusion:
         # Chunk 2 appears high in both, should rank first
         assert fused[0]["chunk_id"] == "2"
 
+    def test_rrf_fusion_ties_and_scores(self) -> None:
+        """Test summed scores and descending chunk_id tie-breaking."""
+        from pocketwiki_chat.retrieval.fusion import rrf_fusion
+
+        dense_results = [
+            {"chunk_id": "10", "score": 0.9, "rank": 0},
+            {"chunk_id": "3", "score": 0.8, "rank": 1},
+        ]
+        sparse_results = [
+            {"chunk_id": "9", "score": 5.0, "rank": 0},
+            {"chunk_id": "3", "score": 4.0, "rank": 1},
+        ]
+
+        fused = rrf_fusion(dense_results, sparse_results, k=60)
+
+        assert [r["chunk_id"] for r in fused] == ["3", "10", "9"]
+        assert fused[0]["score"] == 2.0 / 61
+        assert [r["rank"] for r in fused] == [0, 1, 2]
+        assert all(type(r["score"]) is float for r in fused)
+
+    def test_rrf_fusion_accepts_id_arrays(self) -> None:
+        """Test ranked ID arrays fuse the same as result dicts."""
+        from pocketwiki_chat.retrieval.fusion import rrf_fusion
+
+        dense_ids = np.array([10, 3], dtype=np.int64)
+        dense_dicts = [
+            {"chunk_id": "10", "score": 0.9, "rank": 0},
+            {"chunk_id": "3", "score": 0.8, "rank": 1},
+        ]
+        sparse_results = [
+            {"chunk_id": "9", "score": 5.0, "rank": 0},
+            {"chunk_id": "3", "score": 4.0, "rank": 1},
+        ]
+
+        assert rrf_fusion(dense_ids, sparse_results) == rrf_fusion(
+            dense_dicts, sparse_results
+        )
+
+    def test_rrf_kernel_matches_numpy(self) -> None:
+        """Test the numba kernel's logic agrees with the NumPy path, ties included."""
+        from pocketwiki_chat.retrieval.fusion import _rrf_fusion_numpy
+        from pocketwiki_chat.retrieval.fusion_numba import _rrf_kernel
+
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            sparse = rng.choice(30, size=10, replace=False)
+            dense = rng.choice(30, size=10, replace=False)
+            ids = np.concatenate([sparse, dense]).astype(np.int64)
+            ranks = np.concatenate([np.arange(10), np.arange(10)]).astype(np.float64)
+
+            expected_ids, expected_scores = _rrf_fusion_numpy(ids, ranks, 60)
+            got_ids, got_scores = _rrf_kernel(ids, ranks, 60.0)
+
+            assert got_ids.tolist() == expected_ids.tolist()
+            assert got_scores.tolist() == expected_scores.tolist()
+
+    def test_rrf_fusion_non_numeric_ids(self) -> None:
+        """Test non-numeric chunk IDs are fused too."""
+        from pocketwiki_chat.retrieval.fusion import rrf_fusion
+
+        fused = rrf_fusion(
+            [{"chunk_id": "b", "score": 1.0, "rank": 0}],
+            [{"chunk_id": "a", "score": 1.0, "rank": 0}],
+        )
+
+        assert [r["chunk_id"] for r in fused] == ["a", "b"]
+        assert rrf_fusion([], []) == []
+
+    def test_rrf_fusion_mixed_id_ties(self) -> None:
+        """Test ties between numeric and non-numeric IDs order deterministically."""
+        from pocketwiki_chat.retrieval.fusion import rrf_fusion
+
+        fused = rrf_fusion(
+            [{"chunk_id": "b", "rank": 0}, {"chunk_id": "2", "rank": 1}],
+            [{"chunk_id": "10", "rank": 0}, {"chunk_id": "a", "rank": 1}],
+        )
+
+        assert [r["chunk_id"] for r in fused] == ["10", "b", "2", "a"]
+
+    def test_rrf_fusion_string_ids_match_scalar_rrf(self) -> None:
+        """Test string chunk IDs fused as integer codes keep exact RRF scores."""
+        from pocketwiki_chat.retrieval.fusion import rrf_fusion, rrf_score
+
+        dense_ids = ["736-1", "9-0", "07"]
+        sparse_ids = ["9-0", "7", "736-1"]
+        dense = [{"chunk_id": c, "rank": r} for r, c in enumerate(dense_ids)]
+        sparse = [{"chunk_id": c, "rank": r} for r, c in enumerate(sparse_ids)]
+
+        fused = rrf_fusion(dense, sparse)
+
+        expected = {}
+        for result in sparse + dense:
+            chunk_id = result["chunk_id"]
+            expected[chunk_id] = expected.get(chunk_id, 0.0) + rrf_score(result["rank"])
+        assert {r["chunk_id"]: r["score"] for r in fused} == expected
+        assert [r["chunk_id"] for r in fused] == ["9-0", "736-1", "7", "07"]
+
+    def test_linear_fusion_substitutes_min_score(self) -> None:
+        """Test linear fusion z-normalizes scores and fills gaps with the minimum."""
+        from pocketwiki_chat.retrieval.fusion import linear_fusion
+
+        dense = (
+            np.array([1, 2, 3, -1], dtype=np.int64),
+            np.array([0.9, 0.5, 0.1, -3.4e38], dtype=np.float32),
+        )
+        sparse = [
+            {"chunk_id": "3", "score": 12.0, "rank": 0},
+            {"chunk_id": "4", "score": 2.0, "rank": 1},
+        ]
+
+        fused = linear_fusion(dense, sparse, alpha=2.0)
+
+        # FAISS padding (-1) is ignored; chunk 4 takes dense's minimum (0.1)
+        # and chunks 1-2 take sparse's minimum (2.0)
+        assert [r["chunk_id"] for r in fused] == ["3", "1", "2", "4"]
+        assert [r["rank"] for r in fused] == [0, 1, 2, 3]
+        assert linear_fusion([], []) == []
+
+    def test_linear_fusion_alpha_weights_sparse(self) -> None:
+        """Test alpha shifts the ranking toward the sparse scores."""
+        from pocketwiki_chat.retrieval.fusion import linear_fusion
+
+        dense = [{"chunk_id": "a", "score": 0.9}, {"chunk_id": "b", "score": 0.8}]
+        sparse = [{"chunk_id": "b", "score": 9.0}, {"chunk_id": "a", "score": 1.0}]
+
+        assert linear_fusion(dense, sparse, alpha=0.5)[0]["chunk_id"] == "a"
+        assert linear_fusion(dense, sparse, alpha=2.0)[0]["chunk_id"] == "b"
+
     def test_rrf_formula(self) -> None:
         """Test RRF score calculation."""
         from pocketwiki_chat.retrieval.fusion import rrf_score
@@ -163,3 +479,34 @@ class TestContextAssembly:
 
         # Should be truncated
         assert len(context) < 10 * 1000
+
+    def test_context_budget_boundary(self) -> None:
+        """Test a chunk that exactly fills the budget is kept."""
+        from pocketwiki_chat.retrieval.context import assemble_context
+
+        # "[T]\n" + 34 chars + "\n\n" is 40 characters, i.e. 10 tokens
+        chunks = [
+            {"text": "a" * 34, "page_title": "T"},
+            {"text": "b", "page_title": "U"},
+        ]
+
+        assert assemble_context(chunks, max_tokens=10) == f"[T]\n{'a' * 34}\n\n"
+        assert assemble_context(chunks, max_tokens=9) == ""
+
+    def test_context_uses_token_counter(self) -> None:
+        """Test an exact token counter decides what fits."""
+        from pocketwiki_chat.retrieval.context import assemble_context
+
+        chunks = [
+            {"chunk_id": str(i), "text": "word " * 10, "page_title": f"P{i}"}
+            for i in range(5)
+        ]
+
+        def count_tokens(text: str) -> int:
+            return len(text.split())
+
+        # Each formatted chunk is 11 "tokens": the title plus 10 words
+        context = assemble_context(chunks, max_tokens=33, count_tokens=count_tokens)
+
+        assert context.count("[P") == 3
+        assert "[P3]" not in context
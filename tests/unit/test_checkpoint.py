@@ -94,6 +94,28 @@ class TestCheckpointManager:
         # Final file should exist
         assert checkpoint_file.exists()
 
+    def test_checkpoint_overwrite_is_compact_and_synced(
+        self, temp_work_dir: Path, mock_checkpoint_data: dict
+    ) -> None:
+        """Test checkpoints are fsynced, written without indentation and replace the old one."""
+        config = StreamParseConfig(
+            source_url="http://example.com/dump.xml.bz2"
+        )
+        checkpoint_file = temp_work_dir / "checkpoints" / "test.checkpoint.json"
+        manager = CheckpointManager(checkpoint_file, config)
+
+        manager.save_checkpoint(StreamParseCheckpoint(**mock_checkpoint_data))
+        updated = StreamParseCheckpoint(
+            **{**mock_checkpoint_data, "pages_processed": 200}
+        )
+        with patch("pocketwiki_builder.streaming.checkpoint.os.fsync") as mock_fsync:
+            manager.save_checkpoint(updated)
+
+        mock_fsync.assert_called_once()
+        content = checkpoint_file.read_text()
+        assert "\n" not in content
+        assert json.loads(content)["pages_processed"] == 200
+
     def test_should_checkpoint_by_pages(self, temp_work_dir: Path) -> None:
         """Test checkpoint trigger by page count."""
         config = StreamParseConfig(
@@ -276,6 +298,45 @@ class TestCheckpointManager:
         assert manager.pages_since_checkpoint == 0
         assert manager.bytes_since_checkpoint == 0
 
+    def test_load_checkpoint_reads_disk_once(
+        self, temp_work_dir: Path, mock_checkpoint_data: dict
+    ) -> None:
+        """Test loads are cached and saves refresh the cache without a re-read."""
+        config = StreamParseConfig(
+            source_url="http://example.com/dump.xml.bz2"
+        )
+        checkpoint_file = temp_work_dir / "checkpoints" / "test.checkpoint.json"
+
+        CheckpointManager(checkpoint_file, config).save_checkpoint(
+            StreamParseCheckpoint(**mock_checkpoint_data)
+        )
+        manager = CheckpointManager(checkpoint_file, config)
+
+        with patch(
+            "pocketwiki_builder.streaming.checkpoint.get_etag",
+            return_value="abc123",
+        ), patch.object(
+            StreamParseCheckpoint,
+            "model_validate_json",
+            wraps=StreamParseCheckpoint.model_validate_json,
+        ) as mock_validate:
+            first = manager.load_checkpoint()
+            assert manager.is_checkpoint_valid(first)
+            assert manager.load_checkpoint() is first
+            assert mock_validate.call_count == 1
+
+            updated = StreamParseCheckpoint(
+                **{**mock_checkpoint_data, "pages_processed": 2000}
+            )
+            manager.save_checkpoint(updated)
+            updated.pages_processed = 3000
+            assert manager.load_checkpoint().pages_processed == 2000
+            assert mock_validate.call_count == 1
+
+        # A fresh manager still reads what was saved
+        reloaded = CheckpointManager(checkpoint_file, config).load_checkpoint()
+        assert reloaded.pages_processed == 2000
+
 
 class TestCheckpointTrigger:
     """Tests for CheckpointTrigger enum."""
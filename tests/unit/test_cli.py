@@ -200,11 +200,26 @@ class TestCLILogging:
         # Check for expected log sections
         assert "POCKETWIKI BUILDER - Starting Pipeline" in result.output
         assert "Configuration:" in result.output
-        assert "STAGE 1/6: StreamParse" in result.output
-        assert "STAGE 2/6: Chunk" in result.output
-        assert "STAGE 3/6: Filter" in result.output
-        assert "STAGE 4/6: Embed" in result.output
-        assert "STAGE 5/6: FAISS Index" in result.output
-        assert "STAGE 6/6: Package" in result.output
+        assert "STAGE 1/5: StreamParse" in result.output
+        assert "STAGE 2/5: ChunkFilter" in result.output
+        assert "STAGE 3/5: Embed" in result.output
+        assert "STAGE 4/5: FAISS Index" in result.output
+        assert "STAGE 5/5: Package" in result.output
         assert "PIPELINE COMPLETE" in result.output
         assert "Bundle size:" in result.output
+
+
+class TestCLIHelpers:
+    """Tests for CLI helper functions."""
+
+    def test_get_dir_size_recursive(self, tmp_path: Path):
+        """Test directory size sums files in nested directories."""
+        from pocketwiki_builder.cli import _get_dir_size
+
+        (tmp_path / "a.bin").write_bytes(b"x" * 10)
+        (tmp_path / "nested" / "deeper").mkdir(parents=True)
+        (tmp_path / "nested" / "b.bin").write_bytes(b"x" * 20)
+        (tmp_path / "nested" / "deeper" / "c.bin").write_bytes(b"x" * 30)
+
+        assert _get_dir_size(tmp_path) == 60
+        assert _get_dir_size(tmp_path / "missing") == 0
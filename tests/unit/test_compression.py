@@ -0,0 +1,59 @@
+"""Tests for pocketwiki_builder.streaming.compression."""
+from pathlib import Path
+
+from pocketwiki_builder.streaming.compression import (
+    is_zstd,
+    open_jsonl_reader,
+    open_jsonl_writer,
+)
+
+
+class TestJsonlCompression:
+    """Tests for zstd JSONL readers and writers."""
+
+    def test_is_zstd(self) -> None:
+        """Test compression is detected from the file suffix."""
+        assert is_zstd("articles.jsonl.zst")
+        assert not is_zstd(Path("articles.jsonl"))
+
+    def test_round_trip(self, tmp_path: Path) -> None:
+        """Test lines written compressed read back unchanged."""
+        path = tmp_path / "articles.jsonl.zst"
+        lines = [b'{"id":"1","text":"Z\xc3\xbcrich"}\n', b'{"id":"2"}\n'] * 100
+
+        with open_jsonl_writer(path) as out_file:
+            out_file.writelines(lines)
+
+        assert path.stat().st_size < sum(len(line) for line in lines)
+        with open_jsonl_reader(path) as in_file:
+            assert list(in_file) == lines
+
+    def test_append_after_flush(self, tmp_path: Path) -> None:
+        """Test tell() matches the file size at each flush and appends resume."""
+        path = tmp_path / "articles.jsonl.zst"
+
+        with open_jsonl_writer(path) as out_file:
+            out_file.writelines([b"1\n", b"2\n"])
+            out_file.flush()
+            flushed = out_file.tell()
+            assert path.stat().st_size == flushed
+        # Closing after a flush adds no further frames
+        assert path.stat().st_size == flushed
+
+        with open_jsonl_writer(path, append=True) as out_file:
+            assert out_file.tell() == flushed
+            out_file.write(b"3\n")
+
+        with open_jsonl_reader(path) as in_file:
+            assert in_file.read() == b"1\n2\n3\n"
+
+    def test_plain_files_pass_through(self, tmp_path: Path) -> None:
+        """Test paths without .zst are read and written uncompressed."""
+        path = tmp_path / "articles.jsonl"
+
+        with open_jsonl_writer(path) as out_file:
+            out_file.write(b"plain\n")
+
+        assert path.read_bytes() == b"plain\n"
+        with open_jsonl_reader(path) as in_file:
+            assert in_file.read() == b"plain\n"
@@ -0,0 +1,37 @@
+"""Tests for pocketwiki_shared.formatting."""
+import pytest
+
+from pocketwiki_shared.formatting import format_duration, format_size
+
+
+@pytest.mark.parametrize(
+    "size,expected",
+    [
+        (0, "0 B"),
+        (1023, "1023 B"),
+        (1024, "1.0 KB"),
+        (1536, "1.5 KB"),
+        (1024**2 - 1, "1024.0 KB"),
+        (5 * 1024**2, "5.0 MB"),
+        (3 * 1024**3, "3.00 GB"),
+        (2 * 1024**4, "2048.00 GB"),
+    ],
+)
+def test_format_size(size: int, expected: str) -> None:
+    """Test sizes use the largest unit that fits, up to GB."""
+    assert format_size(size) == expected
+
+
+@pytest.mark.parametrize(
+    "seconds,expected",
+    [
+        (0.25, "0.2s"),
+        (59.9, "59.9s"),
+        (123.0, "2m 3.0s"),
+        (3600, "1h 0m"),
+        (7380.5, "2h 3m"),
+    ],
+)
+def test_format_duration(seconds: float, expected: str) -> None:
+    """Test durations switch to minutes and hours at their boundaries."""
+    assert format_duration(seconds) == expected
@@ -0,0 +1,73 @@
+"""Tests for file fingerprinting."""
+import hashlib
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from pocketwiki_shared.hashing import SAMPLE_BYTES, fingerprint_file, hash_bytes
+
+
+class TestFingerprintFile:
+    """Tests for fingerprint_file."""
+
+    def test_missing_file(self, tmp_path: Path) -> None:
+        """Test missing files fingerprint as 'none'."""
+        assert fingerprint_file(tmp_path / "missing.jsonl") == "none"
+
+    def test_stable_for_unchanged_file(self, tmp_path: Path) -> None:
+        """Test repeated fingerprints of the same file match."""
+        path = tmp_path / "data.jsonl"
+        path.write_bytes(b"hello\n" * 100)
+        assert fingerprint_file(path) == fingerprint_file(path)
+        assert len(fingerprint_file(path)) == 8
+
+    def test_detects_tail_change(self, tmp_path: Path) -> None:
+        """Test edits past the head sample still change the fingerprint."""
+        path = tmp_path / "data.jsonl"
+        data = bytearray(b"x" * (SAMPLE_BYTES * 3))
+        path.write_bytes(data)
+        st = path.stat()
+        before = fingerprint_file(path)
+
+        data[-1:] = b"y"
+        path.write_bytes(data)
+        # Keep size and mtime identical so only the sampled bytes differ
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert fingerprint_file(path) != before
+
+    def test_detects_mtime_change(self, tmp_path: Path) -> None:
+        """Test touching a file changes the fingerprint."""
+        path = tmp_path / "data.jsonl"
+        path.write_bytes(b"same")
+        before = fingerprint_file(path)
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert fingerprint_file(path) != before
+
+
+class TestHashBytes:
+    """Tests for hash_bytes."""
+
+    def test_deterministic(self) -> None:
+        """Test equal inputs hash equally and different inputs differ."""
+        assert hash_bytes(b"config") == hash_bytes(b"config")
+        assert hash_bytes(b"config") != hash_bytes(b"config2")
+
+    def test_stdlib_fallback(self) -> None:
+        """Test BLAKE2b is used when neither xxhash nor blake3 is installed."""
+        from pocketwiki_shared import hashing
+
+        with patch.object(hashing, "XXHASH_AVAILABLE", False), patch.object(
+            hashing, "BLAKE3_AVAILABLE", False
+        ):
+            digest = hash_bytes(b"config")
+
+        assert digest == hashlib.blake2b(b"config", digest_size=16).hexdigest()
+
+    def test_prefers_xxhash(self) -> None:
+        """Test XXH3-128 is used when xxhash is installed."""
+        xxhash = pytest.importorskip("xxhash")
+
+        assert hash_bytes(b"config") == xxhash.xxh3_128(b"config").hexdigest()
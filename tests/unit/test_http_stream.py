@@ -1,5 +1,6 @@
 """Tests for pocketwiki_builder.streaming.http_stream."""
 import bz2
+import shutil
 from pathlib import Path
 from unittest.mock import Mock, patch
 
@@ -9,7 +10,11 @@ from requests.exceptions import HTTPError, Timeout
 
 from pocketwiki_builder.streaming.http_stream import (
     HttpStreamError,
+    NotModifiedError,
+    parse_multistream_index,
+    source_not_modified,
     stream_bz2_from_url,
+    stream_bz2_multistream,
     get_etag,
     supports_range_requests,
 )
@@ -177,6 +182,229 @@ class TestStreamBz2FromUrl:
 
         assert "max retries" in str(exc_info.value).lower()
 
+    def test_body_read_error_is_retried(self) -> None:
+        """Test a connection dropped mid-body goes through the retry loop."""
+        from urllib3.exceptions import ProtocolError
+
+        response = Mock(status_code=200)
+        response.raw.read.side_effect = ProtocolError("Connection reset")
+
+        with patch(
+            "pocketwiki_builder.streaming.http_stream._SESSION.get",
+            return_value=response,
+        ), patch(
+            "pocketwiki_builder.streaming.http_stream._find_parallel_bz2",
+            return_value=None,
+        ):
+            with pytest.raises(HttpStreamError, match="after 0 retries"):
+                list(
+                    stream_bz2_from_url(
+                        "http://example.com/dump.xml.bz2", max_retries=0
+                    )
+                )
+
+        response.raw.read.assert_called_once_with(
+            4 * 1024 * 1024, decode_content=False
+        )
+
+    def test_local_bz2_file(self, sample_wiki_bz2: Path) -> None:
+        """Test file:// bz2 URLs decompress to the original XML."""
+        chunks = list(stream_bz2_from_url(f"file://{sample_wiki_bz2}", chunk_size=256))
+
+        assert b"".join(chunks) == bz2.decompress(sample_wiki_bz2.read_bytes())
+
+    @responses.activate
+    def test_not_modified_short_circuits(self) -> None:
+        """Test a 304 for a matching ETag raises instead of streaming."""
+        responses.add(
+            responses.GET,
+            "http://example.com/dump.xml.bz2",
+            status=304,
+            match=[responses.matchers.header_matcher({"If-None-Match": '"abc"'})],
+        )
+
+        with pytest.raises(NotModifiedError):
+            list(
+                stream_bz2_from_url(
+                    "http://example.com/dump.xml.bz2", if_none_match='"abc"'
+                )
+            )
+
+    def test_local_file_not_modified(self, sample_wiki_bz2: Path) -> None:
+        """Test file:// URLs compare the mtime ETag before decoding."""
+        url = f"file://{sample_wiki_bz2}"
+
+        with pytest.raises(NotModifiedError):
+            list(stream_bz2_from_url(url, if_none_match=get_etag(url)))
+
+        chunks = list(stream_bz2_from_url(url, if_none_match="stale"))
+        assert b"".join(chunks) == bz2.decompress(sample_wiki_bz2.read_bytes())
+
+    @responses.activate
+    def test_source_not_modified_sends_conditional_head(self) -> None:
+        """Test the ETag probe is a conditional HEAD, not a download."""
+        url = "http://example.com/dump.xml.bz2"
+        responses.add(
+            responses.HEAD,
+            url,
+            status=304,
+            match=[responses.matchers.header_matcher({"If-None-Match": '"abc"'})],
+        )
+        responses.add(responses.HEAD, url, headers={"ETag": '"def"'})
+
+        assert source_not_modified(url, '"abc"')
+        assert not source_not_modified(url, '"stale"')
+
+    def test_local_source_not_modified(self, sample_wiki_bz2: Path) -> None:
+        """Test file:// sources compare the mtime ETag."""
+        url = f"file://{sample_wiki_bz2}"
+
+        assert source_not_modified(url, get_etag(url))
+        assert not source_not_modified(url, "stale")
+
+    def test_local_multistream_bz2_file(self, tmp_path: Path) -> None:
+        """Test concatenated bz2 streams decode fully in bounded chunks."""
+        parts = [b"<page>%d</page>" % i * 5000 for i in range(3)]
+        path = tmp_path / "multistream.xml.bz2"
+        path.write_bytes(b"".join(bz2.compress(part) for part in parts) + b"\0\0")
+
+        chunks = list(stream_bz2_from_url(f"file://{path}", chunk_size=4096))
+
+        assert b"".join(chunks) == b"".join(parts)
+        assert max(len(chunk) for chunk in chunks) <= 4096
+
+    @responses.activate
+    def test_external_decoder(self, sample_wiki_bz2: Path) -> None:
+        """Test HTTP streams piped through an external bz2 decoder."""
+        bzip2 = shutil.which("bzip2")
+        if bzip2 is None:
+            pytest.skip("bzip2 not installed")
+        compressed_data = sample_wiki_bz2.read_bytes()
+
+        responses.add(
+            responses.GET,
+            "http://example.com/dump.xml.bz2",
+            body=compressed_data,
+            status=200,
+            stream=True,
+        )
+
+        with patch(
+            "pocketwiki_builder.streaming.http_stream._find_parallel_bz2",
+            return_value=bzip2,
+        ):
+            chunks = list(
+                stream_bz2_from_url("http://example.com/dump.xml.bz2", chunk_size=256)
+            )
+
+        assert b"".join(chunks) == bz2.decompress(compressed_data)
+
+
+def _write_multistream_dump(tmp_path: Path) -> tuple[Path, Path, bytes]:
+    """Write a header stream, page streams and a footer stream plus an index."""
+    header = b"<mediawiki><siteinfo/>"
+    pages = [b"<page>%d</page>" % i * 2000 for i in range(6)]
+    footer = b"</mediawiki>"
+
+    data = bytearray(bz2.compress(header))
+    index_lines = []
+    for i, page in enumerate(pages):
+        # Two index entries per stream, as in real dumps
+        index_lines.append(b"%d:%d:Title %d" % (len(data), 2 * i, 2 * i))
+        index_lines.append(b"%d:%d:Title %d" % (len(data), 2 * i + 1, 2 * i + 1))
+        data += bz2.compress(page)
+    data += bz2.compress(footer)
+
+    dump = tmp_path / "dump-multistream.xml.bz2"
+    dump.write_bytes(bytes(data))
+    index = tmp_path / "dump-multistream-index.txt.bz2"
+    index.write_bytes(bz2.compress(b"\n".join(index_lines) + b"\n"))
+    return dump, index, header + b"".join(pages) + footer
+
+
+class TestStreamBz2Multistream:
+    """Tests for parallel multistream decompression."""
+
+    def test_parse_index(self) -> None:
+        """Test offsets are parsed, de-duplicated and sorted."""
+        lines = [b"600:10:A", b"600:11:B:with:colons", b"5000:12:C", b"\n"]
+        assert parse_multistream_index(lines) == [600, 5000]
+
+    def test_local_dump_in_order(self, tmp_path: Path) -> None:
+        """Test streams decompressed in parallel come back in file order."""
+        dump, index, expected = _write_multistream_dump(tmp_path)
+
+        # One stream per segment so every stream is a separate task
+        with patch(
+            "pocketwiki_builder.streaming.http_stream._MULTISTREAM_SEGMENT_BYTES", 1
+        ):
+            chunks = list(
+                stream_bz2_multistream(
+                    f"file://{dump}", f"file://{index}", workers=3, chunk_size=1024
+                )
+            )
+
+        assert b"".join(chunks) == expected
+        assert max(len(chunk) for chunk in chunks) <= 1024
+
+    @responses.activate
+    def test_http_range_requests(self, tmp_path: Path) -> None:
+        """Test remote dumps are fetched as disjoint byte ranges."""
+        dump, index, expected = _write_multistream_dump(tmp_path)
+        data = dump.read_bytes()
+        url = "http://example.com/dump-multistream.xml.bz2"
+        ranges = []
+
+        def serve_range(request):
+            start, end = request.headers["Range"].removeprefix("bytes=").split("-")
+            ranges.append((int(start), int(end)))
+            return (206, {}, data[int(start) : int(end) + 1])
+
+        responses.add(
+            responses.HEAD, url, headers={"Content-Length": str(len(data))}
+        )
+        responses.add_callback(responses.GET, url, callback=serve_range)
+
+        with patch(
+            "pocketwiki_builder.streaming.http_stream._MULTISTREAM_SEGMENT_BYTES", 1
+        ):
+            chunks = list(stream_bz2_multistream(url, f"file://{index}", workers=2))
+
+        assert b"".join(chunks) == expected
+        # Header, one range per page stream (the last also holding the
+        # footer), contiguous and covering the whole file
+        ranges.sort()
+        assert len(ranges) == 7
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data) - 1
+        assert all(a[1] + 1 == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+class TestSession:
+    """Tests for the shared HTTP session."""
+
+    @responses.activate
+    def test_requests_share_session(self) -> None:
+        """Test probes and downloads go through one pooled session."""
+        from pocketwiki_builder.streaming import http_stream
+
+        responses.add(
+            responses.HEAD,
+            "http://example.com/dump.xml.bz2",
+            headers={"ETag": '"abc"', "Accept-Ranges": "bytes"},
+            status=200,
+        )
+
+        with patch.object(
+            http_stream._SESSION, "head", wraps=http_stream._SESSION.head
+        ) as mock_head:
+            get_etag("http://example.com/dump.xml.bz2")
+            supports_range_requests("http://example.com/dump.xml.bz2")
+
+        assert mock_head.call_count == 2
+        adapter = http_stream._SESSION.get_adapter("https://dumps.wikimedia.org/")
+        assert adapter._pool_maxsize == 16
+        assert adapter.max_retries.total == 0
+
 
 class TestGetEtag:
     """Tests for get_etag function."""
@@ -0,0 +1,47 @@
+"""Tests for pocketwiki_builder.streaming.iter_stream."""
+from io import BytesIO
+from pathlib import Path
+
+from pocketwiki_builder.streaming.iter_stream import IterStream
+from pocketwiki_builder.streaming.xml_parser import WikiXmlParser
+
+
+class TestIterStream:
+    """Tests for IterStream adapter."""
+
+    def test_read_across_chunks(self) -> None:
+        """Test reads span chunk boundaries and skip empty chunks."""
+        stream = IterStream(iter([b"abc", b"", b"defg", b"h"]))
+
+        assert stream.read(2) == b"ab"
+        assert stream.read(3) == b"c"
+        assert stream.read(5) == b"defg"
+        assert stream.read() == b"h"
+        assert stream.read(1) == b""
+        assert stream.bytes_read == 8
+
+    def test_consumes_lazily(self) -> None:
+        """Test chunks are pulled only as the reader needs them."""
+        pulled = []
+
+        def chunks():
+            for chunk in (b"one", b"two", b"three"):
+                pulled.append(chunk)
+                yield chunk
+
+        stream = IterStream(chunks())
+        stream.read(2)
+
+        assert pulled == [b"one"]
+        assert stream.bytes_read == 2
+
+    def test_parses_like_bytesio(self, sample_wiki_xml: Path) -> None:
+        """Test the XML parser yields the same articles as from a buffer."""
+        data = sample_wiki_xml.read_bytes()
+        chunks = (data[i : i + 100] for i in range(0, len(data), 100))
+
+        streamed = list(WikiXmlParser().parse(IterStream(chunks)))
+        buffered = list(WikiXmlParser().parse(BytesIO(data)))
+
+        assert streamed == buffered
+        assert len(streamed) > 0
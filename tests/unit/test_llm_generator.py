@@ -77,8 +77,115 @@ class TestLLMGenerator:
             model_path=str(model_path),
             n_ctx=2048,
             n_gpu_layers=5,
+            n_threads=generator.n_threads,
+            n_batch=512,
+            use_mmap=True,
+            use_mlock=True,
             verbose=True,
         )
+        assert generator.n_threads >= 1
+
+    @patch("llama_cpp.Llama", autospec=False)
+    def test_load_warms_prompt_preamble(
+        self, mock_llama_class: MagicMock, tmp_path: Path
+    ) -> None:
+        """Test the shared preamble is evaluated once at load time."""
+        from pocketwiki_chat.llm.generator import LLMGenerator
+        from pocketwiki_chat.llm.prompts import RAG_PREAMBLE, format_rag_prompt
+
+        model_path = tmp_path / "model.gguf"
+        model_path.write_bytes(b"fake gguf data")
+
+        mock_model = MagicMock()
+        mock_model.tokenize.return_value = [1, 2, 3]
+        mock_llama_class.return_value = mock_model
+
+        LLMGenerator(model_path=model_path).model
+
+        mock_model.tokenize.assert_called_once_with(
+            RAG_PREAMBLE.encode("utf-8"), special=True
+        )
+        mock_model.eval.assert_called_once_with([1, 2, 3])
+        assert format_rag_prompt(query="q", context="c").startswith(RAG_PREAMBLE)
+
+    @patch("llama_cpp.Llama", autospec=False)
+    def test_preamble_warmup_failure_is_not_fatal(
+        self, mock_llama_class: MagicMock, tmp_path: Path
+    ) -> None:
+        """Test a failed warm-up still returns the loaded model."""
+        from pocketwiki_chat.llm.generator import LLMGenerator
+
+        model_path = tmp_path / "model.gguf"
+        model_path.write_bytes(b"fake gguf data")
+
+        mock_model = MagicMock()
+        mock_model.eval.side_effect = RuntimeError("llama_decode failed")
+        mock_llama_class.return_value = mock_model
+
+        assert LLMGenerator(model_path=model_path).model is mock_model
+
+    @patch("llama_cpp.Llama", autospec=False)
+    def test_count_tokens_cached(
+        self, mock_llama_class: MagicMock, tmp_path: Path
+    ) -> None:
+        """Test token counts come from the model and are cached per text."""
+        from pocketwiki_chat.llm.generator import LLMGenerator
+
+        model_path = tmp_path / "model.gguf"
+        model_path.write_bytes(b"fake gguf data")
+
+        mock_model = MagicMock()
+        mock_model.tokenize.return_value = [1, 2, 3]
+        mock_llama_class.return_value = mock_model
+
+        generator = LLMGenerator(model_path=model_path)
+
+        assert generator.count_tokens("héllo") == 3
+        assert generator.count_tokens("héllo") == 3
+        counted = [
+            c for c in mock_model.tokenize.call_args_list if c.kwargs.get("add_bos") is False
+        ]
+        assert counted == [(("héllo".encode("utf-8"),), {"add_bos": False})]
+
+    @patch("llama_cpp.Llama", autospec=False)
+    def test_eager_load_in_background(
+        self, mock_llama_class: MagicMock, tmp_path: Path
+    ) -> None:
+        """Test eager_load loads the model before first use."""
+        import threading
+
+        from pocketwiki_chat.llm.generator import LLMGenerator
+
+        model_path = tmp_path / "model.gguf"
+        model_path.write_bytes(b"fake gguf data")
+
+        loaded = threading.Event()
+        mock_model = MagicMock()
+
+        def load(**kwargs):
+            loaded.set()
+            return mock_model
+
+        mock_llama_class.side_effect = load
+
+        generator = LLMGenerator(model_path=model_path, eager_load=True)
+
+        assert loaded.wait(timeout=5)
+        assert generator.model is mock_model
+        mock_llama_class.assert_called_once()
+
+    def test_eager_load_failure_deferred(self, tmp_path: Path) -> None:
+        """Test a failed background load is reported on first use."""
+        from pocketwiki_chat.llm.generator import LLMGenerator
+
+        with patch("threading.Thread.start", lambda t: t.run()):
+            generator = LLMGenerator(
+                model_path=tmp_path / "missing.gguf", eager_load=True
+            )
+
+        assert generator.is_loaded() is False
+        with pytest.raises(FileNotFoundError, match="Model file not found"):
+            generator.model
 
     @patch("llama_cpp.Llama", autospec=False)
     def test_load_model_lazy(self, mock_llama_class: MagicMock, tmp_path: Path) -> None:
@@ -41,6 +41,108 @@ class TestChunkStage:
         chunks = [json.loads(line) for line in output_file.read_text().strip().split("\n")]
         assert len(chunks) > 2  # Should be split into multiple chunks
 
+    def test_chunk_ids_are_strings(self, temp_work_dir: Path) -> None:
+        """Test numeric article IDs are written as string chunk/page IDs."""
+        from pocketwiki_builder.pipeline.chunk import ChunkStage, ChunkConfig
+
+        input_file = temp_work_dir / "parsed" / "articles.jsonl"
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        input_file.write_text(json.dumps({"id": 42, "title": "T", "text": "a b c"}))
+
+        config = ChunkConfig(
+            input_file=str(input_file),
+            output_dir=str(temp_work_dir / "chunks"),
+        )
+        ChunkStage(config, temp_work_dir).run()
+
+        output_file = temp_work_dir / "chunks" / "chunks.jsonl"
+        chunk = json.loads(output_file.read_text().splitlines()[0])
+        assert chunk["chunk_id"] == "42-0"
+        assert chunk["page_id"] == "42"
+
+    def test_chunks_overlap(self, temp_work_dir: Path) -> None:
+        """Test consecutive chunks share overlap_tokens words."""
+        from pocketwiki_builder.pipeline.chunk import ChunkStage, ChunkConfig
+
+        input_file = temp_work_dir / "parsed" / "articles.jsonl"
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        words = [f"w{i}" for i in range(25)]
+        article = {"id": "1", "title": "Test", "text": " ".join(words)}
+        input_file.write_text(json.dumps(article))
+
+        config = ChunkConfig(
+            input_file=str(input_file),
+            output_dir=str(temp_work_dir / "chunks"),
+            max_chunk_tokens=10,
+            overlap_tokens=3,
+        )
+        ChunkStage(config, temp_work_dir).run()
+
+        output_file = temp_work_dir / "chunks" / "chunks.jsonl"
+        chunks = [json.loads(line)["text"].split() for line in output_file.read_text().splitlines()]
+        assert chunks == [words[0:10], words[7:17], words[14:24], words[21:25]]
+
+    def test_parallel_chunking_matches_serial(self, temp_work_dir: Path) -> None:
+        """Test byte-range workers produce the same output as a single pass."""
+        from pocketwiki_builder.pipeline import chunk as chunk_module
+        from pocketwiki_builder.pipeline.chunk import ChunkStage, ChunkConfig
+
+        input_file = temp_work_dir / "parsed" / "articles.jsonl"
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        articles = [
+            {"id": str(i), "title": f"T{i}", "text": " ".join(["wörd"] * (i * 7 + 3))}
+            for i in range(40)
+        ]
+        input_file.write_text("\n".join(json.dumps(a) for a in articles) + "\n")
+
+        outputs = []
+        for num_workers in (1, 3):
+            config = ChunkConfig(
+                input_file=str(input_file),
+                output_dir=str(temp_work_dir / f"chunks{num_workers}"),
+                max_chunk_tokens=10,
+                num_workers=num_workers,
+            )
+            with patch.object(chunk_module, "_MIN_RANGE_BYTES", 64):
+                ChunkStage(config, temp_work_dir).run()
+            output_dir = temp_work_dir / f"chunks{num_workers}"
+            assert sorted(p.name for p in output_dir.iterdir()) == ["chunks.jsonl"]
+            outputs.append((output_dir / "chunks.jsonl").read_bytes())
+
+        assert outputs[0] == outputs[1]
+
+    def test_chunks_zstd_input(self, temp_work_dir: Path) -> None:
+        """Test zstd-compressed articles chunk like their plain counterpart."""
+        import zstandard
+
+        from pocketwiki_builder.pipeline.chunk import ChunkStage, ChunkConfig
+
+        articles = [
+            {"id": str(i), "title": f"T{i}", "text": " ".join(["wörd"] * (i * 7 + 3))}
+            for i in range(40)
+        ]
+        data = ("\n".join(json.dumps(a) for a in articles) + "\n").encode()
+        plain = temp_work_dir / "parsed" / "articles.jsonl"
+        plain.parent.mkdir(parents=True, exist_ok=True)
+        plain.write_bytes(data)
+        compressed = plain.with_name("articles.jsonl.zst")
+        compressed.write_bytes(zstandard.ZstdCompressor().compress(data))
+
+        outputs = []
+        for input_file in (plain, compressed):
+            output_dir = temp_work_dir / f"chunks-{input_file.suffix}"
+            config = ChunkConfig(
+                input_file=str(input_file),
+                output_dir=str(output_dir),
+                max_chunk_tokens=10,
+                num_workers=3,
+            )
+            with pytest.warns(DeprecationWarning):
+                ChunkStage(config, temp_work_dir).run()
+            outputs.append((output_dir / "chunks.jsonl").read_bytes())
+
+        assert outputs[0] == outputs[1]
+
 
 class TestFilterStage:
     """Tests for filtering stage."""
@@ -76,6 +178,138 @@ class TestFilterStage:
         filtered = [json.loads(line) for line in output_file.read_text().strip().split("\n")]
         assert len(filtered) == 2  # Only 2 good chunks
 
+    def test_filter_keeps_utf8_text(self, temp_work_dir: Path) -> None:
+        """Test kept chunks are written as raw UTF-8, byte-for-byte."""
+        from pocketwiki_builder.pipeline.filter import FilterStage, FilterConfig
+
+        input_file = temp_work_dir / "chunks" / "chunks.jsonl"
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        chunk = {"id": "1", "text": "Zürich – 東京 naïve café", "page_title": "Städte"}
+        input_file.write_text(json.dumps(chunk, ensure_ascii=False) + "\n", encoding="utf-8")
+
+        config = FilterConfig(
+            input_file=str(input_file),
+            output_dir=str(temp_work_dir / "filtered"),
+            min_chunk_length=5,
+        )
+        with pytest.warns(DeprecationWarning):
+            FilterStage(config, temp_work_dir).run()
+
+        output = (temp_work_dir / "filtered" / "filtered.jsonl").read_bytes()
+        assert "東京".encode("utf-8") in output
+        assert json.loads(output) == chunk
+
+    def test_filter_passes_through_text_len_records(self, temp_work_dir: Path) -> None:
+        """Test records carrying text_len are filtered on it and copied verbatim."""
+        from pocketwiki_builder.pipeline.filter import FilterStage, FilterConfig
+
+        input_file = temp_work_dir / "chunks" / "chunks.jsonl"
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        kept = b'{"text_len":30,"chunk_id":"1-0","text":"thirty characters of text here"}\n'
+        dropped = b'{"text_len":4,"chunk_id":"2-0","text":"stub"}\n'
+        input_file.write_bytes(kept + dropped)
+
+        config = FilterConfig(
+            input_file=str(input_file),
+            output_dir=str(temp_work_dir / "filtered"),
+            min_chunk_length=20,
+        )
+        with pytest.warns(DeprecationWarning):
+            FilterStage(config, temp_work_dir).run()
+
+        assert (temp_work_dir / "filtered" / "filtered.jsonl").read_bytes() == kept
+
+    def test_input_hash_fingerprints_without_reading_input(self, temp_work_dir: Path) -> None:
+        """Test the input hash tracks input changes without loading the file."""
+        from pocketwiki_builder.pipeline.filter import FilterStage, FilterConfig
+
+        input_file = temp_work_dir / "chunks" / "chunks.jsonl"
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        input_file.write_bytes(b'{"text_len":4,"text":"stub"}\n' * 1000)
+
+        config = FilterConfig(
+            input_file=str(input_file),
+            output_dir=str(temp_work_dir / "filtered"),
+        )
+        with pytest.warns(DeprecationWarning):
+            stage = FilterStage(config, temp_work_dir)
+
+        with patch.object(Path, "read_bytes", side_effect=AssertionError("full read")):
+            before = stage.compute_input_hash()
+        assert stage.compute_input_hash() == before
+
+        input_file.write_bytes(b'{"text_len":5,"text":"stubs"}\n' * 1000)
+        assert stage.compute_input_hash() != before
+
+
+class TestChunkFilterStage:
+    """Tests for fused chunk + filter stage."""
+
+    def test_matches_chunk_then_filter(self, temp_work_dir: Path) -> None:
+        """Test the fused stage writes what Chunk followed by Filter would."""
+        from pocketwiki_builder.pipeline.chunk import ChunkStage, ChunkConfig
+        from pocketwiki_builder.pipeline.chunk_filter import (
+            ChunkFilterStage,
+            ChunkFilterConfig,
+        )
+        from pocketwiki_builder.pipeline.filter import FilterStage, FilterConfig
+
+        input_file = temp_work_dir / "parsed" / "articles.jsonl"
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        articles = [
+            {"id": "1", "title": "Long", "text": " ".join(["word"] * 45)},
+            {"id": "2", "title": "Stub", "text": "tiny"},
+        ]
+        input_file.write_text("\n".join(json.dumps(a) for a in articles))
+
+        with pytest.warns(DeprecationWarning):
+            ChunkStage(
+                ChunkConfig(
+                    input_file=str(input_file),
+                    output_dir=str(temp_work_dir / "chunks"),
+                    max_chunk_tokens=20,
+                    overlap_tokens=0,
+                ),
+                temp_work_dir,
+            ).run()
+        with pytest.warns(DeprecationWarning):
+            FilterStage(
+                FilterConfig(
+                    input_file=str(temp_work_dir / "chunks" / "chunks.jsonl"),
+                    output_dir=str(temp_work_dir / "filtered"),
+                    min_chunk_length=50,
+                ),
+                temp_work_dir,
+            ).run()
+
+        config = ChunkFilterConfig(
+            input_file=str(input_file),
+            output_dir=str(temp_work_dir / "fused"),
+            max_chunk_tokens=20,
+            overlap_tokens=0,
+            min_chunk_length=50,
+        )
+        ChunkFilterStage(config, temp_work_dir).run()
+
+        fused = [
+            json.loads(line)
+            for line in (temp_work_dir / "fused" / "filtered.jsonl").open()
+        ]
+        # text_len is only written for the legacy FilterStage to read
+        legacy = [
+            {k: v for k, v in json.loads(line).items() if k != "text_len"}
+            for line in (temp_work_dir / "filtered" / "filtered.jsonl").open()
+        ]
+        assert fused == legacy
+        # Two full 20-word chunks survive; the 5-word tail and the stub do not
+        assert [chunk["chunk_id"] for chunk in fused] == ["1-0", "1-1"]
+
+        # Embed reads the same chunks from the Parquet export
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(temp_work_dir / "fused" / "filtered.parquet")
+        assert table.column("chunk_id").to_pylist() == ["1-0", "1-1"]
+
 
 class TestEmbedStage:
     """Tests for embedding stage."""
@@ -114,6 +348,83 @@ class TestEmbedStage:
         output_file = temp_work_dir / "embeddings" / "embeddings.npy"
         assert output_file.exists()
 
+    @patch("pocketwiki_builder.pipeline.embed.SentenceTransformer")
+    def test_embed_preserves_chunk_order(
+        self, mock_model_class: Mock, temp_work_dir: Path
+    ) -> None:
+        """Test length-sorted encoding writes rows back in input order."""
+        from pocketwiki_builder.pipeline import embed
+        from pocketwiki_builder.pipeline.embed import EmbedStage, EmbedConfig
+
+        # Encode each text as a row filled with its length
+        mock_model = Mock()
+        mock_model.encode.side_effect = lambda texts, **kwargs: np.array(
+            [[float(len(t))] * 4 for t in texts], dtype=np.float32
+        )
+        mock_model_class.return_value = mock_model
+
+        input_file = temp_work_dir / "filtered" / "filtered.jsonl"
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        texts = ["a much longer chunk of text", "short", "medium text"]
+        input_file.write_text("\n".join(json.dumps({"text": t}) for t in texts))
+
+        config = EmbedConfig(
+            input_file=str(input_file),
+            output_dir=str(temp_work_dir / "embeddings"),
+            device="cpu",
+        )
+        with patch.dict(embed._MODEL_CACHE, clear=True):
+            EmbedStage(config, temp_work_dir).run()
+
+        embeddings_file = temp_work_dir / "embeddings" / "embeddings.npy"
+        embeddings = np.load(embeddings_file, mmap_mode="r")
+        assert embeddings.dtype == np.float16
+        assert (temp_work_dir / "embeddings" / "embeddings.normalized").exists()
+        assert embeddings[:, 0].tolist() == [float(len(t)) for t in texts]
+
+    @patch("pocketwiki_builder.pipeline.embed.SentenceTransformer")
+    def test_embed_from_parquet(self, mock_model_class: Mock, temp_work_dir: Path) -> None:
+        """Test embedding chunks read from the Parquet export."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from pocketwiki_builder.pipeline import embed
+        from pocketwiki_builder.pipeline.embed import EmbedStage, EmbedConfig
+
+        mock_model = Mock()
+        mock_model.encode.side_effect = lambda texts, **kwargs: np.array(
+            [[float(len(t))] * 4 for t in texts], dtype=np.float32
+        )
+        mock_model_class.return_value = mock_model
+
+        input_file = temp_work_dir / "filtered" / "filtered.parquet"
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        texts = ["one", "three", "fifteen chars!!"]
+        pq.write_table(pa.table({"chunk_id": ["a", "b", "c"], "text": texts}), input_file)
+
+        config = EmbedConfig(
+            input_file=str(input_file),
+            output_dir=str(temp_work_dir / "embeddings"),
+            device="cpu",
+        )
+        with patch.dict(embed._MODEL_CACHE, clear=True):
+            EmbedStage(config, temp_work_dir).run()
+
+        embeddings_file = temp_work_dir / "embeddings" / "embeddings.npy"
+        embeddings = np.load(embeddings_file, mmap_mode="r")
+        assert embeddings[:, 0].tolist() == [float(len(t)) for t in texts]
+
+    @patch("pocketwiki_builder.pipeline.embed.SentenceTransformer")
+    def test_model_loaded_once_per_process(self, mock_model_class: Mock) -> None:
+        """Test repeated loads of the same model reuse the cached instance."""
+        from pocketwiki_builder.pipeline import embed
+
+        with patch.dict(embed._MODEL_CACHE, clear=True):
+            first = embed._load_model("all-MiniLM-L6-v2", "cpu", batch_size=32)
+            second = embed._load_model("all-MiniLM-L6-v2", "cpu", batch_size=32)
+
+        assert first is second
+        mock_model_class.assert_called_once_with("all-MiniLM-L6-v2", device="cpu")
+
 
 class TestFAISSIndexStage:
     """Tests for FAISS indexing."""
@@ -129,8 +440,8 @@ class TestFAISSIndexStage:
         # Create embeddings
         embeddings_file = temp_work_dir / "embeddings" / "embeddings.npy"
         embeddings_file.parent.mkdir(parents=True, exist_ok=True)
-        embeddings = np.random.rand(1000, 384).astype(np.float32)
-        np.save(embeddings_file, embeddings)
+        embeddings = np.random.default_rng(0).random((1000, 384), dtype=np.float32)
+        np.save(embeddings_file, embeddings, allow_pickle=False)
 
         config = FAISSConfig(
             embeddings_file=str(embeddings_file),
@@ -141,6 +452,116 @@ class TestFAISSIndexStage:
         stage = FAISSIndexStage(config, temp_work_dir)
         # Would test actual index creation if not mocked
 
+    def test_large_corpus_uses_opq_ivfpq(self, temp_work_dir: Path) -> None:
+        """Test the fallback large-corpus index is an inner-product OPQ+IVF-PQ."""
+        import faiss
+        from pocketwiki_builder.pipeline import faiss_index
+        from pocketwiki_builder.pipeline.faiss_index import FAISSIndexStage, FAISSConfig
+
+        embeddings_file = temp_work_dir / "embeddings" / "embeddings.npy"
+        embeddings_file.parent.mkdir(parents=True, exist_ok=True)
+        rng = np.random.default_rng(0)
+        np.save(
+            embeddings_file,
+            rng.random((1000, 16)).astype(np.float16),
+            allow_pickle=False,
+        )
+
+        config = FAISSConfig(
+            embeddings_file=str(embeddings_file),
+            output_dir=str(temp_work_dir / "indexes"),
+            n_clusters=100,
+            n_subquantizers=4,
+            bits_per_code=4,
+        )
+        with patch.object(faiss_index, "AUTOFAISS_AVAILABLE", False):
+            FAISSIndexStage(config, temp_work_dir).run()
+
+        index = faiss.read_index(str(temp_work_dir / "indexes" / "dense.faiss"))
+        assert isinstance(index, faiss.IndexPreTransform)
+        assert index.metric_type == faiss.METRIC_INNER_PRODUCT
+        assert index.ntotal == 1000
+        ivf = faiss.extract_index_ivf(index)
+        assert ivf.nlist == faiss_index._ivf_nlist(1000)
+
+    def test_skips_normalize_for_marked_embeddings(self, temp_work_dir: Path) -> None:
+        """Test embeddings marked as normalized are indexed without renormalizing."""
+        from pocketwiki_builder.pipeline import faiss_index
+        from pocketwiki_builder.pipeline.faiss_index import FAISSIndexStage, FAISSConfig
+
+        embeddings_file = temp_work_dir / "embeddings" / "embeddings.npy"
+        embeddings_file.parent.mkdir(parents=True, exist_ok=True)
+        np.save(embeddings_file, np.eye(10, 8, dtype=np.float16), allow_pickle=False)
+        embeddings_file.with_suffix(".normalized").touch()
+
+        config = FAISSConfig(
+            embeddings_file=str(embeddings_file),
+            output_dir=str(temp_work_dir / "indexes"),
+        )
+        with patch.object(faiss_index.faiss, "normalize_L2") as mock_normalize:
+            FAISSIndexStage(config, temp_work_dir).run()
+
+        mock_normalize.assert_not_called()
+        assert (temp_work_dir / "indexes" / "dense.faiss").exists()
+
+    def test_autofaiss_reads_normalized_vectors_from_disk(
+        self, temp_work_dir: Path
+    ) -> None:
+        """Test autofaiss gets an on-disk fp32 copy instead of an in-memory one."""
+        import faiss
+        from pocketwiki_builder.pipeline import faiss_index
+        from pocketwiki_builder.pipeline.faiss_index import FAISSIndexStage, FAISSConfig
+
+        embeddings_file = temp_work_dir / "embeddings" / "embeddings.npy"
+        embeddings_file.parent.mkdir(parents=True, exist_ok=True)
+        embeddings = np.random.default_rng(0).random((300, 8)).astype(np.float16)
+        np.save(embeddings_file, embeddings, allow_pickle=False)
+
+        config = FAISSConfig(
+            embeddings_file=str(embeddings_file),
+            output_dir=str(temp_work_dir / "indexes"),
+            n_clusters=100,
+        )
+        received = {}
+
+        def build_index(embeddings, **kwargs):
+            (received["file"],) = Path(embeddings).glob("*.npy")
+            received["vectors"] = np.load(received["file"])
+            index = faiss.IndexFlatIP(8)
+            index.add(received["vectors"])
+            return index, {}
+
+        with patch.object(faiss_index, "AUTOFAISS_AVAILABLE", True), patch.object(
+            faiss_index, "build_index", build_index, create=True
+        ), patch.object(faiss_index, "_ADD_BLOCK_BYTES", 4 * 8 * 64):
+            FAISSIndexStage(config, temp_work_dir).run()
+
+        vectors = received["vectors"]
+        assert vectors.dtype == np.float32
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+        expected = embeddings.astype(np.float32)
+        expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+        np.testing.assert_allclose(vectors, expected, rtol=1e-5)
+        # The copy is removed once the index is built, leaving only the outputs
+        assert not received["file"].exists()
+        outputs = FAISSIndexStage(config, temp_work_dir).get_output_files()
+        assert sorted((temp_work_dir / "indexes").iterdir()) == outputs
+
+    def test_training_sample_is_bounded(self) -> None:
+        """Test IVF training uses a subsample of at most 256 points per list."""
+        from pocketwiki_builder.pipeline import faiss_index
+
+        embeddings = np.arange(2000 * 4, dtype=np.float32).reshape(2000, 4)
+        with patch.object(faiss_index, "_MIN_TRAIN_POINTS", 100):
+            sample = faiss_index._training_sample(embeddings, nlist=2)
+
+        assert sample.shape == (512, 4)
+        assert sample.dtype == np.float32
+        assert sample.flags["C_CONTIGUOUS"]
+        np.testing.assert_allclose(np.linalg.norm(sample, axis=1), 1.0, rtol=1e-5)
+        # Rows are drawn from the input without replacement
+        assert len(np.unique(sample[:, 0])) == 512
+
 
 class TestPackageStage:
     """Tests for packaging stage."""
@@ -168,3 +589,102 @@ class TestPackageStage:
 
         data = json.loads(manifest.read_text())
         assert "version" in data
+
+    def test_copy_file_preserves_content_and_mtime(self, temp_work_dir: Path) -> None:
+        """Test bundle copies match the source bytes and modification time."""
+        import os
+
+        from pocketwiki_builder.pipeline.package import _copy_file
+
+        src = temp_work_dir / "src.bin"
+        src.write_bytes(os.urandom(3 * 1024 * 1024))
+        os.utime(src, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+        dst = temp_work_dir / "dst.bin"
+
+        _copy_file(src, dst)
+
+        assert dst.read_bytes() == src.read_bytes()
+        assert dst.stat().st_mtime_ns == src.stat().st_mtime_ns
+
+    def test_copy_file_falls_back_when_kernel_copy_unsupported(self, temp_work_dir: Path) -> None:
+        """Test copying falls back to shutil when reflink/copy_file_range fail."""
+        import errno
+
+        from pocketwiki_builder.pipeline import package
+
+        src = temp_work_dir / "src.jsonl"
+        src.write_bytes(b'{"chunk_id":"1-0"}\n' * 100)
+        dst = temp_work_dir / "dst.jsonl"
+
+        unsupported = OSError(errno.EXDEV, "cross-device")
+        with patch.object(package.fcntl, "ioctl", side_effect=unsupported), patch.object(
+            package.os, "copy_file_range", side_effect=unsupported, create=True
+        ):
+            package._copy_file(src, dst)
+
+        assert dst.read_bytes() == src.read_bytes()
+
+    def test_manifest_counts_chunks_and_pages(self, temp_work_dir: Path) -> None:
+        """Test manifest counts come from the packaged chunks file."""
+        from pocketwiki_builder.pipeline.package import PackageStage, PackageConfig
+
+        filtered = temp_work_dir / "filtered" / "filtered.jsonl"
+        filtered.parent.mkdir(parents=True, exist_ok=True)
+        chunks = [
+            {"text_len": 5, "chunk_id": "736-0", "page_id": "736", "page_title": '"page_id": 1', "text": "a"},
+            {"text_len": 5, "chunk_id": "736-1", "page_id": "736", "page_title": "E", "text": "b"},
+            {"text_len": 5, "chunk_id": "42-0", "page_id": 42, "page_title": "Z", "text": "c"},
+        ]
+        # Last record deliberately lacks a trailing newline
+        filtered.write_text("\n".join(json.dumps(c) for c in chunks))
+
+        config = PackageConfig(
+            work_dir=str(temp_work_dir),
+            output_bundle=str(temp_work_dir / "bundle"),
+        )
+        PackageStage(config, temp_work_dir).run()
+
+        data = json.loads((temp_work_dir / "bundle" / "manifest.json").read_text())
+        assert data["num_chunks"] == 3
+        assert data["num_articles"] == 2
+
+        # Offsets index locates every record in the packaged file
+        packaged = (temp_work_dir / "bundle" / "chunks.jsonl").read_bytes()
+        index = np.fromfile(temp_work_dir / "bundle" / "chunks.idx", dtype=np.int64)
+        records = [
+            json.loads(packaged[offset : offset + length])
+            for offset, length in index.reshape(-1, 2)
+        ]
+        assert records == chunks
+
+    def test_copies_available_files_concurrently(self, temp_work_dir: Path) -> None:
+        """Test every present file is copied and missing ones are skipped."""
+        from pocketwiki_builder.pipeline.package import PackageStage, PackageConfig
+
+        (temp_work_dir / "indexes").mkdir(parents=True, exist_ok=True)
+        (temp_work_dir / "indexes" / "dense.faiss").write_bytes(b"dense" * 1000)
+        (temp_work_dir / "indexes" / "sparse.postings").write_bytes(b"postings")
+
+        config = PackageConfig(
+            work_dir=str(temp_work_dir),
+            output_bundle=str(temp_work_dir / "bundle"),
+        )
+        PackageStage(config, temp_work_dir).run()
+
+        bundle = temp_work_dir / "bundle"
+        assert (bundle / "dense.faiss").read_bytes() == b"dense" * 1000
+        assert (bundle / "sparse.postings").read_bytes() == b"postings"
+        assert not (bundle / "sparse.dict").exists()
+        assert not (bundle / "chunks.jsonl").exists()
+
+    def test_index_chunks_handles_empty_file(self, temp_work_dir: Path) -> None:
+        """Test indexing an empty chunks file doesn't try to map it."""
+        from pocketwiki_builder.pipeline.package import _index_chunks
+
+        chunks_file = temp_work_dir / "chunks.jsonl"
+        chunks_file.write_bytes(b"")
+
+        offsets, num_articles = _index_chunks(chunks_file)
+
+        assert offsets.shape == (0, 2)
+        assert num_articles == 0
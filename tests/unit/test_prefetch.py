@@ -0,0 +1,32 @@
+"""Tests for pocketwiki_builder.streaming.prefetch."""
+import threading
+
+import pytest
+
+from pocketwiki_builder.streaming.prefetch import prefetch
+
+
+class TestPrefetch:
+    """Tests for prefetch function."""
+
+    def test_prefetch_preserves_order_and_errors(self) -> None:
+        """Test read-ahead yields items in order and re-raises producer errors."""
+        assert list(prefetch(iter([["a"], ["b"], ["c"]]), depth=1)) == [
+            ["a"],
+            ["b"],
+            ["c"],
+        ]
+
+        def failing():
+            yield ["a"]
+            raise ValueError("bad line")
+
+        with pytest.raises(ValueError, match="bad line"):
+            list(prefetch(failing(), depth=2))
+
+    def test_produces_on_background_thread(self) -> None:
+        """Test the producer runs on a named worker thread."""
+        def producer():
+            yield threading.current_thread().name
+
+        assert list(prefetch(producer(), depth=1, name="xml-parse")) == ["xml-parse"]
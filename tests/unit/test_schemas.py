@@ -64,6 +64,7 @@ class TestStreamParseConfig:
         assert config.checkpoint_every_pages == 1000
         assert config.checkpoint_every_seconds == 60
         assert config.checkpoint_every_bytes == 104857600
+        assert config.http_chunk_size == 4 * 1024 * 1024
         assert config.max_retries == 5
         assert config.skip_redirects is True
 
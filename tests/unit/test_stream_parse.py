@@ -1,4 +1,5 @@
 """Tests for pocketwiki_builder.pipeline.stream_parse."""
+import bz2
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 import json
@@ -6,9 +7,36 @@ import json
 import pytest
 
 from pocketwiki_builder.pipeline.stream_parse import StreamParseStage
+from pocketwiki_builder.streaming.checkpoint import CheckpointManager
 from pocketwiki_shared.schemas import StreamParseConfig
 
 
+def _write_multistream_dump(path: Path, num_pages: int = 40) -> Path:
+    """Write a dump of bz2 streams of three pages each, like enwiki's.
+
+    Every seventh page is a redirect, so 35 of the 40 pages are articles.
+    """
+    header = (
+        '<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">\n'
+        "  <siteinfo><sitename>Test</sitename></siteinfo>\n"
+    )
+    pages = [
+        "  <page>\n"
+        f"    <title>Page {i}</title>\n"
+        "    <ns>0</ns>\n"
+        f"    <id>{i}</id>\n"
+        + ('    <redirect title="Page 0" />\n' if i % 7 == 6 else "")
+        + f"    <revision><text>Text of page {i}. {'word ' * 40}</text></revision>\n"
+        "  </page>\n"
+        for i in range(num_pages)
+    ]
+    streams = [header] + [
+        "".join(pages[i : i + 3]) for i in range(0, num_pages, 3)
+    ] + ["</mediawiki>\n"]
+    path.write_bytes(b"".join(bz2.compress(s.encode()) for s in streams))
+    return path
+
+
 class TestStreamParseStage:
     """Tests for StreamParseStage class."""
 
@@ -59,10 +87,10 @@ class TestStreamParseStage:
     ) -> None:
         """Test fresh parse without checkpoint."""
         # Mock streaming
-        mock_stream.return_value = iter([b"<xml>test</xml>"])
+        mock_stream.return_value = iter([(0, b"<xml>test</xml>")])
 
         # Mock parser
-        mock_parser = Mock()
+        mock_parser = Mock(pages_read=0)
         mock_parser.parse.return_value = iter(sample_articles)
         mock_parser_class.return_value = mock_parser
 
@@ -104,8 +132,8 @@ class TestStreamParseStage:
         mock_checkpoint_class.return_value = mock_checkpoint
 
         # Mock streaming and parsing
-        mock_stream.return_value = iter([b"<xml>test</xml>"])
-        mock_parser = Mock()
+        mock_stream.return_value = iter([(0, b"<xml>test</xml>")])
+        mock_parser = Mock(pages_read=0)
         mock_parser.parse.return_value = iter(sample_articles)
         mock_parser_class.return_value = mock_parser
 
@@ -121,6 +149,382 @@ class TestStreamParseStage:
         # Should have called save_checkpoint
         assert mock_checkpoint.save_checkpoint.called
 
+    @patch("pocketwiki_builder.pipeline.stream_parse.stream_bz2_from_url")
+    @patch("pocketwiki_builder.pipeline.stream_parse.WikiXmlParser")
+    @patch("pocketwiki_builder.pipeline.stream_parse.CheckpointManager")
+    def test_checkpoint_matches_output_on_disk(
+        self,
+        mock_checkpoint_class: Mock,
+        mock_parser_class: Mock,
+        mock_stream: Mock,
+        temp_work_dir: Path,
+        sample_articles: list,
+    ) -> None:
+        """Test batched writes are flushed before each checkpoint."""
+        output_file = temp_work_dir / "parsed" / "articles.jsonl"
+        saved = []
+
+        mock_checkpoint = Mock()
+        mock_checkpoint.load_checkpoint.return_value = None
+        mock_checkpoint.should_checkpoint.side_effect = [False, True, False]
+        mock_checkpoint.save_checkpoint.side_effect = lambda cp: saved.append(
+            (cp.output_bytes_written, output_file.stat().st_size)
+        )
+        mock_checkpoint_class.return_value = mock_checkpoint
+
+        mock_stream.return_value = iter([(0, b"<xml>test</xml>")])
+        mock_parser = Mock(pages_read=0)
+        mock_parser.parse.return_value = iter(sample_articles)
+        mock_parser_class.return_value = mock_parser
+
+        config = StreamParseConfig(
+            source_url="http://example.com/dump.xml.bz2",
+            output_dir=str(temp_work_dir / "parsed"),
+            checkpoint_every_pages=1,
+        )
+        StreamParseStage(config, temp_work_dir).run()
+
+        assert len(saved) == 2
+        for recorded, on_disk in saved:
+            assert recorded == on_disk
+        assert saved[-1][0] == output_file.stat().st_size
+        lines = output_file.read_bytes().splitlines()
+        assert [json.loads(line) for line in lines] == sample_articles
+
+    @patch("pocketwiki_builder.pipeline.stream_parse.stream_bz2_from_url")
+    @patch("pocketwiki_builder.pipeline.stream_parse.CheckpointManager")
+    def test_checkpoint_offsets_follow_written_articles(
+        self,
+        mock_checkpoint_class: Mock,
+        mock_stream: Mock,
+        temp_work_dir: Path,
+        sample_wiki_xml: Path,
+    ) -> None:
+        """Test each checkpoint resumes from a stream starting before its page."""
+        data = sample_wiki_xml.read_bytes()
+        # Every 200-byte chunk stands in for a bz2 stream starting at i
+        mock_stream.return_value = iter(
+            [(i, data[i : i + 200]) for i in range(0, len(data), 200)]
+        )
+
+        saved = []
+        mock_checkpoint = Mock()
+        mock_checkpoint.load_checkpoint.return_value = None
+        mock_checkpoint.should_checkpoint.return_value = True
+        mock_checkpoint.save_checkpoint.side_effect = saved.append
+        mock_checkpoint_class.return_value = mock_checkpoint
+
+        config = StreamParseConfig(
+            source_url="http://example.com/dump.xml.bz2",
+            output_dir=str(temp_work_dir / "parsed"),
+            checkpoint_every_pages=1,
+            validate_source_unchanged=False,
+        )
+        StreamParseStage(config, temp_work_dir).run()
+
+        offsets = [cp.compressed_bytes_read for cp in saved]
+        assert len(saved) >= 2
+        assert offsets == sorted(offsets)
+        for cp in saved[:-1]:
+            title = data.index(f"<title>{cp.last_page_title}</title>".encode())
+            page_start = data.rindex(b"<page>", 0, title)
+            # The latest stream that still holds the whole page
+            assert page_start - 200 < cp.compressed_bytes_read <= page_start
+        assert offsets[-1] == offsets[-2]
+
+    @patch("pocketwiki_builder.pipeline.stream_parse.stream_bz2_from_url")
+    @patch("pocketwiki_builder.pipeline.stream_parse.WikiXmlParser")
+    @patch("pocketwiki_builder.pipeline.stream_parse.CheckpointManager")
+    def test_checkpoint_trigger_checked_periodically(
+        self,
+        mock_checkpoint_class: Mock,
+        mock_parser_class: Mock,
+        mock_stream: Mock,
+        temp_work_dir: Path,
+    ) -> None:
+        """Test checkpoint triggers are polled every 1000 pages, not every page."""
+        mock_checkpoint = Mock()
+        mock_checkpoint.load_checkpoint.return_value = None
+        mock_checkpoint.should_checkpoint.return_value = False
+        mock_checkpoint_class.return_value = mock_checkpoint
+
+        mock_stream.return_value = iter([(0, b"<xml>test</xml>")])
+        mock_parser = Mock(pages_read=0)
+        mock_parser.parse.return_value = iter(
+            {"id": str(i), "title": f"T{i}", "text": "text"} for i in range(2500)
+        )
+        mock_parser_class.return_value = mock_parser
+
+        config = StreamParseConfig(
+            source_url="http://example.com/dump.xml.bz2",
+            output_dir=str(temp_work_dir / "parsed"),
+            checkpoint_every_pages=5000,
+        )
+        StreamParseStage(config, temp_work_dir).run()
+
+        polled = [c.args[0] for c in mock_checkpoint.should_checkpoint.call_args_list]
+        assert polled == [1000, 2000]
+        assert mock_checkpoint.save_checkpoint.call_args[0][0].pages_processed == 2500
+
+    @patch("pocketwiki_builder.pipeline.stream_parse.stream_bz2_from_url")
+    @patch("pocketwiki_builder.pipeline.stream_parse.WikiXmlParser")
+    @patch("pocketwiki_builder.pipeline.stream_parse.CheckpointManager")
+    def test_bytes_written_counts_utf8_bytes(
+        self,
+        mock_checkpoint_class: Mock,
+        mock_parser_class: Mock,
+        mock_stream: Mock,
+        temp_work_dir: Path,
+    ) -> None:
+        """Test checkpointed output size counts encoded bytes, not characters."""
+        articles = [
+            {"id": "1", "title": "Zürich", "text": "Zürich liegt am Zürichsee."},
+            {"id": "2", "title": "東京", "text": "東京は日本の首都です。"},
+        ]
+
+        mock_checkpoint = Mock()
+        mock_checkpoint.load_checkpoint.return_value = None
+        mock_checkpoint.should_checkpoint.return_value = False
+        mock_checkpoint_class.return_value = mock_checkpoint
+
+        mock_stream.return_value = iter([(0, b"<xml>test</xml>")])
+        mock_parser = Mock(pages_read=0)
+        mock_parser.parse.return_value = iter(articles)
+        mock_parser_class.return_value = mock_parser
+
+        config = StreamParseConfig(
+            source_url="http://example.com/dump.xml.bz2",
+            output_dir=str(temp_work_dir / "parsed"),
+        )
+        StreamParseStage(config, temp_work_dir).run()
+
+        output_file = temp_work_dir / "parsed" / "articles.jsonl"
+        final = mock_checkpoint.save_checkpoint.call_args[0][0]
+        content = output_file.read_bytes()
+        assert final.output_bytes_written == len(content)
+        assert final.output_bytes_written > len(content.decode("utf-8"))
+
+    @patch("pocketwiki_builder.pipeline.stream_parse.stream_bz2_multistream")
+    @patch("pocketwiki_builder.pipeline.stream_parse.stream_bz2_from_url")
+    @patch("pocketwiki_builder.pipeline.stream_parse.WikiXmlParser")
+    @patch("pocketwiki_builder.pipeline.stream_parse.CheckpointManager")
+    def test_multistream_index_enables_parallel_stream(
+        self,
+        mock_checkpoint_class: Mock,
+        mock_parser_class: Mock,
+        mock_stream: Mock,
+        mock_multistream: Mock,
+        temp_work_dir: Path,
+        sample_articles: list,
+    ) -> None:
+        """Test a configured index routes fresh parses through the parallel reader."""
+        mock_checkpoint = Mock()
+        mock_checkpoint.load_checkpoint.return_value = None
+        mock_checkpoint.should_checkpoint.return_value = False
+        mock_checkpoint_class.return_value = mock_checkpoint
+
+        mock_multistream.return_value = iter([(0, b"<xml>test</xml>")])
+        mock_parser = Mock(pages_read=0)
+        mock_parser.parse.return_value = iter(sample_articles)
+        mock_parser_class.return_value = mock_parser
+
+        config = StreamParseConfig(
+            source_url="http://example.com/dump-multistream.xml.bz2",
+            source_index_url="http://example.com/dump-multistream-index.txt.bz2",
+            output_dir=str(temp_work_dir / "parsed"),
+            download_workers=4,
+        )
+        StreamParseStage(config, temp_work_dir).run()
+
+        mock_stream.assert_not_called()
+        args, kwargs = mock_multistream.call_args
+        assert args == (
+            "http://example.com/dump-multistream.xml.bz2",
+            "http://example.com/dump-multistream-index.txt.bz2",
+        )
+        assert kwargs["workers"] == 4
+
+    @patch("pocketwiki_builder.pipeline.stream_parse.stream_bz2_from_url")
+    @patch("pocketwiki_builder.pipeline.stream_parse.WikiXmlParser")
+    @patch("pocketwiki_builder.pipeline.stream_parse.CheckpointManager")
+    def test_zstd_output(
+        self,
+        mock_checkpoint_class: Mock,
+        mock_parser_class: Mock,
+        mock_stream: Mock,
+        temp_work_dir: Path,
+        sample_articles: list,
+    ) -> None:
+        """Test .zst outputs are compressed and checkpoint their on-disk size."""
+        import zstandard
+
+        output_file = temp_work_dir / "parsed" / "articles.jsonl.zst"
+        saved = []
+
+        mock_checkpoint = Mock()
+        mock_checkpoint.load_checkpoint.return_value = None
+        mock_checkpoint.should_checkpoint.side_effect = [True, False, False]
+        mock_checkpoint.save_checkpoint.side_effect = lambda cp: saved.append(
+            (cp.output_bytes_written, output_file.stat().st_size)
+        )
+        mock_checkpoint_class.return_value = mock_checkpoint
+
+        mock_stream.return_value = iter([(0, b"<xml>test</xml>")])
+        mock_parser = Mock(pages_read=0)
+        mock_parser.parse.return_value = iter(sample_articles)
+        mock_parser_class.return_value = mock_parser
+
+        config = StreamParseConfig(
+            source_url="http://example.com/dump.xml.bz2",
+            output_dir=str(temp_work_dir / "parsed"),
+            checkpoint_every_pages=1,
+            output_filename="articles.jsonl.zst",
+        )
+        StreamParseStage(config, temp_work_dir).run()
+
+        assert len(saved) == 2
+        for recorded, on_disk in saved:
+            assert recorded == on_disk
+        assert saved[-1][0] == output_file.stat().st_size
+
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            output_file.read_bytes(), read_across_frames=True
+        )
+        lines = reader.read().splitlines()
+        assert [json.loads(line) for line in lines] == sample_articles
+
+    def _save_completed_parse(self, stage: StreamParseStage) -> Path:
+        """Write a finished parse with a recorded ETag for stage."""
+        from pocketwiki_shared.schemas import StreamParseCheckpoint
+
+        output_file = stage.output_file
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        output_file.write_bytes(b'{"id": "1"}\n')
+        stage.checkpoint_mgr.save_checkpoint(
+            StreamParseCheckpoint(
+                source_url=stage.config.source_url,
+                source_etag='"v1"',
+                compressed_bytes_read=100,
+                pages_processed=1,
+                output_file=str(output_file),
+                output_bytes_written=output_file.stat().st_size,
+                last_checkpoint_time="2024-01-01T00:00:00+00:00",
+                completed=True,
+            )
+        )
+        return output_file
+
+    @patch("pocketwiki_builder.pipeline.stream_parse.get_etag")
+    @patch("pocketwiki_builder.pipeline.stream_parse.source_not_modified")
+    @patch("pocketwiki_builder.pipeline.stream_parse.stream_bz2_from_url")
+    def test_completed_parse_kept_when_source_not_modified(
+        self,
+        mock_stream: Mock,
+        mock_not_modified: Mock,
+        mock_etag: Mock,
+        temp_work_dir: Path,
+    ) -> None:
+        """Test a finished parse is kept when the source answers 304."""
+        mock_not_modified.return_value = True
+        mock_etag.return_value = '"v1"'
+
+        config = StreamParseConfig(
+            source_url="http://example.com/dump.xml.bz2",
+            output_dir=str(temp_work_dir / "parsed"),
+        )
+        stage = StreamParseStage(config, temp_work_dir)
+        output_file = self._save_completed_parse(stage)
+
+        stage.run()
+
+        assert mock_not_modified.call_args.args[1] == '"v1"'
+        mock_stream.assert_not_called()
+        assert output_file.read_bytes() == b'{"id": "1"}\n'
+
+    @patch("pocketwiki_builder.pipeline.stream_parse.get_etag")
+    @patch("pocketwiki_builder.pipeline.stream_parse.source_not_modified")
+    @patch("pocketwiki_builder.pipeline.stream_parse.stream_bz2_multistream")
+    @patch("pocketwiki_builder.pipeline.stream_parse.stream_bz2_from_url")
+    @patch("pocketwiki_builder.pipeline.stream_parse.WikiXmlParser")
+    def test_changed_source_reparsed_with_multistream_index(
+        self,
+        mock_parser_class: Mock,
+        mock_stream: Mock,
+        mock_multistream: Mock,
+        mock_not_modified: Mock,
+        mock_etag: Mock,
+        temp_work_dir: Path,
+        sample_articles: list,
+    ) -> None:
+        """Test a re-parse of a changed source still uses the parallel reader."""
+        mock_not_modified.return_value = False
+        mock_etag.return_value = '"v2"'
+        mock_multistream.return_value = iter([(0, b"<xml>test</xml>")])
+        mock_parser = Mock(pages_read=0)
+        mock_parser.parse.return_value = iter(sample_articles)
+        mock_parser_class.return_value = mock_parser
+
+        config = StreamParseConfig(
+            source_url="http://example.com/dump-multistream.xml.bz2",
+            source_index_url="http://example.com/dump-multistream-index.txt.bz2",
+            output_dir=str(temp_work_dir / "parsed"),
+        )
+        stage = StreamParseStage(config, temp_work_dir)
+        output_file = self._save_completed_parse(stage)
+
+        stage.run()
+
+        mock_stream.assert_not_called()
+        mock_multistream.assert_called_once()
+        lines = output_file.read_bytes().splitlines()
+        assert [json.loads(line) for line in lines] == sample_articles
+
+    def test_resume_mid_dump_neither_loses_nor_repeats_pages(
+        self, temp_work_dir: Path, tmp_path: Path
+    ) -> None:
+        """Test a parse interrupted after a checkpoint resumes where it left off."""
+        dump = _write_multistream_dump(tmp_path / "dump-multistream.xml.bz2")
+
+        def config(output_dir: Path) -> StreamParseConfig:
+            return StreamParseConfig(
+                source_url=f"file://{dump}",
+                output_dir=str(output_dir),
+                checkpoint_every_pages=5,
+            )
+
+        StreamParseStage(config(tmp_path / "full"), tmp_path).run()
+        expected = (tmp_path / "full" / "articles.jsonl").read_bytes()
+
+        class Interrupted(Exception):
+            pass
+
+        saved = []
+        save = CheckpointManager.save_checkpoint
+
+        def save_then_interrupt(manager, checkpoint):
+            save(manager, checkpoint)
+            saved.append(checkpoint)
+            if len(saved) == 2:
+                raise Interrupted
+
+        stage = StreamParseStage(config(temp_work_dir / "parsed"), temp_work_dir)
+        with patch.object(
+            CheckpointManager, "save_checkpoint", save_then_interrupt
+        ), pytest.raises(Interrupted):
+            stage.run()
+
+        checkpoint = saved[-1]
+        assert not checkpoint.completed
+        assert 0 < checkpoint.compressed_bytes_read < dump.stat().st_size
+        assert stage.output_file.stat().st_size < len(expected)
+
+        stage = StreamParseStage(config(temp_work_dir / "parsed"), temp_work_dir)
+        stage.run()
+
+        assert stage.output_file.read_bytes() == expected
+        ids = [json.loads(line)["id"] for line in expected.splitlines()]
+        assert len(ids) == len(set(ids)) == 35
+
     @pytest.mark.skip(reason="Complex checkpoint resume mocking - tested in integration")
     @patch("pocketwiki_builder.pipeline.stream_parse.stream_bz2_from_url")
     @patch("pocketwiki_builder.pipeline.stream_parse.CheckpointManager")
@@ -142,7 +546,7 @@ class TestStreamParseStage:
         mock_checkpoint_class.return_value = mock_checkpoint
 
         # Mock streaming with Range request
-        mock_stream.return_value = iter([b"<xml>resumed</xml>"])
+        mock_stream.return_value = iter([(0, b"<xml>resumed</xml>")])
 
         config = StreamParseConfig(
             source_url="http://example.com/dump.xml.bz2",
@@ -222,8 +626,8 @@ class TestStreamParseStage:
         sample_articles: list,
     ) -> None:
         """Test progress display during parsing."""
-        mock_stream.return_value = iter([b"<xml>test</xml>"])
-        mock_parser = Mock()
+        mock_stream.return_value = iter([(0, b"<xml>test</xml>")])
+        mock_parser = Mock(pages_read=0)
         mock_parser.parse.return_value = iter(sample_articles)
         mock_parser_class.return_value = mock_parser
 
@@ -1,4 +1,6 @@
 """Tests for web API."""
+import json
+
 from fastapi.testclient import TestClient
 import pytest
 
@@ -51,6 +53,291 @@ class TestChatAPI:
         assert response.status_code == 200
         # Stub implementation returns JSON, full implementation would use SSE
 
+    def test_chat_stream_frames(self, client: TestClient) -> None:
+        """Test the stream is SSE-framed and ends with [DONE]."""
+        response = client.post("/api/chat/stream", json={"query": "test"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.headers["x-accel-buffering"] == "no"
+        events = [
+            line[len("data: "):]
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        assert json.loads(events[0])["type"] == "sources"
+        assert events[-1] == "[DONE]"
+
+
+def _chunk_store(tmp_path, chunks: list):
+    """Write chunks as JSONL and open them as a ChunkStore."""
+    from pocketwiki_chat.bundle.chunks import ChunkStore
+
+    path = tmp_path / "chunks.jsonl"
+    path.write_text("".join(json.dumps(c) + "\n" for c in chunks))
+    return ChunkStore(path)
+
+
+class TestSearchSources:
+    """Tests for hybrid source search."""
+
+    @pytest.fixture(autouse=True)
+    def empty_query_cache(self, monkeypatch) -> None:
+        """Start every test without cached search results."""
+        from collections import OrderedDict
+
+        from pocketwiki_chat.web import app as web_app
+
+        monkeypatch.setattr(web_app.app_state, "query_cache", OrderedDict())
+
+    def test_repeat_queries_are_cached(self, monkeypatch, tmp_path) -> None:
+        """Test equivalent and concurrent queries reach the retriever once."""
+        import asyncio
+        from unittest.mock import Mock
+
+        from pocketwiki_chat.web import app as web_app
+
+        sparse = Mock()
+        sparse.search.return_value = [{"chunk_id": "1", "score": 1.0, "rank": 0}]
+        store = _chunk_store(tmp_path, [{"chunk_id": "1", "page_id": "10", "text": "a"}])
+        monkeypatch.setattr(web_app.app_state, "dense_retriever", None)
+        monkeypatch.setattr(web_app.app_state, "sparse_retriever", sparse)
+        monkeypatch.setattr(web_app.app_state, "chunk_store", store)
+
+        async def run():
+            concurrent = await asyncio.gather(
+                web_app._search_sources("Albert Einstein"),
+                web_app._search_sources("albert  einstein "),
+            )
+            return concurrent + [await web_app._search_sources("ALBERT EINSTEIN")]
+
+        results = asyncio.run(run())
+
+        assert sparse.search.call_count == 1
+        assert results[0] == results[1] == results[2]
+        assert [r["chunk_id"] for r in results[0]] == ["1"]
+
+    def test_failed_search_not_cached(self, monkeypatch, tmp_path) -> None:
+        """Test results degraded by a retriever error are recomputed."""
+        import asyncio
+        from unittest.mock import Mock
+
+        from pocketwiki_chat.web import app as web_app
+
+        sparse = Mock()
+        sparse.search.side_effect = [
+            RuntimeError("index busy"),
+            [{"chunk_id": "1", "score": 1.0, "rank": 0}],
+        ]
+        store = _chunk_store(tmp_path, [{"chunk_id": "1", "page_id": "10", "text": "a"}])
+        monkeypatch.setattr(web_app.app_state, "dense_retriever", None)
+        monkeypatch.setattr(web_app.app_state, "sparse_retriever", sparse)
+        monkeypatch.setattr(web_app.app_state, "chunk_store", store)
+        monkeypatch.setattr(web_app.app_state, "is_loaded", True)
+
+        assert asyncio.run(web_app._search_sources("query")) == []
+        assert len(asyncio.run(web_app._search_sources("query"))) == 1
+
+    def test_fuses_dense_and_sparse_results(self, monkeypatch, tmp_path) -> None:
+        """Test both retrievers are queried and their results enriched."""
+        import asyncio
+        from unittest.mock import Mock
+
+        import numpy as np
+
+        from pocketwiki_chat.web import app as web_app
+
+        # Dense hits are rows of chunks.jsonl; -1 pads a short result list
+        dense = Mock()
+        dense.search_arrays.return_value = (
+            np.array([0, 1, -1], dtype=np.int64),
+            np.array([0.9, 0.8, 0.0], dtype=np.float32),
+        )
+        sparse = Mock()
+        sparse.search.return_value = [{"chunk_id": "20-0", "score": 3.0, "rank": 0}]
+        store = _chunk_store(tmp_path, [
+            {"chunk_id": "10-0", "page_id": "10", "page_title": "A", "text": "a"},
+            {"chunk_id": "20-0", "page_id": "20", "page_title": "B", "text": "b"},
+        ])
+        monkeypatch.setattr(web_app.app_state, "dense_retriever", dense)
+        monkeypatch.setattr(web_app.app_state, "sparse_retriever", sparse)
+        monkeypatch.setattr(web_app.app_state, "chunk_store", store)
+
+        results = asyncio.run(web_app._search_sources("query", top_k=5))
+
+        dense.search_arrays.assert_called_once_with("query", k=5)
+        sparse.search.assert_called_once_with("query", k=5)
+        # The chunk both retrievers found is fused into one top result
+        assert [r["chunk_id"] for r in results] == ["20-0", "10-0"]
+        assert results[0]["page_title"] == "B"
+
+    def test_linear_fusion_config(self, monkeypatch, tmp_path) -> None:
+        """Test the configured fusion method is used for hybrid results."""
+        import asyncio
+        from unittest.mock import Mock
+
+        import numpy as np
+
+        from pocketwiki_chat.retrieval.fusion import FusionConfig
+        from pocketwiki_chat.web import app as web_app
+
+        dense = Mock()
+        dense.search_arrays.return_value = (
+            np.array([0, 1], dtype=np.int64),
+            np.array([0.9, 0.1], dtype=np.float32),
+        )
+        sparse = Mock()
+        sparse.search.return_value = [
+            {"chunk_id": "2", "score": 30.0, "rank": 0},
+            {"chunk_id": "1", "score": 1.0, "rank": 1},
+        ]
+        store = _chunk_store(tmp_path, [
+            {"chunk_id": "1", "page_id": "10", "text": "a"},
+            {"chunk_id": "2", "page_id": "20", "text": "b"},
+        ])
+        monkeypatch.setattr(web_app.app_state, "dense_retriever", dense)
+        monkeypatch.setattr(web_app.app_state, "sparse_retriever", sparse)
+        monkeypatch.setattr(web_app.app_state, "chunk_store", store)
+        monkeypatch.setattr(
+            web_app.app_state,
+            "fusion_config",
+            FusionConfig(method="linear", hybrid_alpha=2.0),
+        )
+
+        results = asyncio.run(web_app._search_sources("query", top_k=5))
+
+        assert [r["chunk_id"] for r in results] == ["2", "1"]
+
+    def test_retrievers_run_concurrently(self, monkeypatch, tmp_path) -> None:
+        """Test both searches run in parallel threads and one may fail alone."""
+        import asyncio
+        import threading
+        from unittest.mock import Mock
+
+        from pocketwiki_chat.web import app as web_app
+
+        # Each search waits for the other to start; sequential calls time out
+        barrier = threading.Barrier(2, timeout=5)
+
+        def dense_search(query, k):
+            barrier.wait()
+            raise RuntimeError("index unavailable")
+
+        def sparse_search(query, k):
+            barrier.wait()
+            return [{"chunk_id": "1", "score": 1.0, "rank": 0}]
+
+        dense = Mock()
+        dense.search_arrays.side_effect = dense_search
+        sparse = Mock()
+        sparse.search.side_effect = sparse_search
+        store = _chunk_store(tmp_path, [{"chunk_id": "1", "page_id": "10", "text": "a"}])
+        monkeypatch.setattr(web_app.app_state, "dense_retriever", dense)
+        monkeypatch.setattr(web_app.app_state, "sparse_retriever", sparse)
+        monkeypatch.setattr(web_app.app_state, "chunk_store", store)
+
+        results = asyncio.run(web_app._search_sources("query", top_k=5))
+
+        assert [r["chunk_id"] for r in results] == ["1"]
+
+
+class TestStreamChat:
+    """Tests for answer generation and chat streaming."""
+
+    def test_generation_runs_off_event_loop(self, monkeypatch) -> None:
+        """Test context assembly and generation run in executor threads."""
+        import asyncio
+        import threading
+        from unittest.mock import Mock
+
+        from pocketwiki_chat.web import app as web_app
+
+        threads = []
+        generator = Mock()
+        generator.is_loaded.return_value = False
+        generator.generate.side_effect = lambda **kwargs: threads.append(
+            threading.current_thread().name
+        ) or "answer"
+        monkeypatch.setattr(web_app.app_state, "llm_generator", generator)
+
+        sources = [{"chunk_id": "1", "page_title": "A", "text": "a"}]
+        response = asyncio.run(web_app._generate_response("query", sources))
+
+        assert response == "answer"
+        assert threads[0].startswith("llm")
+
+    def test_stream_batches_llm_tokens(self, monkeypatch) -> None:
+        """Test LLM tokens are coalesced into ordered batch events."""
+        import asyncio
+        from unittest.mock import Mock
+
+        from pocketwiki_chat.web import app as web_app
+
+        async def fake_search(query, top_k=10):
+            return [{"chunk_id": "1", "page_title": "A", "text": "a"}]
+
+        tokens = [f"t{i} " for i in range(40)]
+        generator = Mock()
+        generator.is_loaded.return_value = False
+        generator.stream_generate.return_value = iter(tokens)
+        monkeypatch.setattr(web_app, "_search_sources", fake_search)
+        monkeypatch.setattr(web_app.app_state, "llm_generator", generator)
+
+        async def collect():
+            return [event async for event in web_app._stream_chat("query")]
+
+        events = asyncio.run(collect())
+        batches = [json.loads(e)["tokens"] for e in events[1:-1]]
+
+        assert events[-1] == "[DONE]"
+        assert sum(batches, []) == tokens
+        assert 3 <= len(batches) <= len(tokens)
+        assert all(len(batch) <= 16 for batch in batches)
+
+    def test_stream_generates_off_event_loop(self, monkeypatch) -> None:
+        """Test LLM tokens are produced on the LLM worker, errors included."""
+        import asyncio
+        import threading
+        from unittest.mock import Mock
+
+        from pocketwiki_chat.web import app as web_app
+
+        async def fake_search(query, top_k=10):
+            return [{"chunk_id": "1", "page_title": "A", "text": "a"}]
+
+        threads = []
+
+        def stream_generate(**kwargs):
+            threads.append(threading.current_thread().name)
+            yield "partial"
+            raise RuntimeError("model crashed")
+
+        generator = Mock()
+        generator.is_loaded.return_value = False
+        generator.stream_generate.side_effect = stream_generate
+        monkeypatch.setattr(web_app, "_search_sources", fake_search)
+        monkeypatch.setattr(web_app.app_state, "llm_generator", generator)
+
+        async def collect():
+            return [event async for event in web_app._stream_chat("query")]
+
+        events = [json.loads(e) for e in asyncio.run(collect())[1:-1]]
+
+        assert threads[0].startswith("llm")
+        assert events == [
+            {"type": "tokens", "tokens": ["partial"]},
+            {"type": "error", "message": "model crashed"},
+        ]
+
+    def test_sse_payload_is_compact_utf8(self) -> None:
+        """Test event payloads are compact JSON with non-ASCII text unescaped."""
+        from pocketwiki_chat.web import app as web_app
+
+        payload = web_app._dumps({"type": "token", "token": "東京 – café"})
+
+        assert payload == '{"type":"token","token":"東京 – café"}'
+        assert json.loads(payload)["token"] == "東京 – café"
+
 
 class TestLLMIntegration:
     """Tests for LLM integration."""
@@ -1,6 +1,7 @@
 """Tests for pocketwiki_builder.streaming.xml_parser."""
 from io import BytesIO
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
@@ -35,6 +36,17 @@ class TestWikiXmlParser:
         assert articles[0]["title"] == "Albert Einstein"
         assert "theoretical physicist" in articles[0]["text"]
 
+    def test_parse_bz2_stream(
+        self, sample_wiki_bz2_stream, sample_wiki_xml: Path
+    ) -> None:
+        """Test parsing straight from a decompressing stream."""
+        parser = WikiXmlParser()
+
+        articles = list(parser.parse(sample_wiki_bz2_stream))
+
+        assert articles
+        assert articles == list(parser.parse(BytesIO(sample_wiki_xml.read_bytes())))
+
     def test_parse_skip_redirects(self, sample_wiki_xml: Path) -> None:
         """Test skipping redirect pages."""
         xml_data = sample_wiki_xml.read_bytes()
@@ -110,6 +122,56 @@ class TestWikiXmlParser:
         remaining = list(iterator)
         assert len(remaining) == 2
 
+    def test_parse_huge_page(self) -> None:
+        """Test pages with text beyond libxml2's 10 MB node limit still parse."""
+        ns = "http://www.mediawiki.org/xml/export-0.10/"
+        page = (
+            "<page><title>{title}</title><ns>0</ns><id>{id}</id>"
+            "<revision><text>{text}</text></revision></page>"
+        )
+        xml_data = (
+            f'<mediawiki xmlns="{ns}">'
+            + page.format(title="Huge", id=1, text="word " * 2_500_000)
+            + page.format(title="After", id=2, text="Still parsed.")
+            + "</mediawiki>"
+        ).encode()
+
+        articles = list(WikiXmlParser().parse(BytesIO(xml_data)))
+
+        assert [a["title"] for a in articles] == ["Huge", "After"]
+        assert len(articles[0]["text"]) > 10 * 1024 * 1024
+
+    def test_redirect_element_skips_text_scan(self) -> None:
+        """Test pages flagged by <redirect> never have their text scanned."""
+        parser = WikiXmlParser(skip_redirects=True)
+        article = {
+            "id": "1",
+            "title": "Old Name",
+            "text": "#REDIRECT [[New Name]]",
+            "namespace": 0,
+            "is_redirect": True,
+        }
+
+        with patch(
+            "pocketwiki_builder.streaming.xml_parser.is_redirect"
+        ) as mock_is_redirect:
+            assert parser._should_include(article) is False
+            mock_is_redirect.assert_not_called()
+
+    def test_redirect_text_fallback(self) -> None:
+        """Test unflagged pages are still checked for redirect text."""
+        parser = WikiXmlParser(skip_redirects=True)
+        article = {
+            "id": "1",
+            "title": "Old Name",
+            "text": "#REDIRECT [[New Name]]",
+            "namespace": 0,
+            "is_redirect": False,
+        }
+
+        assert parser._should_include(article) is False
+        assert WikiXmlParser(skip_redirects=False)._should_include(article) is True
+
     def test_parse_malformed_xml_graceful(self) -> None:
         """Test graceful handling of malformed XML."""
         malformed_xml = b"""<mediawiki>
@@ -130,6 +192,68 @@ class TestWikiXmlParser:
         # May get 0 or 1 article depending on parser robustness
         assert len(articles) >= 0
 
+    def test_parse_chunks_matches_parse(self, sample_wiki_xml: Path) -> None:
+        """Test push-parsing odd-sized chunks yields the same articles."""
+        xml_data = sample_wiki_xml.read_bytes()
+        parser = WikiXmlParser(skip_redirects=False, allowed_namespaces=[0, 4])
+
+        chunks = (xml_data[i : i + 7] for i in range(0, len(xml_data), 7))
+
+        assert list(parser.parse_chunks(chunks)) == list(
+            parser.parse(BytesIO(xml_data))
+        )
+
+    def test_parse_chunks_malformed_graceful(self) -> None:
+        """Test push-parsing stops quietly at malformed XML."""
+        parser = WikiXmlParser()
+        chunks = [b"<mediawiki><page><title>T</title>", b"</revision></mediawiki>"]
+
+        assert list(parser.parse_chunks(chunks)) == []
+
+    def test_parse_many_pages_detaches_cleared_pages(self) -> None:
+        """Test cleared pages are detached from the root periodically."""
+        ns = "http://www.mediawiki.org/xml/export-0.10/"
+        page = (
+            "<page><title>P{0}</title><ns>0</ns><id>{0}</id>"
+            "<revision><id>9{0}</id><text>Body {0}</text></revision></page>"
+        )
+        xml = (
+            f'<mediawiki xmlns="{ns}">'
+            + "".join(page.format(i) for i in range(5000))
+            + "</mediawiki>"
+        ).encode()
+        parser = WikiXmlParser()
+
+        root_sizes = []
+        original = parser._extract_article
+
+        def extract(elem):
+            root_sizes.append(len(elem.getparent()))
+            return original(elem)
+
+        with patch.object(parser, "_extract_article", side_effect=extract):
+            articles = list(parser.parse(BytesIO(xml)))
+
+        assert [a["id"] for a in articles] == [str(i) for i in range(5000)]
+        # One batch of cleared pages plus whatever the parser has read ahead
+        assert max(root_sizes) < 2000
+
+    def test_parse_recovers_from_undefined_entity(self) -> None:
+        """Test a bad entity in one page does not stop the parse."""
+        ns = "http://www.mediawiki.org/xml/export-0.10/"
+        xml = (
+            f'<mediawiki xmlns="{ns}">'
+            "<page><title>A</title><ns>0</ns><id>1</id>"
+            "<revision><text>Bad &nbsp; entity</text></revision></page>"
+            "<page><title>B</title><ns>0</ns><id>2</id>"
+            "<revision><text>Fine</text></revision></page>"
+            "</mediawiki>"
+        ).encode()
+
+        articles = list(WikiXmlParser().parse(BytesIO(xml)))
+
+        assert "B" in [a["title"] for a in articles]
+
     def test_parse_empty_stream(self) -> None:
         """Test parsing empty stream."""
         stream = BytesIO(b"<mediawiki></mediawiki>")
@@ -167,6 +291,24 @@ class TestParseWikiXmlStream:
         articles = list(parse_wiki_xml_stream(byte_stream()))
         assert len(articles) >= 3
 
+    def test_yields_before_stream_is_exhausted(self, sample_wiki_xml: Path) -> None:
+        """Test articles are yielded while chunks are still being pulled."""
+        xml_data = sample_wiki_xml.read_bytes()
+        chunks_pulled = 0
+
+        def byte_stream():
+            nonlocal chunks_pulled
+            for i in range(0, len(xml_data), 64):
+                chunks_pulled += 1
+                yield xml_data[i : i + 64]
+
+        total_chunks = (len(xml_data) + 63) // 64
+        articles = parse_wiki_xml_stream(byte_stream())
+        first = next(articles)
+        assert first["title"]
+        assert chunks_pulled < total_chunks
+        assert len([first, *articles]) >= 3
+
 
 class TestIsRedirect:
     """Tests for is_redirect helper function."""
@@ -177,6 +319,7 @@ class TestIsRedirect:
         # For testing, we can use text content
         assert is_redirect("#REDIRECT [[Other Page]]") is True
         assert is_redirect("#redirect [[Other Page]]") is True
+        assert is_redirect("  \n#Redirect [[Other Page]]") is True
 
     def test_not_redirect(self) -> None:
         """Test non-redirect page."""
@@ -192,6 +335,7 @@ class TestIsDisambiguation:
         assert is_disambiguation("{{disambiguation}}") is True
         assert is_disambiguation("{{Disambiguation}}") is True
         assert is_disambiguation("{{disambig}}") is True
+        assert is_disambiguation("{{ DISAMBIG }}") is True
         assert (
             is_disambiguation("Some content\n{{disambiguation}}\nMore content")
             is True
@@ -204,4 +348,5 @@ class TestIsDisambiguation:
     def test_not_disambiguation(self) -> None:
         """Test non-disambiguation page."""
         assert is_disambiguation("Regular article content") is False
+        assert is_disambiguation("{{disambiguation needed}}") is False
         assert is_disambiguation("", title="Regular Article") is False